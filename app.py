@@ -1,24 +1,171 @@
 #app.py
+import io
+import logging
 import os
-from flask import Flask, request, send_file, render_template, flash, redirect, url_for
-from build_helpers import parse_pdf_to_structured, build_mapping_wrapper
-from generate_ppt import generate_presentation
-from hymns_db import HymnDatabase, process_user_hymns
-from docx import Document
-import re
-from parse_announcements import parse_announcements_docx
+import tempfile
+import threading
+from flask import Flask, Request, Response, request, send_file, render_template, flash, redirect, url_for, jsonify
+from bible_fetch import get_verse_store
+from hymns_db import HymnDatabase
+from hymn_search import HymnSearchIndex
+from metrics import render_prometheus
+from pipeline import build_deck
+from jobs import JobQueue, QueueFull
+from deck_cache import deck_cache, deck_key
 
-UPLOAD_DIR = os.path.join(os.getcwd(), 'uploads')
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Debug output (per-hymn / per-verse detail) is logged at DEBUG; production
+# runs at WARNING unless LOG_LEVEL says otherwise.
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("app")
+
+# Uploads are processed in memory (see pipeline.py). A request larger than
+# MAX_UPLOAD_MB is refused with 413 from its Content-Length, before the body
+# is read; each uploaded file stays in memory up to UPLOAD_SPOOL_KB and only
+# spills to a private temporary file, deleted with the request, beyond that.
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "40"))
+UPLOAD_SPOOL_KB = int(os.environ.get("UPLOAD_SPOOL_KB", "8192"))
+PPTX_MIMETYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_KB * 1024, mode="rb+")
 
 app = Flask(__name__)
 app.secret_key = "change-this-secret-for-production"
+app.request_class = UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
+
+# Data files and heavy libraries are loaded by a background thread so the
+# server can answer (and report /healthz) straight away after boot.
+hymn_db = None
+hymn_index = None
+_ready = threading.Event()      # set once everything loaded
+_warmed_up = threading.Event()  # set when the warm-up thread is done, loaded or not
+_load_error = None
+
+# HYMN_DB_LEAN=1 keeps only an offset index per hymn CSV and reads hymns on
+# demand (for small instances); HYMN_CACHE_SIZE bounds the per-language LRU.
+# The search index is then built from the first lines in that index, so
+# /hymns/search matches hymn numbers and first lines only.
+HYMN_DB_LEAN = os.environ.get("HYMN_DB_LEAN", "").lower() in ("1", "true", "yes")
+HYMN_CACHE_SIZE = int(os.environ.get("HYMN_CACHE_SIZE", "32"))
+
+def _warm_up():
+    global hymn_db, hymn_index, _load_error
+    try:
+        hymn_db = HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv",
+                               lean=HYMN_DB_LEAN, cache_size=HYMN_CACHE_SIZE)
+        hymn_index = HymnSearchIndex(hymn_db)
+        get_verse_store()
+        import pdfplumber, pptx, docx  # noqa: F401  (pre-import for the first request)
+    except Exception as e:
+        log.exception("warm-up failed")
+        _load_error = f"{e.__class__.__name__}: {e}"
+    else:
+        _ready.set()
+    finally:
+        _warmed_up.set()
+
+threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+# Asynchronous builds (see jobs.py); the worker pool starts on the first job.
+# The form posts to / and downloads the deck synchronously unless ASYNC_JOBS
+# is set: job state lives in this process, so job mode needs a single
+# gunicorn worker.
+ASYNC_JOBS = os.environ.get("ASYNC_JOBS", "").lower() in ("1", "true", "yes")
+job_queue = JobQueue(hymn_db_kwargs={"lean": HYMN_DB_LEAN, "cache_size": HYMN_CACHE_SIZE})
+
+@app.route('/healthz')
+def healthz():
+    """Readiness probe: 503 until hymns, verse store and libraries are loaded (or if loading failed)."""
+    if _load_error is not None:
+        return jsonify(status="failed", error=_load_error), 503
+    if not _ready.is_set():
+        return jsonify(status="loading"), 503
+    return jsonify(status="ready")
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: stage latency histograms and cache hit ratios."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/hymns/search')
+def hymn_search():
+    """Autocomplete: ?q=<a few words or a number>&language=kannada|tulu|english&limit=10"""
+    if _load_error is not None:
+        return jsonify(status="failed", error=_load_error, results=[]), 503
+    if not _ready.is_set():
+        return jsonify(status="loading", results=[]), 503
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+    results = hymn_index.search(request.args.get('q', ''), request.args.get('language'), limit)
+    return jsonify(results=results)
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    message = f"The uploaded files are too large (limit {MAX_UPLOAD_MB} MB in total)."
+    if request.path.startswith('/jobs'):
+        return jsonify(error=message), 413
+    flash(message)
+    return redirect(url_for('index'))
 
-hymn_db = HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv")
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a deck build from the same form as '/'; poll the returned status_url."""
+    _warmed_up.wait()  # deck keys include bible.verses, which the warm-up may recompile
+    if not _ready.is_set():
+        return jsonify(error=f"The server could not load its hymn and Bible data ({_load_error})."), 503
+    pdf_file = request.files.get('pdf')
+    tpl_file = request.files.get('tpl')
+    ann_doc_file = request.files.get('ann_doc')
+    if not pdf_file or not tpl_file:
+        return jsonify(error="Please upload both the weekly PDF and a Canva PPTX template."), 400
+    pdf_bytes, tpl_bytes = pdf_file.read(), tpl_file.read()
+    ann_bytes = ann_doc_file.read() if ann_doc_file else None
+    key = deck_key(pdf_bytes, tpl_bytes, ann_bytes, request.form)
+    cached = deck_cache.get(key)
+    try:
+        if cached is not None:
+            job_id = job_queue.add_finished(cached)
+        else:
+            job_id = job_queue.submit(pdf_bytes, tpl_bytes, ann_bytes,
+                                      request.form.to_dict(), request.form.get('style_profile') or None,
+                                      on_success=lambda deck: deck_cache.put(key, deck))
+    except QueueFull:
+        return jsonify(error="The server is busy, please try again shortly."), 503, {"Retry-After": "30"}
+    return jsonify(job_id=job_id,
+                   status_url=url_for('job_status', job_id=job_id),
+                   download_url=url_for('job_download', job_id=job_id)), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    info = job_queue.status(job_id)
+    if info is None:
+        return jsonify(error="unknown or expired job"), 404
+    return jsonify(info)
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    info = job_queue.status(job_id)
+    if info is None:
+        return jsonify(error="unknown or expired job"), 404
+    if info["status"] != "done":
+        return jsonify(info), 409
+    deck = job_queue.result(job_id)
+    if deck is None:  # expired (or dropped for space) since the status check
+        return jsonify(error="expired job"), 410
+    return send_file(io.BytesIO(deck), as_attachment=True,
+                     download_name='final_presentation.pptx', mimetype=PPTX_MIMETYPE)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
+        _warmed_up.wait()
+        if not _ready.is_set():
+            return f"The server could not load its hymn and Bible data ({_load_error}); please try again later.", 503
         pdf_file = request.files.get('pdf')
         tpl_file = request.files.get('tpl')
         ann_doc_file = request.files.get('ann_doc')
@@ -27,39 +174,22 @@ def index():
             flash("Please upload both the weekly PDF and a Canva PPTX template.")
             return redirect(url_for('index'))
         
-        hymn_placeholders = process_user_hymns(request.form, hymn_db)
-
-        print(f"Generated {len(hymn_placeholders)} hymn placeholders")
-        for key, value in list(hymn_placeholders.items())[:5]:  # Show first 5
-            print(f"  {key}: {str(value)[:50]}...")
-
-        pdf_path = os.path.join(UPLOAD_DIR, 'input.pdf'); pdf_file.save(pdf_path)
-        tpl_path = os.path.join(UPLOAD_DIR, 'template.pptx'); tpl_file.save(tpl_path)
-
-        parsed = parse_pdf_to_structured(pdf_path)
-
-        mapping, announcements_table = build_mapping_wrapper(parsed, hymn_db)
-        mapping.update({f'{{{k}}}': v for k, v in hymn_placeholders.items()})
-        
-        if ann_doc_file:
-            ann_path = os.path.join(UPLOAD_DIR, 'announcements.docx')
-            ann_doc_file.save(ann_path)
-            ann_table, ann_text = parse_announcements_docx(ann_path)
-
-    # Override announcements text
-            parsed['announcements_block'] = ann_text
-            mapping['{ANNOUNCEMENTS_TEXT}'] = ann_text
-
-    # Override announcements table if we found one
-        if ann_table:
-            announcements_table = ann_table
-
-        out_pptx = os.path.join(UPLOAD_DIR, 'final_presentation.pptx')
-        generate_presentation(tpl_path, out_pptx, mapping, announcements_table_data=announcements_table)
+        ann_stream = ann_doc_file.stream if ann_doc_file else None
+        # identical resubmissions are served from the deck cache (see deck_cache.py)
+        key = deck_key(pdf_file.stream, tpl_file.stream, ann_stream, request.form)
+        cached = deck_cache.get(key)
+        if cached is not None:
+            deck = io.BytesIO(cached)
+        else:
+            deck = build_deck(pdf_file.stream, tpl_file.stream, request.form, hymn_db,
+                              announcements_file=ann_stream,
+                              style_profile=request.form.get('style_profile') or None)
+            deck_cache.put(key, deck.getvalue())
 
-        return send_file(out_pptx, as_attachment=True, download_name='final_presentation.pptx')
+        return send_file(deck, as_attachment=True, download_name='final_presentation.pptx',
+                         mimetype=PPTX_MIMETYPE)
 
-    return render_template('index.html')
+    return render_template('index.html', async_jobs=ASYNC_JOBS)
 
 if __name__ == "__main__": 
     port = int(os.environ.get("PORT", 5000))
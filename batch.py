@@ -0,0 +1,204 @@
+# batch.py
+"""
+Pre-build decks for many services from the command line.
+
+Takes a directory of weekly bulletin PDFs and a JSON manifest of the hymns
+(and optionally announcements / style profile) for each week, and runs the
+same pipeline as the upload form (pipeline.build_deck) over all of them on a
+process pool. Each worker loads the hymn database and verse store once and
+reuses them for every deck it builds, so throughput grows with --workers.
+
+    python batch.py bulletins/ --manifest quarter.json --template weekly.pptx --out decks/
+
+Manifest (paths are relative to the manifest file):
+
+    {
+      "template": "weekly.pptx",                  # optional, --template wins
+      "services": {
+        "2026-01-04.pdf": {
+          "hymns": [{"number": "140", "verses": "1-3", "language": "kannada"},
+                    {"number": "12", "language": "english"}],
+          "announcements": "2026-01-04.docx",     # optional
+          "style_profile": "large"                # optional
+        }
+      }
+    }
+
+A bulletin without a manifest entry is built without hymns. Every deck is
+written to --out as <bulletin name>.pptx, and report.json there records, per
+deck, the stage timings, the template placeholders no value was found for
+and any error. Exits with status 1 when a deck failed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from metrics import stage_summary
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# --- Worker process side ----------------------------------------------------------
+
+_worker_hymn_db = None
+
+
+def _init_worker(hymn_db_kwargs):
+    """Runs once per worker process: load the hymn database and verse store."""
+    global _worker_hymn_db
+    from bible_fetch import get_verse_store
+    from hymns_db import HymnDatabase
+
+    _worker_hymn_db = HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv", **hymn_db_kwargs)
+    get_verse_store()
+
+
+def _build_one(service):
+    """Build one deck and return its report entry (never raises)."""
+    from pipeline import build_deck
+
+    report = {"pdf": service["pdf"], "output": service["output"], "status": "done", "error": None}
+    before = stage_summary()
+    start = time.perf_counter()
+    unresolved = []
+    try:
+        announcements = service.get("announcements")
+        with open(service["pdf"], "rb") as pdf, open(service["template"], "rb") as template:
+            ann = open(announcements, "rb") if announcements else None
+            try:
+                deck = build_deck(pdf, template, service["form"], _worker_hymn_db, announcements_file=ann,
+                                  style_profile=service.get("style_profile"),
+                                  optimize_media=service.get("optimize_media"),
+                                  fit_text=service.get("fit_text"), unresolved=unresolved).getvalue()
+            finally:
+                if ann:
+                    ann.close()
+        tmp_path = service["output"] + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(deck)
+        os.replace(tmp_path, service["output"])
+        report["unresolved"] = unresolved
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = f"{e.__class__.__name__}: {e}"
+    report["seconds"] = round(time.perf_counter() - start, 4)
+    # this worker runs one deck at a time, so the growth of its stage totals is this deck's timings
+    after = stage_summary()
+    report["stages"] = {stage: round(info["sum"] - before.get(stage, {}).get("sum", 0.0), 4)
+                        for stage, info in after.items()
+                        if info["count"] != before.get(stage, {}).get("count", 0)}
+    report["worker"] = os.getpid()
+    return report
+
+
+# --- Command line -----------------------------------------------------------------
+
+def hymn_form(hymns):
+    """Manifest hymn list -> the hymnN_number / hymnN_verses / hymnN_language form fields."""
+    form = {}
+    for i, hymn in enumerate(hymns, 1):
+        form[f"hymn{i}_number"] = str(hymn.get("number", "")).strip()
+        form[f"hymn{i}_verses"] = str(hymn.get("verses", "")).strip()
+        form[f"hymn{i}_language"] = str(hymn.get("language", "kannada")).strip().lower()
+    return form
+
+
+def load_services(bulletin_dir, manifest_path, template, out_dir):
+    """[service, ...] for every PDF in bulletin_dir, plus failures for manifest entries without a PDF."""
+    manifest = {}
+    base = os.getcwd()
+    if manifest_path:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        base = os.path.dirname(os.path.abspath(manifest_path))
+
+    def resolve(path):
+        return os.path.join(base, path) if path else None
+
+    template = os.path.abspath(template) if template else resolve(manifest.get("template"))
+    if not template:
+        raise SystemExit("no template: pass --template or set \"template\" in the manifest")
+
+    entries = manifest.get("services", {})
+    pdfs = sorted(name for name in os.listdir(bulletin_dir) if name.lower().endswith(".pdf"))
+    services, missing = [], [name for name in entries if name not in pdfs]
+    for name in pdfs:
+        entry = entries.get(name, {})
+        services.append({
+            "pdf": os.path.abspath(os.path.join(bulletin_dir, name)),
+            "template": resolve(entry["template"]) if entry.get("template") else template,
+            "announcements": resolve(entry.get("announcements")),
+            "style_profile": entry.get("style_profile"),
+            "form": entry.get("form") or hymn_form(entry.get("hymns", [])),
+            "output": os.path.abspath(os.path.join(out_dir, os.path.splitext(name)[0] + ".pptx")),
+            "in_manifest": name in entries,
+        })
+    return services, missing
+
+
+def run_batch(services, workers, hymn_db_kwargs=None):
+    """Build every service on a pool of workers; yields report entries as decks finish."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(hymn_db_kwargs or {},)) as pool:
+        futures = [pool.submit(_build_one, service) for service in services]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("bulletins", help="directory of bulletin PDFs")
+    ap.add_argument("--manifest", help="JSON manifest of hymns per bulletin")
+    ap.add_argument("--template", help="PPTX template (overrides the manifest's)")
+    ap.add_argument("--out", default="decks", help="output directory for decks and report.json")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (default: CPU count)")
+    ap.add_argument("--lean", action="store_true", help="load hymns in lean (on-demand) mode")
+    ap.add_argument("--optimize-media", action="store_true",
+                    help="dedupe and downscale template media (once per template per worker)")
+    ap.add_argument("--fit-text", action="store_true", help="fit verse blocks and font sizes to measured boxes")
+    args = ap.parse_args(argv)
+
+    out_dir = os.path.abspath(args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    services, missing = load_services(args.bulletins, args.manifest, args.template, out_dir)
+    for service in services:
+        service["optimize_media"] = args.optimize_media or None
+        service["fit_text"] = args.fit_text or None
+        if not service.pop("in_manifest"):
+            print(f"warning: {os.path.basename(service['pdf'])} has no manifest entry; building without hymns")
+
+    # workers open the data files relative to the app directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    reports = [{"pdf": name, "output": None, "status": "failed", "error": "bulletin not found",
+                "seconds": 0.0, "stages": {}} for name in missing]
+    workers = max(1, min(args.workers, len(services) or 1))
+    for report in run_batch(services, workers, {"lean": args.lean}):
+        reports.append(report)
+        unresolved = report.get("unresolved") or []
+        detail = report["error"] or (f"{len(unresolved)} unresolved placeholder(s)" if unresolved else "ok")
+        print(f"{report['status']:6} {report['seconds']:7.2f}s  {os.path.basename(report['pdf'])}  {detail}",
+              flush=True)
+    wall = time.perf_counter() - start
+
+    reports.sort(key=lambda r: r["pdf"])
+    busy = sum(r["seconds"] for r in reports)
+    summary = {"decks": len(reports), "failed": sum(r["status"] != "done" for r in reports),
+               "workers": workers, "wall_seconds": round(wall, 3), "deck_seconds": round(busy, 3),
+               "concurrency": round(busy / wall, 2) if wall else None}
+    report_path = os.path.join(out_dir, "report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "decks": reports}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+    print(f"\n{summary['decks'] - summary['failed']}/{summary['decks']} decks in {wall:.1f}s "
+          f"on {workers} worker(s), {summary['concurrency']} building at a time on average; report: {report_path}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
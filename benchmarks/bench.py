@@ -0,0 +1,331 @@
+# benchmarks/bench.py
+"""
+Stage-level benchmarks for the deck pipeline, with a regression gate.
+
+Each case times one stage on synthetic inputs from fixtures.py (bulletins
+of several page counts, templates of N slides x M placeholders, an
+announcements DOCX and a hymn form). Per-case setup runs outside the timed
+region, and caches that would otherwise answer repeated runs (parsed
+bulletins, resolved passages) are cleared before every run, so the numbers
+are cold-path costs. The fastest of the runs (min_ms; the median is
+reported too) is compared against a JSON baseline, since a slow run only
+shows what else the machine was doing; a case fails when it is slower than
+baseline * (1 + tolerance) and also more than --floor-ms slower (so
+sub-millisecond noise never fails). Checks and baselines use at least
+MIN_REPEAT runs per case.
+
+    python benchmarks/bench.py                       # compare with benchmarks/baseline.json
+    python benchmarks/bench.py --update-baseline     # record a new baseline on this machine
+    python benchmarks/bench.py -k pdf_parse -k save --repeat 9
+
+Baselines are machine-specific: record one on the machine that runs the check.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import fixtures  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_FLOOR_MS = 2.0
+MIN_REPEAT = 5  # fewer runs make the minimum itself noisy
+
+# (pages) of the bulletins and (slides, placeholders per slide) of the templates
+BULLETIN_SIZES = (1, 4, 12)
+TEMPLATE_SIZES = ((40, 2), (120, 4))
+
+CASES = {}
+
+
+def case(name):
+    """Register a benchmark: fn(ctx) returns (setup, run); setup() -> state, run(state) is timed."""
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def clear_caches():
+    import bible_fetch
+    import parse_pdf
+
+    with parse_pdf._pdf_cache_lock:
+        parse_pdf._pdf_cache.clear()
+    with bible_fetch._cache_lock:
+        bible_fetch._passage_cache.clear()
+
+
+class Context:
+    """Fixtures and loaded data shared by the cases, built on first use."""
+
+    def __init__(self):
+        self._cache = {}
+
+    def _get(self, key, make):
+        if key not in self._cache:
+            self._cache[key] = make()
+        return self._cache[key]
+
+    def hymn_db(self):
+        from hymns_db import HymnDatabase
+        return self._get("hymn_db", lambda: HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv"))
+
+    def form(self):
+        return self._get("form", lambda: fixtures.make_hymn_form(self.hymn_db(), hymns=4))
+
+    def bulletin(self, pages):
+        return self._get(("pdf", pages), lambda: fixtures.make_bulletin_pdf(pages))
+
+    def parsed(self):
+        from parse_pdf import parse_pdf_to_structured
+        return self._get("parsed", lambda: parse_pdf_to_structured(io.BytesIO(self.bulletin(2))))
+
+    def template(self, slides, per_slide):
+        return self._get(("tpl", slides, per_slide), lambda: fixtures.make_template(slides, per_slide))
+
+    def announcements(self):
+        return self._get("docx", fixtures.make_announcements_docx)
+
+    def mapping(self):
+        def make():
+            from build_helpers import build_mapping_wrapper
+            from hymns_db import process_user_hymns
+            mapping, table = build_mapping_wrapper(self.parsed(), self.hymn_db())
+            mapping.update({f"{{{k}}}": v for k, v in process_user_hymns(self.form(), self.hymn_db()).items()})
+            return mapping, table
+        return self._get("mapping", make)
+
+
+# --- Cases ------------------------------------------------------------------------
+
+def _pdf_parse_case(pages):
+    def bench(ctx):
+        from parse_pdf import parse_pdf_to_structured
+        data = ctx.bulletin(pages)
+
+        def setup():
+            clear_caches()
+            return io.BytesIO(data)
+        return setup, parse_pdf_to_structured
+    return bench
+
+
+for _pages in BULLETIN_SIZES:
+    case(f"pdf_parse[pages={_pages}]")(_pdf_parse_case(_pages))
+
+
+@case("bible_fetch[refs=20]")
+def bench_bible_fetch(ctx):
+    from bible_fetch import fetch_bible_passage, get_verse_store
+    get_verse_store()
+    refs = fixtures.random_references(20)
+
+    def run(_):
+        for ref in refs:
+            fetch_bible_passage(ref)
+    return clear_caches, run
+
+
+@case("hymn_db_load")
+def bench_hymn_db_load(ctx):
+    from hymns_db import HymnDatabase
+    return (lambda: None), (lambda _: HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv"))
+
+
+@case("hymn_db_load[lean]")
+def bench_hymn_db_load_lean(ctx):
+    from hymns_db import HymnDatabase
+    return (lambda: None), (lambda _: HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv",
+                                                   lean=True))
+
+
+@case("get_hymn_verses[hymns=4]")
+def bench_hymn_verses(ctx):
+    from hymns_db import get_hymn_verses
+    db, form = ctx.hymn_db(), ctx.form()
+    hymns = [(form[f"hymn{i}_number"], form[f"hymn{i}_verses"], form[f"hymn{i}_language"]) for i in range(1, 5)]
+
+    def run(_):
+        for number, verses, language in hymns:
+            get_hymn_verses(number, verses, language, db)
+    return (lambda: None), run
+
+
+@case("build_mapping")
+def bench_build_mapping(ctx):
+    from build_helpers import build_mapping_wrapper
+    parsed, db = ctx.parsed(), ctx.hymn_db()
+    return clear_caches, (lambda _: build_mapping_wrapper(parsed, db))
+
+
+@case("parse_announcements")
+def bench_parse_announcements(ctx):
+    from parse_announcements import parse_announcements_docx
+    data = ctx.announcements()
+    return (lambda: io.BytesIO(data)), parse_announcements_docx
+
+
+def _loaded_template(ctx, slides, per_slide):
+    from generate_ppt import load_template, slide_plan
+    prs, index = load_template(io.BytesIO(ctx.template(slides, per_slide)))
+    return prs, index, slide_plan(prs, index)
+
+
+def _replace_case(slides, per_slide):
+    def bench(ctx):
+        from generate_ppt import replace_placeholders
+        mapping, _ = ctx.mapping()
+
+        def run(state):
+            prs, index, plan = state
+            replace_placeholders(prs, mapping, index=index, plan=plan)
+        return (lambda: _loaded_template(ctx, slides, per_slide)), run
+    return bench
+
+
+def _save_case(slides, per_slide):
+    def bench(ctx):
+        from generate_ppt import replace_placeholders
+        from pptx_writer import TemplateSource, save_presentation
+        mapping, _ = ctx.mapping()
+
+        def setup():
+            prs, index, plan = _loaded_template(ctx, slides, per_slide)
+            source = TemplateSource(prs, ctx.template(slides, per_slide))
+            replace_placeholders(prs, mapping, index=index, plan=plan)
+            return prs, source, [prs.part] + [slide.part for slide, _ in plan]
+
+        def run(state):
+            prs, source, changed = state
+            save_presentation(prs, io.BytesIO(), source, changed)
+        return setup, run
+    return bench
+
+
+for _slides, _per_slide in TEMPLATE_SIZES:
+    case(f"replace_placeholders[{_slides}x{_per_slide}]")(_replace_case(_slides, _per_slide))
+    case(f"save[{_slides}x{_per_slide}]")(_save_case(_slides, _per_slide))
+
+
+@case("build_deck[40x2]")
+def bench_build_deck(ctx):
+    from pipeline import build_deck
+    pdf, tpl, docx = ctx.bulletin(2), ctx.template(40, 2), ctx.announcements()
+    db, form = ctx.hymn_db(), ctx.form()
+
+    def run(_):
+        build_deck(io.BytesIO(pdf), io.BytesIO(tpl), form, db, announcements_file=io.BytesIO(docx))
+    return clear_caches, run
+
+
+# --- Runner -----------------------------------------------------------------------
+
+def measure(setup, run, repeat, warmup=1):
+    """Milliseconds of each timed run (after warmup untimed runs)."""
+    times = []
+    for i in range(warmup + repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def run_cases(names, repeat):
+    ctx = Context()
+    results = {}
+    for name in names:
+        setup, run = CASES[name](ctx)
+        times = measure(setup, run, repeat)
+        results[name] = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3),
+                         "runs": len(times)}
+        print(f"{name:32} {results[name]['median_ms']:10.2f} ms  (min {results[name]['min_ms']:.2f})",
+              flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance, floor_ms):
+    """Names of cases whose fastest run is slower than the baseline's beyond tolerance and floor."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        limit = max(base["min_ms"] * (1 + tolerance), base["min_ms"] + floor_ms)
+        if result["min_ms"] > limit:
+            regressions.append((name, base["min_ms"], result["min_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("-k", dest="only", action="append", default=[],
+                    help="run only cases whose name contains this (repeatable)")
+    ap.add_argument("--repeat", type=int, default=MIN_REPEAT, help=f"timed runs per case (at least {MIN_REPEAT})")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                    help="allowed slowdown as a fraction of the baseline's fastest run")
+    ap.add_argument("--floor-ms", type=float, default=DEFAULT_FLOOR_MS,
+                    help="slowdowns smaller than this never fail")
+    ap.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    ap.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+    names = [n for n in CASES if not args.only or any(k in n for k in args.only)]
+    if not names:
+        print(f"no cases match {args.only}")
+        return 2
+
+    if args.repeat < MIN_REPEAT:
+        print(f"--repeat {args.repeat} raised to {MIN_REPEAT}: fewer runs are too noisy to compare")
+        args.repeat = MIN_REPEAT
+
+    os.chdir(ROOT)  # the hymn CSVs and verse store are opened relative to the repo
+    results = run_cases(names, args.repeat)
+
+    if args.update_baseline:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                stored = json.load(f).get("results", {})
+        stored.update(results)  # each case keeps the number of runs it was recorded with
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                                   "processor": platform.machine()},
+                       "results": stored}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.tolerance, args.floor_ms)
+    print()
+    for name, base_ms, now_ms in regressions:
+        print(f"FAIL: {name} min {now_ms:.2f} ms vs baseline {base_ms:.2f} ms (+{(now_ms / base_ms - 1) * 100:.0f}%)")
+    if regressions:
+        return 1
+    print(f"OK: {len(results)} cases within {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
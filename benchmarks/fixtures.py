@@ -0,0 +1,183 @@
+# benchmarks/fixtures.py
+"""
+Synthetic but bulletin-shaped inputs for the benchmarks: service-sheet PDFs
+with any number of pages, Canva-like templates with N slides of M
+placeholders, announcement DOCX files and hymn forms. Everything is built
+in memory from a seeded RNG, so runs are repeatable.
+"""
+import io
+import random
+
+BOOKS = ["Genesis", "Exo", "Isaiah", "Jeremiah", "Romans", "1 Corinthians", "Hebrews", "3 John",
+         "Matthew", "Mark", "Luke", "John", "Acts"]
+ORDER_OF_SERVICE = ["Prelude:", "Invocation: Rev. Sam", "Adoration- RESPONSE (E-40 S.S 23)",
+                    "Confession, Absolution, Thanksgiving:", "Apostles Creed:", "Off. Prayer:",
+                    "Intercessory Prayer:", "Sermon:", "Benediction:", "Threefold Amen:", "Postlude:"]
+NAMES = ["Mr. Samuel D'Souza", "Mrs. Roselin Pinto", "Ms. Grace Shetty", "Mr. John Karkada",
+         "Mrs. Mary Salins", "Mr. Prakash Kotian", "Ms. Esther Amin", "Mr. David Bangera"]
+
+
+def _reference(rng, book=None):
+    chapter = rng.randint(1, 12)
+    start = rng.randint(1, 10)
+    return f"{book or rng.choice(BOOKS)} {chapter}:{start}-{start + rng.randint(2, 12)}"
+
+
+def bulletin_lines(pages, seed=0, lines_per_page=45):
+    """Text of a bulletin as a list of pages, each a list of lines."""
+    rng = random.Random(seed)
+    out = []
+    for page in range(pages):
+        lines = ["U.B.M. CHRISTA KANTHI CHURCH", f"SERVICE {page + 1}", "Organist: Mrs. Roselin"]
+        if page == 0:
+            lines += [
+                f"Hymn: E-{rng.randint(1, 400)} (Vs.1-3)",
+                f"Responsive Psalm: Psalm {rng.randint(1, 150)}:1-{rng.randint(5, 12)}",
+                f"O.T. Bible Reading: {_reference(rng)}",
+                f"N.T. Bible Reading: {_reference(rng, 'Romans')}",
+                f"Gospel Reading: {_reference(rng, rng.choice(['Matthew', 'Mark', 'Luke', 'John']))}",
+            ]
+        while len(lines) < lines_per_page - 14:
+            lines.append("- " + rng.choice(ORDER_OF_SERVICE))
+        lines.append("ANNOUNCEMENTS")
+        for _ in range(6):
+            lines.append(f"Collection for {rng.choice(['the harvest festival', 'the building fund', 'missions'])} "
+                         f"{rng.randint(1, 40)},{rng.randint(100, 999)}/-")
+        lines.append("Happy Birthday")
+        lines += rng.sample(NAMES, 3)
+        lines.append("Happy Anniversary")
+        lines += rng.sample(NAMES, 2)
+        lines.append("THANK YOU")
+        out.append(lines)
+    return out
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_bulletin_pdf(pages=2, seed=0):
+    """A text PDF (Helvetica, one line per row) of a synthetic bulletin, as bytes."""
+    page_lines = bulletin_lines(pages, seed)
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    kids = []
+    for i, lines in enumerate(page_lines):
+        page_obj, content_obj = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page_obj} 0 R")
+        stream = "BT /F1 10 Tf 14 TL 40 800 Td\n" + "\n".join(f"({_pdf_escape(ln)}) '" for ln in lines) + "\nET"
+        data = stream.encode("cp1252", "replace")
+        objects[content_obj] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data)
+        objects[page_obj] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                             f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_obj} 0 R >>").encode()
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = out.tell()
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (num, objects[num]))
+    xref = out.tell()
+    count = max(objects) + 1
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+    for num in range(1, count):
+        out.write(b"%010d 00000 n \n" % offsets[num])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+    return out.getvalue()
+
+
+def template_placeholders(n_hymns=6, verses=8, readings_blocks=6):
+    """Placeholder tokens a full weekly template carries, in slide order."""
+    tokens = ["{WELCOME}", "{PSALMS_DES}"]
+    tokens += [f"{{PSALM_EN_V{v}}}" for v in range(1, readings_blocks + 1)]
+    for prefix, des in (("OT", "{OT_DES}"), ("NT", "{NT_DES}"), ("GOSPEL", "{GOSPEL_DES}")):
+        tokens.append(des)
+        tokens += [f"{{{prefix}_EN_V{v}}}" for v in range(1, readings_blocks + 1)]
+    for h in range(1, n_hymns + 1):
+        tokens.append(f"{{HYMN{h}_DES}}")
+        for v in range(1, verses + 1):
+            tokens += [f"{{HYMN{h}_KN_V{v}}}", f"{{HYMN{h}_EN_V{v}}}"]
+    tokens += ["{ANNOUNCEMENTS_TEXT}", "{ANNOUNCEMENTS_TABLE}", "{BIRTHDAY_NAMES}", "{ANNIVERSARY_NAMES}",
+               "{THANKYOU}"]
+    return tokens
+
+
+def make_template(slides=40, placeholders_per_slide=2, seed=0):
+    """A Canva-like template: every slide has a background picture, a title and placeholder boxes."""
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+
+    rng = random.Random(seed)
+    tokens = template_placeholders()
+    prs = Presentation()
+    prs.slide_width, prs.slide_height = Inches(13.333), Inches(7.5)
+    layout = prs.slide_layouts[6]
+    background = _background_png()
+    for s in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.add_picture(io.BytesIO(background), 0, 0, prs.slide_width, prs.slide_height)
+        title = slide.shapes.add_textbox(Inches(0.5), Inches(0.2), Inches(12), Inches(0.8))
+        title.text_frame.text = f"Sunday service — part {s + 1}"
+        title.text_frame.paragraphs[0].runs[0].font.size = Pt(28)
+        for p in range(placeholders_per_slide):
+            box = slide.shapes.add_textbox(Inches(0.5), Inches(1.2 + p * 6 / placeholders_per_slide),
+                                           Inches(12), Inches(5.5 / placeholders_per_slide))
+            box.text_frame.text = tokens[(s * placeholders_per_slide + p) % len(tokens)]
+        if rng.random() < 0.2:
+            slide.shapes.add_textbox(Inches(10), Inches(7), Inches(3), Inches(0.4)).text_frame.text = "Amen"
+    out = io.BytesIO()
+    prs.save(out)
+    return out.getvalue()
+
+
+def _background_png(size=(320, 180)):
+    """A small gradient PNG standing in for a Canva background image."""
+    import struct
+    import zlib
+
+    w, h = size
+    rows = b"".join(b"\x00" + b"".join(bytes((x * 255 // w, y * 255 // h, 160)) for x in range(w))
+                    for y in range(h))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b""))
+
+
+def make_announcements_docx(items=12, seed=0):
+    """An announcements DOCX with amount lines ("... 25,300/-") and free text."""
+    from docx import Document
+
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_paragraph("ANNOUNCEMENTS")
+    for i in range(items):
+        if i % 3 == 2:
+            doc.add_paragraph(f"Meeting of the {rng.choice(['youth', 'choir', 'women'])} fellowship after service.")
+        else:
+            doc.add_paragraph(f"{rng.choice(['Sunday offering', 'Birthday offering', 'Tithe', 'Donation'])}: "
+                              f"{rng.randint(1, 40)},{rng.randint(100, 999)}/-")
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def make_hymn_form(hymn_db, hymns=4, seed=0):
+    """A form like the upload page posts, picking existing hymn numbers."""
+    rng = random.Random(seed)
+    form = {}
+    for i in range(1, hymns + 1):
+        language = rng.choice(["kannada", "tulu", "english"])
+        numbers = hymn_db.get_available_hymns(language)
+        form[f"hymn{i}_number"] = str(rng.choice(numbers)) if numbers else ""
+        form[f"hymn{i}_language"] = language
+        form[f"hymn{i}_verses"] = rng.choice(["", "1,2", "1-3", "1,3,5"])
+    return form
+
+
+def random_references(count=20, seed=0):
+    rng = random.Random(seed)
+    return [_reference(rng) for _ in range(count)]
@@ -1,97 +1,175 @@
-import pandas as pd
-import re
-from bible_normalize import normalize_book   # use the centralized one
+import logging
+import threading
+from collections import OrderedDict
+from bible_normalize import BOOK_ORDER   # use the centralized one
+from bible_ref import parse_reference, format_segments, PassageFormatError
+from verse_store import load_verse_store, make_key, split_key
+from metrics import timed, register_cache
 
-# Load BSB Excel once
-df = pd.read_excel("bsb.xlsx", header=2)
+log = logging.getLogger(__name__)
 
-def fetch_bible_passage(passage: str, lang: str = 'en'):
+# Compiled verse store (bible.verses, every available translation), opened on first use
+_store = None
+
+def get_verse_store():
+    global _store
+    if _store is None:
+        _store = load_verse_store()
+    return _store
+
+# Lectionary readings repeat, and every bulletin asks for the same passages
+# twice (parse_pdf_to_structured and build_mapping_wrapper), so resolved
+# passages are memoized on their translation plus normalized (book, segments) key.
+PASSAGE_CACHE_SIZE = 512
+_passage_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+def passage_cache_info():
+    """Hit/miss counters of the shared passage cache."""
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_passage_cache), maxsize=PASSAGE_CACHE_SIZE)
+
+def _cache_get(key):
+    with _cache_lock:
+        blocks = _passage_cache.get(key)
+        if blocks is None:
+            _cache_stats["misses"] += 1
+        else:
+            _cache_stats["hits"] += 1
+            _passage_cache.move_to_end(key)
+        return blocks
+
+def _cache_put(key, blocks):
+    with _cache_lock:
+        _passage_cache[key] = blocks
+        _passage_cache.move_to_end(key)
+        while len(_passage_cache) > PASSAGE_CACHE_SIZE:
+            _passage_cache.popitem(last=False)
+
+register_cache("passages", passage_cache_info)
+
+def _parse_passage(passage: str):
     """
-    Fetch Bible passage text from bsb.xlsx.
-    Returns a list of text blocks, each containing up to 3 verses.
+    Parse a reference such as "Genesis 1:1-4", "John 3:16-4:2" or
+    "Psalm 103:1-5, 8-12" (see bible_ref.py).
+    Returns the normalized cache key (book_no, segments), or an error block string.
     """
-    if not passage:
-        return []
-    
     try:
-        passage_pattern = re.search(r'([1-3]?\s?[A-Za-z\.]+\.?\s*\d+:\d+(-\d+)?)', passage)
-        if passage_pattern:
-            passage_to_parse = passage_pattern.group(1)
-        else:
-            passage_to_parse = passage.strip()
-
-
-        # Parse input like "Genesis 1:1-4" or "Psalm 103:1-8"
-        match = re.match(r"([1-3]?\s?[A-Za-z\.]+)\s+(\d+)(?::(\d+)(?:-(\d+))?)?", passage_to_parse)
-        if not match:
-            return [f"[Invalid passage format: {passage}]"]
-    
-        book, chapter, start_verse, end_verse = match.groups()
-        normalized_book = normalize_book(book)   # ✅ standardized book name
-        chapter = int(chapter)
-        start_verse = int(start_verse) if start_verse else 1
-        end_verse = int(end_verse) if end_verse else start_verse
-        
-        # --- Identify columns ---
-        verse_column = None
-        text_column = None
-        
-        if "Verse" in df.columns:
-            verse_column = "Verse"
-        elif len(df.columns) > 1:
-            verse_column = df.columns[1]
-            
-        if "Berean Standard Bible" in df.columns:
-            text_column = "Berean Standard Bible"
+        ref = parse_reference(passage)
+    except PassageFormatError as e:
+        return f"[{e}]"
+    if not ref.book_no:
+        return f"[No verses found for book '{ref.book}' chapter {ref.segments[0][0][0]}]"
+    return ref.book_no, ref.segments
+
+def _format_blocks(key, verses, lang="en"):
+    """
+    Blocks of up to 3 verses for one resolved reference (immutable, cacheable).
+    Blocks are cut on the shared verse index, so block N covers the same
+    verses in every translation; verses a translation lacks ("") are left
+    out of its blocks, and a translation lacking all of them gets no blocks.
+    """
+    book_no, segments = key
+    if verses and not any(txt for _, txt in verses):
+        # the verses exist in another translation: leave this one's placeholders empty
+        log.warning("no '%s' text for %s %s", lang, BOOK_ORDER[book_no - 1], format_segments(segments))
+        return ()
+    if not verses:
+        chapter = segments[0][0][0]
+        if not get_verse_store().has_chapter(book_no, chapter):
+            return (f"[No verses found for book '{BOOK_ORDER[book_no - 1]}' chapter {chapter}]",)
+        return (f"[No verses found for {BOOK_ORDER[book_no - 1]} {format_segments(segments)}]",)
+
+    # Verses are numbered as before; the first verse of any later chapter
+    # gets a "chapter:verse" label so cross-chapter readings stay readable.
+    verse_texts = []
+    prev_chapter = split_key(verses[0][0])[1]
+    for k, txt in verses:
+        _, chapter, verse = split_key(k)
+        label = f"{chapter}:{verse}" if chapter != prev_chapter else f"{verse}"
+        prev_chapter = chapter
+        verse_texts.append(f"{label} {txt}" if txt else "")
+
+    # Split into blocks of 3 verses each
+    verses_per_block = 3
+    return tuple("\n".join(filter(None, verse_texts[i:i + verses_per_block]))
+                 for i in range(0, len(verse_texts), verses_per_block))
+
+@timed("bible_fetch")
+def fetch_parallel_passages(refs, langs=("en",)):
+    """
+    Resolve a service's readings in several translations at once.
+
+    Every reference is parsed up front; those not already cached in every
+    requested translation are then resolved together in one ordered sweep
+    over the shared verse index, reading the same slice from each
+    translation. Returns {lang: [blocks per reference, in the order given]};
+    a translation missing from the verse store, or lacking a passage, gives
+    no blocks for it (logged), so its placeholders stay empty.
+    """
+    results = {lang: [[] for _ in refs] for lang in langs}
+    store_langs = get_verse_store().translations
+    available = [lang for lang in langs if lang in store_langs]
+    missing = [lang for lang in langs if lang not in store_langs]
+    if missing and any(refs):
+        log.warning("no %s Bible translation in the verse store", ", ".join(f"'{lang}'" for lang in missing))
+
+    pending = {}  # normalized key -> indexes into refs
+    for i, passage in enumerate(refs):
+        if not passage or not available:
+            continue
+        try:
+            key = _parse_passage(passage)
+        except Exception as e:
+            for lang in available:
+                results[lang][i] = [f"[Error fetching {passage}: {str(e)}]"]
+            continue
+        if isinstance(key, str):
+            for lang in available:
+                results[lang][i] = [key]
+            continue
+        cached = {lang: _cache_get((lang, key)) for lang in available}
+        if all(blocks is not None for blocks in cached.values()):
+            for lang, blocks in cached.items():
+                results[lang][i] = list(blocks)
         else:
-            bible_cols = [col for col in df.columns if 'Bible' in str(col)]
-            if bible_cols:
-                text_column = bible_cols[0]
-            elif len(df.columns) > 2:
-                text_column = df.columns[2]
-        
-        if not verse_column or not text_column:
-            return [f"[Could not identify verse/text columns. Available: {df.columns.tolist()}]"]
-        
-        # --- Build references like "Psalm 103:1" ---
-        verse_refs = [f"{normalized_book} {chapter}:{i}" for i in range(start_verse, end_verse+1)]
-        
-        verses = df[df[verse_column].isin(verse_refs)]
-        
-        if verses.empty:
-            similar_verses = df[df[verse_column].str.contains(f"{normalized_book} {chapter}:", na=False)].head(5)
-            if not similar_verses.empty:
-                available = similar_verses[verse_column].tolist()
-                return [f"[No verses found for {passage}. Available verses like: {', '.join(available)}]"]
-            else:
-                sample_verses = df[verse_column].dropna().head(10).tolist()
-                return [f"[No verses found for book '{normalized_book}' chapter {chapter}. Sample verses in file: {sample_verses}]"]
-
-        # --- Format result into blocks ---
-        # Sort verses by verse number to ensure proper order
-        verses = verses.copy()
-        verses['verse_num'] = verses[verse_column].apply(lambda ref: int(re.search(r":(\d+)$", ref).group(1)) if re.search(r":(\d+)$", ref) else 0)
-        verses = verses.sort_values(by='verse_num')
-        
-        verse_texts = []
-        for _, v in verses.iterrows():
-            verse_ref = v[verse_column]  # e.g., "Psalm 103:1"
-            txt = str(v[text_column]).strip()
-            
-            if txt and txt.lower() != 'nan':
-                verse_num = verse_ref.split(":")[-1]   # only the verse number
-                verse_texts.append(f"{verse_num} {txt}")
-        
-        # Split into blocks of 3 verses each
-        verses_per_block = 3
-        blocks = []
-        for i in range(0, len(verse_texts), verses_per_block):
-            block_verses = verse_texts[i:i + verses_per_block]
-            block_content = "\n".join(block_verses)
-            blocks.append(block_content)
-        
-        return blocks
-        
-    except Exception as e:
-        import traceback
-        return [f"[Error fetching {passage}: {str(e)}]"]
\ No newline at end of file
+            pending.setdefault(key, []).append(i)
+
+    if pending:
+        keys = list(pending)
+        # every segment of every reference is one contiguous ordinal range
+        ranges = [(make_key(book_no, c1, v1), make_key(book_no, c2, v2))
+                  for book_no, segments in keys for (c1, v1), (c2, v2) in segments]
+        try:
+            rows = iter(get_verse_store().read_aligned(ranges, available))
+        except Exception as e:
+            for key in keys:
+                for i in pending[key]:
+                    for lang in available:
+                        results[lang][i] = [f"[Error fetching {refs[i]}: {str(e)}]"]
+            return results
+        for key in keys:
+            verses = [row for _ in key[1] for row in next(rows)]
+            for n, lang in enumerate(available):
+                blocks = _format_blocks(key, [(k, texts[n]) for k, texts in verses], lang)
+                _cache_put((lang, key), blocks)
+                for i in pending[key]:
+                    results[lang][i] = list(blocks)
+
+    return results
+
+def fetch_bible_passages(refs, lang: str = 'en'):
+    """
+    Batch version of fetch_bible_passage for all of a service's readings.
+    Returns one list of blocks per reference, in the order given.
+    """
+    return fetch_parallel_passages(refs, (lang,))[lang]
+
+def fetch_bible_passage(passage: str, lang: str = 'en'):
+    """
+    Fetch Bible passage text in one translation ('en', 'kn', ... see
+    verse_store.TRANSLATIONS) from the compiled verse store.
+    Returns a list of text blocks, each containing up to 3 verses.
+    """
+    return fetch_bible_passages([passage], lang)[0]
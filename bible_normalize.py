@@ -1,5 +1,8 @@
 # bible_normalize.py
 import re
+import unicodedata
+
+from kannada_bible_map import ENGLISH_TO_KANNADA_BOOKS
 
 # Master normalization map (abbreviations → standard English book name)
 BOOK_NORMALIZATION = {
@@ -88,9 +91,99 @@ BOOK_NORMALIZATION = {
     "rev": "Revelation", "revelation": "Revelation", "apocalypse": "Revelation",
 }
 
+# Canonical book order; a book's ordinal is its 1-based position in this tuple
+BOOK_ORDER = (
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
+    "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
+    "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther",
+    "Job", "Psalm", "Proverbs", "Ecclesiastes", "Song of Solomon",
+    "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel",
+    "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
+    "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi",
+    "Matthew", "Mark", "Luke", "John", "Acts",
+    "Romans", "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians",
+    "Philippians", "Colossians", "1 Thessalonians", "2 Thessalonians",
+    "1 Timothy", "2 Timothy", "Titus", "Philemon", "Hebrews",
+    "James", "1 Peter", "2 Peter", "1 John", "2 John", "3 John", "Jude",
+    "Revelation",
+)
+BOOK_ORDINALS = {name: i for i, name in enumerate(BOOK_ORDER, 1)}
+
+# --- Book-name automaton -----------------------------------------------------
+# A character trie over every alias in BOOK_NORMALIZATION, the canonical names,
+# roman-numeral forms ("I Jn", "II Cor") and the Kannada names, built once at
+# import. Dots and spaces are ignored while walking, so "1 Cor.", "1cor" and
+# "I Cor" all follow the same path; the walk keeps the longest alias that ends
+# on a word boundary and yields the book ordinal in a single pass.
+_ROMAN = {"1": "i", "2": "ii", "3": "iii"}
+_SKIP = " \t.\u00a0"
+_END = ""  # trie key holding the book ordinal
+
+def _trie_key(alias: str) -> str:
+    return "".join(ch for ch in alias.lower() if ch not in _SKIP)
+
+def _alias_table():
+    """Every alias -> ordinal. Explicit BOOK_NORMALIZATION entries win on clashes."""
+    aliases = {}
+    for name, ordinal in BOOK_ORDINALS.items():
+        aliases[_trie_key(name)] = ordinal
+    for alias, name in BOOK_NORMALIZATION.items():
+        aliases[_trie_key(alias)] = BOOK_ORDINALS[name]
+    for name, kn_name in ENGLISH_TO_KANNADA_BOOKS.items():
+        aliases.setdefault(_trie_key(kn_name), BOOK_ORDINALS[BOOK_NORMALIZATION.get(name.lower(), name)])
+    for key, ordinal in list(aliases.items()):
+        if key[0] in _ROMAN and key[1:2].isalpha():
+            aliases.setdefault(_ROMAN[key[0]] + key[1:], ordinal)
+    return aliases
+
+def _build_trie(aliases):
+    root = {}
+    for key, ordinal in aliases.items():
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_END] = ordinal
+    return root
+
+BOOK_TRIE = _build_trie(_alias_table())
+
+def is_word_char(ch: str) -> bool:
+    # Kannada vowel signs are combining marks, not alphanumerics
+    return ch.isalpha() or unicodedata.category(ch)[0] == "M"
+
+def match_book(text: str, pos: int = 0):
+    """
+    Match a book name starting at text[pos].
+    Returns (ordinal, end) for the longest alias ending on a word boundary,
+    or (None, pos) if no book name starts there.
+    """
+    node = BOOK_TRIE
+    best = (None, pos)
+    i, n = pos, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in _SKIP and i > pos:
+            i += 1
+            continue
+        node = node.get(ch.lower())
+        if node is None:
+            break
+        i += 1
+        if _END in node and (i == n or not is_word_char(text[i])):
+            best = (node[_END], i)
+    return best
+
+def book_ordinal(book: str):
+    """Canonical ordinal (1-66) of a book name/abbr/Kannada name, or None."""
+    if not book:
+        return None
+    text = book.strip().rstrip(".").strip()
+    ordinal, end = match_book(text)
+    return ordinal if ordinal and end == len(text) else None
+
 def normalize_book(book: str) -> str:
     """Normalize any Bible book name/abbr → Standard English form."""
     if not book:
         return ""
-    key = book.lower().replace(".", "").strip()
-    return BOOK_NORMALIZATION.get(key, book.strip().capitalize())
+    ordinal = book_ordinal(book)
+    return BOOK_ORDER[ordinal - 1] if ordinal else book.strip().capitalize()
@@ -0,0 +1,211 @@
+# bible_ref.py
+"""
+Bible reference grammar.
+
+Understands the forms used in our lectionary and bulletins:
+    "Genesis 1:1-4"            single range
+    "John 3:16-4:2"            range crossing a chapter boundary
+    "Psalm 103:1-5, 8-12"      several ranges in one chapter
+    "Isaiah 40:1-11; 41:10"    several chapters
+    "Psalm 23"  "Ruth 1-2"     whole chapters
+    "3 John 1-15"  "Jude 3"    verses of a single-chapter book
+    "Psalm 23 and 24"          "and" / "&" read like a comma
+    "John 3: 16"               spaces around the colon
+    "Luke 2:1-14 (15-20)"      optional verses in brackets are not read
+
+parse_reference() turns a reference into a book ordinal plus a list of
+((chapter, verse), (chapter, verse)) segments, each of which is one
+contiguous ordinal range in the verse store.
+"""
+import re
+from collections import namedtuple
+
+from bible_normalize import BOOK_ORDER, match_book, normalize_book, is_word_char
+
+# Verse number used for "to the end of the chapter"
+END_OF_CHAPTER = 0x3FF
+
+SINGLE_CHAPTER_BOOKS = {"Obadiah", "Philemon", "2 John", "3 John", "Jude"}
+
+DASHES = "-‐‑‒–—"
+_DASH = "[" + re.escape(DASHES) + "]"
+
+# Fallback for unknown books, only used to word error messages ("Foo 1:1")
+BOOK_RE = re.compile(r"((?:[1-3]|i{1,3})?\s?[a-z][a-z.]*(?:\s+of\s+[a-z]+)?)\.?\s*(?=\d)", re.I)
+
+# Numeric part of a reference: "3:16-4:2", "103:1-5, 8-12", "40:1-11; 41:10", "23 and 24"
+_NUM = r"\d{1,3}(?:\s*:\s*\d{1,3})?"
+_RANGE = rf"{_NUM}(?:\s*{_DASH}\s*{_NUM})?"
+_AND = r"(?i:and)\b|&"
+CHAPTER_VERSES = rf"{_RANGE}(?:(?:\s*[,;&]|\s+(?i:and))\s*{_RANGE})*"
+# numbers right after a book name; "Psalm: 47:1-7" is written in bulletins
+_AFTER_BOOK_RE = re.compile(rf"[\s.:]*({CHAPTER_VERSES})")
+
+# "Luke 2:1-14 (15-20)": lectionaries bracket optional verses
+_BRACKETED_RE = re.compile(r"\([^()]*\)|\[[^\[\]]*\]")
+
+_TOKEN_RE = re.compile(rf"\s*(?:(\d+)|([:,;]|{_DASH}|{_AND}))")
+
+PassageRef = namedtuple("PassageRef", "book book_no segments")
+FoundReference = namedtuple("FoundReference", "book_no start book_end end numbers")
+
+
+class PassageFormatError(ValueError):
+    """Raised for text that is not a Bible reference we can resolve."""
+
+
+def find_reference(text: str, pos: int = 0, require_verse: bool = False):
+    """
+    Scan text for the first known book name (via the book automaton in
+    bible_normalize) followed by chapter/verse numbers.
+
+    With require_verse, the numbers must contain a chapter:verse, except for
+    single-chapter books; this keeps stray numbers in bulletin lines out.
+    Returns a FoundReference, or None.
+    """
+    text = text or ""
+    prev_word = False
+    for i in range(pos, len(text)):
+        word = is_word_char(text[i]) or text[i].isdigit()
+        if word and not prev_word:
+            book_no, book_end = match_book(text, i)
+            if book_no:
+                m = _AFTER_BOOK_RE.match(text, book_end)
+                if m and (not require_verse or ":" in m.group(1)
+                          or BOOK_ORDER[book_no - 1] in SINGLE_CHAPTER_BOOKS):
+                    return FoundReference(book_no, i, book_end, m.end(), m.group(1))
+        prev_word = word
+    return None
+
+
+def search_reference(text: str):
+    """The first chapter:verse reference in a line of text, as a string (or None)."""
+    found = find_reference(text, require_verse=True)
+    return text[found.start:found.end] if found else None
+
+
+def split_reference(text: str):
+    """
+    Find the reference in text and split it into (book text, numeric part).
+    Returns (None, None) when there is no book name followed by a number.
+    """
+    found = find_reference(text)
+    if found:
+        return text[found.start:found.book_end], found.numbers
+    for m in BOOK_RE.finditer(text or ""):
+        rest = re.match(CHAPTER_VERSES, text[m.end():])
+        if rest:
+            return m.group(1).strip(), rest.group(0).strip()
+    return None, None
+
+
+def _tokens(numbers: str):
+    pos = 0
+    while pos < len(numbers):
+        m = _TOKEN_RE.match(numbers, pos)
+        if not m:
+            break
+        pos = m.end()
+        if m.group(1):
+            yield int(m.group(1))
+        else:
+            sep = m.group(2)
+            if sep in DASHES:
+                yield "-"
+            elif sep == "&" or sep.lower() == "and":
+                yield ","
+            else:
+                yield sep
+
+
+def parse_segments(numbers: str, single_chapter: bool = False):
+    """
+    Parse the numeric part of a reference into
+    [((chapter, verse), (chapter, verse)), ...] inclusive segments.
+    """
+    toks = list(_tokens(numbers))
+    segments = []
+    chapter = 1 if single_chapter else None
+    verse_context = single_chapter  # False after a whole-chapter item
+    after = ";"  # separator before the current item
+    i = 0
+
+    def take_number():
+        nonlocal i
+        if i >= len(toks) or not isinstance(toks[i], int):
+            raise PassageFormatError(f"expected a number in '{numbers}'")
+        i += 1
+        return toks[i - 1]
+
+    while i < len(toks):
+        a = take_number()
+        whole_chapter = False
+        if i < len(toks) and toks[i] == ":":
+            i += 1
+            chapter = a
+            start = (a, take_number())
+        elif verse_context and (after == "," or single_chapter):
+            start = (chapter, a)
+        else:
+            chapter = a
+            start = (a, 1)
+            whole_chapter = True
+        verse_context = single_chapter or not whole_chapter
+
+        end = (start[0], END_OF_CHAPTER) if whole_chapter else start
+        if i < len(toks) and toks[i] == "-":
+            i += 1
+            b = take_number()
+            if i < len(toks) and toks[i] == ":":
+                i += 1
+                chapter = b
+                end = (b, take_number())
+            elif whole_chapter:
+                chapter = b
+                end = (b, END_OF_CHAPTER)
+            else:
+                end = (start[0], b)
+
+        if end < start:
+            raise PassageFormatError(f"range runs backwards in '{numbers}'")
+        segments.append((start, end))
+
+        if i < len(toks):
+            if toks[i] not in (",", ";"):
+                raise PassageFormatError(f"unexpected '{toks[i]}' in '{numbers}'")
+            after = toks[i]
+            i += 1
+
+    if not segments:
+        raise PassageFormatError(f"no chapter or verse in '{numbers}'")
+    return segments
+
+
+def parse_reference(text: str) -> PassageRef:
+    """Parse a reference such as 'Isaiah 40:1-11; 41:10' into a PassageRef."""
+    found = find_reference(text)
+    if found:
+        if any(c.isdigit() for c in _BRACKETED_RE.sub("", text[found.end:])):
+            # "Psalm 23 or 24": don't quietly resolve just the first part
+            raise PassageFormatError(f"unexpected '{text[found.end:].strip()}' in '{text}'")
+        book_no, book, numbers = found.book_no, BOOK_ORDER[found.book_no - 1], found.numbers
+    else:
+        book_text, numbers = split_reference(text)
+        if not book_text:
+            raise PassageFormatError(f"Invalid passage format: {text}")
+        book_no, book = None, normalize_book(book_text)
+    segments = parse_segments(numbers, single_chapter=book in SINGLE_CHAPTER_BOOKS and ":" not in numbers)
+    return PassageRef(book, book_no, tuple(segments))
+
+
+def format_segments(segments) -> str:
+    """Render parsed segments back as text, e.g. '40:1-11; 41:10'."""
+    parts = []
+    for (c1, v1), (c2, v2) in segments:
+        if v1 == 1 and v2 == END_OF_CHAPTER:
+            parts.append(f"{c1}" if c1 == c2 else f"{c1}-{c2}")
+        elif c1 == c2:
+            parts.append(f"{c1}:{v1}" if v1 == v2 else f"{c1}:{v1}-{v2}")
+        else:
+            parts.append(f"{c1}:{v1}-{c2}:{v2}")
+    return "; ".join(parts)
@@ -1,6 +1,6 @@
 # build_helpers.py
 from parse_pdf import parse_pdf_to_structured
-from bible_fetch import fetch_bible_passage
+from bible_fetch import fetch_parallel_passages, get_verse_store
 from hymns_db import HymnDatabase, get_hymn_verses
 import re
 
@@ -14,9 +14,13 @@ def build_mapping_wrapper(parsed: dict, hymn_db: "HymnDatabase"):
       {WELCOME},
       {HYMN1_KN_V1}, {HYMN1_EN_V1}, {HYMN1_KN_V2}, ...
        {PSALM_EN_V1}, ...
-      {OT_EN}, {NT_EN}, {GOSPEL_EN}, etc.
+      {OT_EN_V1}, {NT_EN_V1}, {GOSPEL_EN_V1}, etc.
+      {PSALM_KN_V1}, {OT_KN_V1}, ... (Kannada text, when a Kannada Bible is installed)
       {ANNOUNCEMENTS_TEXT}, {ANNOUNCEMENTS_TABLE}
       {BIRTHDAY_NAMES}, {ANNIVERSARY_NAMES}, {SERMON}, {THANKYOU}
+    Instead of one slide per verse, a template may have a single prototype
+    slide per section using {PSALM_EN_V*}, {HYMN1_KN_V*} etc.; generate_ppt
+    repeats it for every verse block filled here.
     """
     mapping = {}
     # welcome
@@ -54,19 +58,17 @@ def build_mapping_wrapper(parsed: dict, hymn_db: "HymnDatabase"):
         for vnum, txt in verses_en.items():
             mapping[f'{{HYMN{i}_EN_V{vnum}}}'] = txt
 
-    def populate_verse_blocks(passage_key, placeholder_prefix):
-        if not parsed.get(passage_key):
-            return
-        
-        blocks = fetch_bible_passage(parsed[passage_key], 'en')
-        for idx, block in enumerate(blocks):
-            mapping[f'{{{placeholder_prefix}_EN_V{idx+1}}}'] = block
-    
-    populate_verse_blocks('psalm', 'PSALM')
-    populate_verse_blocks('old_testament', 'OT')  
-    populate_verse_blocks('new_testament', 'NT')
-    populate_verse_blocks('gospel', 'GOSPEL')
-    
+    # All four readings are resolved in one batch, in every translation of the
+    # verse store ({OT_EN_V1}, {OT_KN_V1}, ...); parse_pdf_to_structured already
+    # fetched the English text, so that comes from bible_fetch's passage cache
+    readings = [('psalm', 'PSALM'), ('old_testament', 'OT'), ('new_testament', 'NT'), ('gospel', 'GOSPEL')]
+    langs = get_verse_store().translations
+    passages = fetch_parallel_passages([parsed.get(key) or "" for key, _ in readings], langs)
+    for lang in langs:
+        for (_, placeholder_prefix), blocks in zip(readings, passages[lang]):
+            for idx, block in enumerate(blocks):
+                mapping[f'{{{placeholder_prefix}_{lang.upper()}_V{idx+1}}}'] = block
+
     # announcements
     mapping['{ANNOUNCEMENTS_TEXT}'] = parsed.get('announcements_block','(No announcements provided)')
     # build simple announcements table rows from announcements_block lines
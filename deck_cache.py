@@ -0,0 +1,220 @@
+# deck_cache.py
+"""
+Content-addressed cache of finished decks.
+
+A deck is fully determined by the uploaded files, the hymn form and the
+code and data that build it, so deck_key() hashes exactly those and a
+repeated submission is served from disk without parsing or rendering.
+Entries are <key>.pptx files in DECK_CACHE_DIR; the directory is kept under
+DECK_CACHE_MB by evicting least recently used decks (DECK_CACHE_MB=0
+turns the cache off). Several worker processes may share the directory:
+each put() rescans it under a file lock (DECK_CACHE_DIR/.lock), so the
+limit holds for the directory as a whole, and recency is the files' mtime.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the threads of one process are serialized
+    fcntl = None
+
+from generate_ppt import fit_font_families
+from metrics import register_cache
+from template_media import OPTIMIZE_MEDIA, settings_key
+from textfit import FIT_TEXT, font_fingerprint
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DECK_CACHE_DIR = os.environ.get("DECK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "church_ppt_decks"))
+DECK_CACHE_MB = int(os.environ.get("DECK_CACHE_MB", "256"))
+
+# Everything a deck depends on besides the request itself
+CODE_FILES = ("pipeline.py", "parse_pdf.py", "build_helpers.py", "generate_ppt.py", "pptx_writer.py",
+              "textfit.py", "hymns_db.py", "bible_fetch.py", "bible_ref.py", "bible_normalize.py",
+              "verse_store.py", "kannada_bible_map.py", "parse_announcements.py", "template_media.py")
+DATA_FILES = ("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv", "bible.verses")
+
+HYMN_FIELD_RE = re.compile(r"^hymn(\d+)_(number|verses|language)$")
+CHUNK = 1 << 20
+
+_code_version_hash = None
+
+
+def _code_version():
+    """Hash of the pipeline source, media and fitting settings, computed once."""
+    global _code_version_hash
+    if _code_version_hash is None:
+        h = hashlib.sha256()
+        for name in CODE_FILES:
+            with open(os.path.join(HERE, name), "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+        h.update(("media=" + (settings_key() if OPTIMIZE_MEDIA else "off")).encode())
+        # fitted decks depend on the font files the families resolve to
+        h.update(("fit=" + (font_fingerprint(fit_font_families()) if FIT_TEXT else "off")).encode())
+        _code_version_hash = h.hexdigest()
+    return _code_version_hash
+
+
+def build_version():
+    """
+    _code_version() plus the data files' sizes and mtimes. Those are read on
+    every call: bible.verses may be recompiled by the warm-up (or replaced
+    later), and a key taken before that must not stand for decks built after.
+    """
+    h = hashlib.sha256(_code_version().encode())
+    for name in DATA_FILES:
+        path = os.path.join(HERE, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{name}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def normalize_form(form):
+    """The form fields that affect a deck, normalized so cosmetic differences hash alike."""
+    hymns = {}
+    for key, value in form.items():
+        m = HYMN_FIELD_RE.match(key)
+        if m:
+            hymns.setdefault(int(m.group(1)), {})[m.group(2)] = str(value).strip()
+    fields = []
+    for i in sorted(hymns):
+        fields_i = hymns[i]
+        number = fields_i.get("number", "")
+        if not number:
+            continue  # process_user_hymns skips hymns without a number
+        try:
+            number = str(int(number))
+        except ValueError:
+            pass
+        verses = re.sub(r"\s+", "", fields_i.get("verses", ""))
+        language = (fields_i.get("language") or "kannada").lower()
+        fields.append(f"hymn{i}={number}|{verses}|{language}")
+    fields.append("style_profile=" + str(form.get("style_profile") or "").strip())
+    return "\n".join(fields)
+
+
+def _update_from(h, data):
+    """Feed bytes or a seekable binary file into h; files are rewound afterwards."""
+    if data is None:
+        h.update(b"-")
+        return
+    if isinstance(data, (bytes, bytearray)):
+        h.update(data)
+        h.update(b":%d" % len(data))
+        return
+    data.seek(0)
+    size = 0
+    for chunk in iter(lambda: data.read(CHUNK), b""):
+        h.update(chunk)
+        size += len(chunk)
+    h.update(b":%d" % size)
+    data.seek(0)
+
+
+def deck_key(pdf, template, announcements, form):
+    """Cache key for one build; pdf/template/announcements are bytes or files (or None)."""
+    h = hashlib.sha256(build_version().encode())
+    for data in (pdf, template, announcements):
+        h.update(b"\0")
+        _update_from(h, data)
+    h.update(b"\0" + normalize_form(form).encode("utf-8"))
+    return h.hexdigest()
+
+
+class DeckCache:
+    def __init__(self, directory=DECK_CACHE_DIR, max_mb=DECK_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._count = 0  # entries and bytes as of this process's last put()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pptx")
+
+    @contextmanager
+    def _directory_lock(self):
+        """Serialize changes to the directory across threads and processes."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, ".lock"), "a") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)  # released when f is closed
+                yield
+
+    def _scan(self):
+        """[(mtime_ns, key, size), ...] of the decks in the directory, least recently used first."""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pptx"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # removed meanwhile
+                found.append((st.st_mtime_ns, entry.name[:-5], st.st_size))
+        return sorted(found)
+
+    def get(self, key):
+        """Deck bytes for key, or None."""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))  # most recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store a finished deck and evict least recently used ones over the limit."""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        try:
+            with self._directory_lock():
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+                entries = self._scan()
+                total = sum(size for _, _, size in entries)
+                count = len(entries)
+                for _, old_key, old_size in entries:
+                    if total <= self.max_bytes:
+                        break
+                    if old_key == key:
+                        continue
+                    try:
+                        os.remove(self._path(old_key))
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        continue
+                    total -= old_size
+                    count -= 1
+                self._count, self._size = count, total
+        except OSError:
+            return
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": self._count, "bytes": self._size}
+
+
+deck_cache = DeckCache()
+register_cache("decks", deck_cache.info)
@@ -1,9 +1,21 @@
 # generate_ppt.py
-from pptx import Presentation
-from pptx.util import Pt
+# python-pptx is imported inside the functions that need it so that importing
+# this module (and app.py) does not pay for it at start-up.
+import copy
+import hashlib
+import io
 import re
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
 
 import fnmatch
+
+from metrics import timed, register_cache
+from pptx_writer import TemplateSource, save_presentation
+from template_media import OPTIMIZE_MEDIA, optimized_template
+from textfit import FIT_TEXT, box_for_shape, fit_font_size, fits, pack
+
 FONT_STYLES = {
     "{ANNOUNCEMENTS_TEXT}": {"font_name": "Calibri (MS)", "font_size_pt": 24},
     "{PSALMS_DES}": {"font_name": "Times New Roman MT", "font_size_pt": 60},
@@ -14,22 +26,75 @@ FONT_STYLES = {
     "OT_EN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50}, 
     "NT_EN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50}, 
     "GOSPEL_EN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50}, 
+    "PSALM_KN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50},
+    "OT_KN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50},
+    "NT_KN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50},
+    "GOSPEL_KN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 50},
     "HYMN*_DES": {"font_name": "Times New Roman MT", "font_size_pt": 60}, 
     #"HYMN*_KN_V*": {"font_name": "Noto Sans Kannada MT", "font_size_pt": 55},
     "HYMN*_KN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 55},
     "HYMN*_EN_V*": {"font_name": "Calibri (MS)", "font_size_pt": 55},           
 }
 
-def get_font_style_for_placeholder(ph):
+# Style profiles override FONT_STYLES entries (same keys and wildcards) for a
+# kind of template. A template picks its profile with "style_profile=<name>"
+# in its document keywords (File > Info > Tags), or the caller passes one.
+STYLE_PROFILES = {
+    "default": {},
+}
+
+def compile_styles(styles):
+    """
+    Compile a FONT_STYLES-shaped dict into (exact lookups, wildcard regex).
+    The wildcards become one alternation with a named group per pattern, so
+    resolving a placeholder is one match instead of an fnmatch per pattern.
+    """
+    exact = {}
+    wildcards = []
+    for pattern, style in styles.items():
+        if "*" in pattern:
+            wildcards.append((pattern, style))
+        else:
+            exact[pattern] = style
+    if not wildcards:
+        return exact, None, []
+    # fnmatch.translate gives "(?s:...)\Z"; the first pattern in dict order wins
+    alternation = "|".join(f"(?P<p{i}>{fnmatch.translate(pattern)})" for i, (pattern, _) in enumerate(wildcards))
+    return exact, re.compile(alternation), [style for _, style in wildcards]
+
+@lru_cache(maxsize=None)
+def _compiled_profile(profile):
+    styles = dict(FONT_STYLES)
+    styles.update(STYLE_PROFILES.get(profile) or {})
+    return compile_styles(styles)
+
+@lru_cache(maxsize=4096)
+def get_font_style_for_placeholder(ph, profile="default"):
     """Get font style dictionary for a placeholder, supporting wildcards."""
-    if ph in FONT_STYLES:
-        return FONT_STYLES[ph]
-    for pattern, style in FONT_STYLES.items():
-        if "*" in pattern and fnmatch.fnmatch(ph.strip("{}"), pattern):
-            return style
+    exact, wildcard_re, wildcard_styles = _compiled_profile(profile)
+    if ph in exact:
+        return exact[ph]
+    m = wildcard_re.match(ph.strip("{}")) if wildcard_re else None
+    if m:
+        return wildcard_styles[int(m.lastgroup[1:])]
     return {}
 
+def fit_font_families(kannada_font="Noto Sans Kannada", english_font="Arial"):
+    """Every font family measured fitting may set text in."""
+    names = {kannada_font, english_font}
+    for styles in (FONT_STYLES, *STYLE_PROFILES.values()):
+        names.update(style["font_name"] for style in styles.values() if style.get("font_name"))
+    return sorted(names)
+
+def register_style_profile(name, overrides):
+    """Add or replace a style profile and drop memoized style lookups."""
+    STYLE_PROFILES[name] = dict(overrides)
+    _compiled_profile.cache_clear()
+    get_font_style_for_placeholder.cache_clear()
+
 def set_text_frame_text(tf, text, font_name=None, font_size_pt=None):
+    from pptx.util import Pt
+
     tf.clear()
     lines = text.splitlines() if text else ['']
     for i, ln in enumerate(lines):
@@ -48,26 +113,359 @@ def set_text_frame_text(tf, text, font_name=None, font_size_pt=None):
 # Simple check for Kannada characters
 KANNADA_UNICODE_RANGE = re.compile(r'[\u0C80-\u0CFF]')
 
-def replace_placeholders(prs, mapping, kannada_font="Noto Sans Kannada", english_font="Arial"):
-    for slide in prs.slides:
-        for shape in slide.shapes:
+# --- Template index -------------------------------------------------------------
+# A template is scanned once for its {PLACEHOLDER} tokens; filling a deck is
+# then a lookup per placeholder location instead of testing every mapping key
+# against every shape. Indexes are cached by the template's sha256, since the
+# same Canva template is uploaded week after week.
+
+PLACEHOLDER_RE = re.compile(r"\{[^{}\s]+\}")
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+ANNOUNCEMENTS_TABLE = "{ANNOUNCEMENTS_TABLE}"
+
+# shapes: [(slide_idx, shape_idx, (token, ...)), ...] in document order
+# placeholders: token -> [(slide_idx, shape_idx), ...]
+# style_profile: profile named in the template's keywords, or None
+TemplateIndex = namedtuple("TemplateIndex", "digest shapes placeholders style_profile")
+
+STYLE_PROFILE_RE = re.compile(r"style_profile\s*[=:]\s*([\w-]+)")
+
+TEMPLATE_INDEX_CACHE_SIZE = 16
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+_index_stats = {"hits": 0, "misses": 0}
+
+def template_index_cache_info():
+    with _index_lock:
+        return dict(_index_stats, size=len(_index_cache), maxsize=TEMPLATE_INDEX_CACHE_SIZE)
+
+register_cache("template_index", template_index_cache_info)
+
+def build_template_index(prs, digest=None):
+    """Scan every text shape of a presentation once for placeholder tokens."""
+    shapes = []
+    placeholders = {}
+    for slide_idx, slide in enumerate(prs.slides):
+        for shape_idx, shape in enumerate(slide.shapes):
             if not shape.has_text_frame:
                 continue
+            tokens = tuple(dict.fromkeys(PLACEHOLDER_RE.findall(shape.text_frame.text)))
+            if not tokens:
+                continue
+            shapes.append((slide_idx, shape_idx, tokens))
+            for token in tokens:
+                placeholders.setdefault(token, []).append((slide_idx, shape_idx))
+    m = STYLE_PROFILE_RE.search(prs.core_properties.keywords or "")
+    return TemplateIndex(digest, shapes, placeholders, m.group(1) if m else None)
+
+def read_template(template_pptx):
+    """Bytes of a template given as a path, a file-like object or bytes."""
+    if isinstance(template_pptx, (bytes, bytearray)):
+        return template_pptx
+    if hasattr(template_pptx, "read"):
+        return template_pptx.read()
+    with open(template_pptx, "rb") as f:
+        return f.read()
+
+def load_template(template_pptx):
+    """
+    Open a template (path, file-like or bytes) -> (Presentation, TemplateIndex),
+    reusing the cached index when the same template was seen before.
+    """
+    from pptx import Presentation
+
+    data = read_template(template_pptx)
+    digest = hashlib.sha256(data).hexdigest()
+    prs = Presentation(io.BytesIO(data))
+
+    with _index_lock:
+        index = _index_cache.get(digest)
+        if index is None:
+            _index_stats["misses"] += 1
+        else:
+            _index_stats["hits"] += 1
+            _index_cache.move_to_end(digest)
+    if index is None:
+        index = build_template_index(prs, digest)
+        with _index_lock:
+            _index_cache[digest] = index
+            while len(_index_cache) > TEMPLATE_INDEX_CACHE_SIZE:
+                _index_cache.popitem(last=False)
+    return prs, index
+
+# --- Prototype slides and pruning ------------------------------------------------
+# A slide whose placeholders end in V* ({PSALM_EN_V*}, {HYMN1_KN_V*} +
+# {HYMN1_EN_V*}, ...) is a prototype: it is cloned once per verse block that
+# has a value, right where it stands, with V* renumbered V1, V2, ... Slides
+# whose placeholders all stay empty are then dropped, so a template needs one
+# slide per section and the deck carries only the slides actually used.
+
+VERSE_KEY_RE = re.compile(r"^(\{.*_V)(\d+)\}$")
+PROTOTYPE_SUFFIX = "_V*}"
+
+def slide_plan(prs, index):
+    """
+    [(slide, [(shape_idx, tokens, verse_no), ...]), ...] for the indexed
+    slides, in order. verse_no is set on expanded prototype copies, whose
+    tokens are already renumbered while their text still reads V*.
+    """
+    slides = list(prs.slides)
+    plan = []
+    for slide_idx, shape_idx, tokens in index.shapes:
+        if not plan or plan[-1][0] is not slides[slide_idx]:
+            plan.append((slides[slide_idx], []))
+        plan[-1][1].append((shape_idx, tokens, None))
+    return plan
+
+def _plan_shapes(plan):
+    """Yield (slide, shape, tokens, verse_no) for every planned shape."""
+    for slide, entries in plan:
+        shapes = list(slide.shapes)
+        for shape_idx, tokens, verse_no in entries:
+            yield slide, shapes[shape_idx], tokens, verse_no
+
+def _numbered(token, verse_no):
+    return token.replace(PROTOTYPE_SUFFIX, f"_V{verse_no}}}") if verse_no else token
+
+def _verse_numbers(mapping):
+    """'{HYMN1_KN_V' -> {1, 2, ...} for every numbered verse placeholder with a value."""
+    numbers = {}
+    for key, val in mapping.items():
+        m = VERSE_KEY_RE.match(key)
+        if m and val:
+            numbers.setdefault(m.group(1), set()).add(int(m.group(2)))
+    return numbers
+
+def duplicate_slide(prs, src, after=None):
+    """Copy src (shapes, background, pictures, links) into a new slide placed after `after`."""
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    new = prs.slides.add_slide(src.slide_layout)
+    # copy into the new slide's own shape tree: its Slide object keeps a
+    # reference to that element
+    src_root, root = src._element, new._element
+    sp_tree = root.cSld.spTree
+    for child in list(sp_tree):
+        sp_tree.remove(child)
+    for child in src_root.cSld.spTree:
+        sp_tree.append(copy.deepcopy(child))
+    # background and the rest of <p:cSld>, then colour map / transition / timing
+    for child in list(root.cSld):
+        if child is not sp_tree:
+            root.cSld.remove(child)
+    before_tree = True
+    for child in src_root.cSld:
+        if child.tag == sp_tree.tag:
+            before_tree = False
+        elif before_tree:
+            sp_tree.addprevious(copy.deepcopy(child))
+        else:
+            root.cSld.append(copy.deepcopy(child))
+    for child in list(root):
+        if child is not root.cSld:
+            root.remove(child)
+    for child in src_root:
+        if child.tag != root.cSld.tag:
+            root.append(copy.deepcopy(child))
+    for attr, val in src_root.attrib.items():
+        root.set(attr, val)
+    for attr, val in src_root.cSld.attrib.items():
+        root.cSld.set(attr, val)
+
+    # pictures, media and hyperlinks are referenced by rId; relate the new
+    # part to the same targets and point the copied XML at the new rIds
+    rid_map = {}
+    for rel in src.part.rels.values():
+        if rel.reltype in (RT.SLIDE_LAYOUT, RT.NOTES_SLIDE):
+            continue
+        if rel.is_external:
+            rid_map[rel.rId] = new.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        else:
+            rid_map[rel.rId] = new.part.relate_to(rel.target_part, rel.reltype)
+    if rid_map:
+        for el in root.iter():
+            for attr, val in el.attrib.items():
+                if attr.startswith(R_NS) and val in rid_map:
+                    el.set(attr, rid_map[val])
+
+    sld_ids = prs.slides._sldIdLst
+    new_id = sld_ids[-1]
+    anchor_id = (after if after is not None else src).slide_id
+    for pos, sld_id in enumerate(sld_ids):
+        if sld_id.id == anchor_id:
+            sld_ids.insert(pos + 1, new_id)
+            break
+    return new
+
+def delete_slide(prs, slide):
+    """Remove a slide from the deck; its part is no longer saved."""
+    sld_ids = prs.slides._sldIdLst
+    for sld_id in sld_ids:
+        if sld_id.id == slide.slide_id:
+            rId = sld_id.rId
+            sld_ids.remove(sld_id)
+            prs.part.drop_rel(rId)
+            return
+
+def expand_prototypes(prs, plan, mapping):
+    """Clone prototype slides per verse block; returns the expanded plan."""
+    numbers = None
+    expanded = []
+    for slide, entries in plan:
+        stems = {t[:-len(PROTOTYPE_SUFFIX)] + "_V" for _, tokens, _ in entries for t in tokens
+                 if t.endswith(PROTOTYPE_SUFFIX)}
+        if not stems:
+            expanded.append((slide, entries))
+            continue
+        if numbers is None:
+            numbers = _verse_numbers(mapping)
+        verse_nos = sorted(set().union(*(numbers.get(stem, ()) for stem in stems)))
+        if not verse_nos:
+            expanded.append((slide, entries))  # nothing to show: pruned as unused
+            continue
+        # clone first so every copy is taken from the untouched prototype
+        copies = [slide]
+        for _ in verse_nos[1:]:
+            copies.append(duplicate_slide(prs, slide, after=copies[-1]))
+        for target, n in zip(copies, verse_nos):
+            numbered = [(shape_idx, tuple(_numbered(t, n) for t in tokens), n)
+                        for shape_idx, tokens, _ in entries]
+            expanded.append((target, numbered))
+    return expanded
+
+def prune_unused_slides(prs, plan, is_filled):
+    """Drop planned slides none of whose placeholders is_filled(); returns the kept plan."""
+    kept = []
+    for slide, entries in plan:
+        if any(is_filled(t) for _, tokens, _ in entries for t in tokens):
+            kept.append((slide, entries))
+        else:
+            delete_slide(prs, slide)
+    return kept
+
+# --- Measured fitting -------------------------------------------------------------
+# With fit_text, a prototype family is re-blocked to the measured size of its
+# box before expansion: readings flow verse by verse into as few copies as
+# the text needs (instead of fixed 3-verse blocks), and hymn verses that fit
+# together share a copy (a bilingual slide only when both boxes fit).
+# Families that also have numbered slides keep their blocks, since those
+# slides fix the block count. Each filled box then gets the largest font
+# size, up to its style's, at which its text fits (textfit.py).
+
+FLOWING_STEM_RE = re.compile(r"^\{(PSALM|OT|NT|GOSPEL)_[A-Z]+_V$")
+
+def _shape_font(shape, token, sample, profile, kannada_font, english_font):
+    """(font name, size in pt or None) a placeholder's text will be set in."""
+    style = get_font_style_for_placeholder(token, profile)
+    font_name = style.get("font_name", kannada_font if KANNADA_UNICODE_RANGE.search(sample) else english_font)
+    size = style.get("font_size_pt")
+    if size is None:
+        sizes = [r.font.size.pt for p in shape.text_frame.paragraphs for r in p.runs if r.font.size]
+        size = sizes[0] if sizes else None
+    return font_name, size
+
+def refit_prototypes(plan, index, mapping, style_profile="default", kannada_font="Noto Sans Kannada",
+                     english_font="Arial"):
+    """Re-block the verse values of prototype families to their measured boxes; returns the new mapping."""
+    numbered_stems = {m.group(1) for m in map(VERSE_KEY_RE.match, index.placeholders) if m}
+    proto_count = {}
+    for _, entries in plan:
+        for stem in {t[:-len(PROTOTYPE_SUFFIX)] + "_V" for _, tokens, _ in entries for t in tokens
+                     if t.endswith(PROTOTYPE_SUFFIX)}:
+            proto_count[stem] = proto_count.get(stem, 0) + 1
+
+    numbers = _verse_numbers(mapping)
+    mapping = dict(mapping)
+    for slide, entries in plan:
+        if not any(t.endswith(PROTOTYPE_SUFFIX) for _, tokens, _ in entries for t in tokens):
+            continue
+        shapes = list(slide.shapes)
+        boxes = []  # (stem, shape, token)
+        for shape_idx, tokens, _ in entries:
+            protos = [t for t in tokens if t.endswith(PROTOTYPE_SUFFIX)]
+            if not protos:
+                continue
+            shape = shapes[shape_idx]
+            if len(tokens) != 1 or not PLACEHOLDER_RE.fullmatch(shape.text_frame.text.strip()):
+                boxes = None  # text around the placeholder cannot be measured
+                break
+            boxes.append((protos[0][:-len(PROTOTYPE_SUFFIX)] + "_V", shape, protos[0]))
+        if not boxes or any(stem in numbered_stems or proto_count[stem] > 1 for stem, _, _ in boxes):
+            continue
+        verse_nos = sorted(set().union(*(numbers.get(stem, ()) for stem, _, _ in boxes)))
+        if not verse_nos:
+            continue
 
-            txt = shape.text_frame.text
-            for ph, val in mapping.items():
-                if ph in txt:
-                    style = get_font_style_for_placeholder(ph)
+        values = [[mapping.get(f"{stem}{n}}}") or "" for n in verse_nos] for stem, _, _ in boxes]
+        targets = []  # (font name, size, Box) per box
+        for (stem, shape, token), texts in zip(boxes, values):
+            font_name, size = _shape_font(shape, token, next(filter(None, texts), ""), style_profile,
+                                          kannada_font, english_font)
+            targets.append((font_name, size, box_for_shape(shape)))
+        if any(size is None for _, size, _ in targets):
+            continue
 
-                    # Choose font based on style dict, fallback to language
-                    font_name = style.get(
-                        "font_name",
-                        kannada_font if KANNADA_UNICODE_RANGE.search(val or '') else english_font
-                    )
-                    font_size_pt = style.get("font_size_pt", None)
+        if len(boxes) == 1 and FLOWING_STEM_RE.match(boxes[0][0]):
+            units = [(line,) for text in values[0] for line in text.split("\n") if line]
+            joiner = "\n"
+        else:
+            units = list(zip(*values))
+            joiner = "\n\n"  # hymn verses sharing a box are set apart by a blank line
+        groups = pack(units, lambda texts: all(fits(text, font_name, size, box)
+                                               for text, (font_name, size, box) in zip(texts, targets)),
+                      joiner)
+        for n, (stem, _, _) in enumerate(boxes):
+            for verse_no in verse_nos:
+                mapping.pop(f"{stem}{verse_no}}}", None)
+            for i, group in enumerate(groups, 1):
+                if group[n]:
+                    mapping[f"{stem}{i}}}"] = group[n]
+    return mapping
+
+def replace_placeholders(prs, mapping, kannada_font="Noto Sans Kannada", english_font="Arial",
+                         index=None, style_profile=None, plan=None, fit_text=False, clear_unfilled=False):
+    """
+    Substitute every {PLACEHOLDER} found in mapping in place, keeping any
+    other text in the shape (several placeholders per shape are fine).
+    With clear_unfilled, placeholders without a value are blanked instead
+    of left as they are ({ANNOUNCEMENTS_TABLE} is always kept for the table
+    step). The shape is styled after its first filled placeholder; with
+    fit_text, a shape holding just one placeholder gets the largest font
+    size (up to the style's) at which its text fits the box.
+    """
+    if index is None:
+        index = build_template_index(prs)
+    if plan is None:
+        plan = slide_plan(prs, index)
+    profile = style_profile or index.style_profile or "default"
+    for slide, shape, tokens, verse_no in _plan_shapes(plan):
+        filled = [t for t in tokens if t in mapping]
+        unfilled = [t for t in tokens if t not in mapping and t != ANNOUNCEMENTS_TABLE]
+        if not filled and not (clear_unfilled and unfilled):
+            continue
+        txt = shape.text_frame.text
+        exact = len(tokens) == 1 and PLACEHOLDER_RE.fullmatch(txt.strip())
+        if exact:
+            val = mapping.get(tokens[0]) or ""
+        else:
+            def value(m):
+                token = _numbered(m.group(0), verse_no)
+                if token in mapping:
+                    return mapping[token] or ""
+                return "" if clear_unfilled and token != ANNOUNCEMENTS_TABLE else m.group(0)
+            val = PLACEHOLDER_RE.sub(value, txt)
+        style = get_font_style_for_placeholder((filled or unfilled)[0], profile)
 
-                    set_text_frame_text(shape.text_frame, val or "", font_name=font_name, font_size_pt=font_size_pt)
-                    break  # stop checking more placeholders for this shape
+        # Choose font based on style dict, fallback to language
+        font_name = style.get(
+            "font_name",
+            kannada_font if KANNADA_UNICODE_RANGE.search(val) else english_font
+        )
+        font_size_pt = style.get("font_size_pt", None)
+        if fit_text and exact and font_size_pt:
+            font_size_pt = fit_font_size(val, font_name, box_for_shape(shape), font_size_pt)
+
+        set_text_frame_text(shape.text_frame, val, font_name=font_name, font_size_pt=font_size_pt)
 
 def insert_announcements_table(slide, left, top, width, height, table_data):
     if not table_data:
@@ -79,19 +477,68 @@ def insert_announcements_table(slide, left, top, width, height, table_data):
         for c, cell in enumerate(row):
             table.cell(r, c).text = str(cell)
 
-def generate_presentation(template_pptx, output_pptx, mapping, announcements_table_data=None, kannada_font='Noto Sans Kannada'):
-    prs = Presentation(template_pptx)
-    # 1) basic replacement
-    replace_placeholders(prs, mapping, kannada_font)
+def generate_presentation(template_pptx, output_pptx, mapping, announcements_table_data=None, kannada_font='Noto Sans Kannada',
+                          style_profile=None, prune_unused=True, fit_text=None, copy_unchanged=True,
+                          optimize_media=None):
+    """
+    Fill a template and save the deck. Prototype slides (V* placeholders)
+    are expanded per verse block; with prune_unused, slides none of whose
+    placeholders received a value are left out and placeholders left
+    without a value on the other slides are blanked. With fit_text (default:
+    FIT_TEXT, off), verse blocks and font sizes are fitted to the measured
+    placeholder boxes. With copy_unchanged, template parts the deck does
+    not change are copied into it still compressed instead of being
+    re-encoded (pptx_writer.py).
+    With optimize_media (default: OPTIMIZE_MEDIA), the deck is built from
+    the template with its media deduplicated and downscaled, which is
+    worked out once per template (template_media.py).
+    Returns the template's placeholders (prototype ones as renumbered for
+    their copies) that got no value, in slide order.
+    """
+    with timed("template_load"):
+        data = read_template(template_pptx)
+        if OPTIMIZE_MEDIA if optimize_media is None else optimize_media:
+            data = optimized_template(data)
+        prs, index = load_template(data)
+        source = TemplateSource(prs, data) if copy_unchanged else None
 
-    # 2) replace ANNOUNCEMENTS_TABLE placeholders by creating a table at same position
-    for slide in prs.slides:
-        for shape in list(slide.shapes):
-            if not shape.has_text_frame:
-                continue
-            if '{ANNOUNCEMENTS_TABLE}' in shape.text_frame.text:
+    if fit_text is None:
+        fit_text = FIT_TEXT
+    with timed("placeholder_replace"):
+        plan = slide_plan(prs, index)
+        if fit_text:
+            mapping = refit_prototypes(plan, index, mapping, style_profile or index.style_profile or "default",
+                                       kannada_font)
+        plan = expand_prototypes(prs, plan, mapping)
+
+        def is_filled(token):
+            if token == ANNOUNCEMENTS_TABLE:
+                return bool(announcements_table_data)
+            return bool(mapping.get(token))
+        # worked out before pruning and blanking, which remove them from the deck
+        unresolved = [token for token in dict.fromkeys(t for _, entries in plan for _, tokens, _ in entries
+                                                       for t in tokens)
+                      if not is_filled(token)]
+        if prune_unused:
+            plan = prune_unused_slides(prs, plan, is_filled)
+            # keep slide part names contiguous after clones and deletions
+            prs.part.rename_slide_parts([sld_id.rId for sld_id in prs.slides._sldIdLst])
+
+        # 1) basic replacement; a slide kept for some of its placeholders shows none of the others
+        replace_placeholders(prs, mapping, kannada_font, index=index, style_profile=style_profile, plan=plan,
+                             fit_text=fit_text, clear_unfilled=prune_unused)
+
+        # 2) replace ANNOUNCEMENTS_TABLE placeholders by creating a table at same position
+        # (tables are appended to the slide, so planned shape positions stay valid)
+        table_plan = [(slide, [entry for entry in entries if ANNOUNCEMENTS_TABLE in entry[1]])
+                      for slide, entries in plan]
+        for slide, shape, _, _ in _plan_shapes([(slide, entries) for slide, entries in table_plan if entries]):
+            if ANNOUNCEMENTS_TABLE in shape.text_frame.text:
                 left = shape.left; top = shape.top; width = shape.width; height = shape.height
                 shape.text_frame.clear()
                 insert_announcements_table(slide, left, top, width, height, announcements_table_data)
 
-    prs.save(output_pptx)
\ No newline at end of file
+    with timed("save"):
+        # only the slide list and the planned slides were edited; clones are new parts
+        save_presentation(prs, output_pptx, source, changed=[prs.part] + [slide.part for slide, _ in plan])
+    return unresolved
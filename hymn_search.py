@@ -0,0 +1,167 @@
+# hymn_search.py
+"""
+In-memory full-text / first-line search over the loaded hymnals.
+
+Built once from a HymnDatabase: every hymn (Kannada, Tulu, English) becomes a
+document whose words go into an inverted index (token -> {doc: weight}).
+Words of a hymn's first lines count extra, so typing the opening words of a
+hymn ranks it first. Partially typed words are expanded through a trigram
+index over the vocabulary (and a sorted vocabulary for 1-2 letter prefixes),
+which is what makes the search usable as autocomplete.
+
+Lean hymn tables (HYMN_DB_LEAN) are indexed from the first lines kept in
+their offsets file instead, without reading any hymn: there the search
+matches hymn numbers and first lines only.
+"""
+import bisect
+import math
+import re
+
+# Kannada vowel signs are combining marks, which \w does not match
+TOKEN_RE = re.compile(r"[\w\u0C80-\u0CFF]+")
+# syllable hyphens ("wor-ship") and apostrophes are dropped before tokenizing
+STRIP_RE = re.compile(r"[-'’‘$]")
+
+FIRST_LINE_BOOST = 3.0
+PREFIX_FACTOR = 0.8       # weight of a prefix match relative to an exact word
+SUBSTRING_FACTOR = 0.5    # weight of a match inside a word
+MAX_EXPANSIONS = 64       # vocabulary words a partial query word may expand to
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(STRIP_RE.sub("", text or "").casefold())
+
+
+def _trigrams(word: str):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def first_line(verses):
+    """First line of the first verse, without its '1.' number."""
+    if not verses:
+        return ""
+    line = verses[0][1].split("\n", 1)[0]
+    return re.sub(r"^\s*\d+[.)]\s*", "", line).strip()
+
+
+class HymnSearchIndex:
+    def __init__(self, hymn_db):
+        self.docs = []        # doc id -> (language, number, first_line, english_first_line)
+        self.postings = {}    # token -> {doc id: weight}
+        self.by_number = {}   # hymn number -> [doc ids]
+        tables = (("kannada", hymn_db.kannada_db), ("tulu", hymn_db.tulu_db), ("english", hymn_db.english_db))
+        for language, table in tables:
+            first_lines = getattr(table, "first_lines", None)
+            if first_lines is not None:
+                for number, (line, english_line) in first_lines.items():
+                    self._add(language, number, line, english_line)
+                continue
+            for number, hymn in table.items():
+                self._add(language, number, first_line(hymn.local_verses), first_line(hymn.english_verses),
+                          (hymn.local_verses, hymn.english_verses))
+
+        self.vocabulary = sorted(self.postings)
+        self.trigrams = {}    # trigram -> set of vocabulary words
+        for word in self.vocabulary:
+            for gram in _trigrams(word):
+                self.trigrams.setdefault(gram, set()).add(word)
+        n_docs = max(len(self.docs), 1)
+        self.idf = {w: math.log(1 + n_docs / len(p)) for w, p in self.postings.items()}
+
+    def _add(self, language, number, first_line, english_first_line, texts=()):
+        """Index one hymn: its first lines plus, if given, its (verse_no, text) lists."""
+        doc = len(self.docs)
+        self.docs.append((language, number, first_line or english_first_line, english_first_line))
+        self.by_number.setdefault(number, []).append(doc)
+
+        weights = {}
+        for verses in texts:
+            for _, text in verses:
+                for word in tokenize(text):
+                    weights[word] = weights.get(word, 0.0) + 1.0
+        for line in (first_line, english_first_line):
+            for word in tokenize(line):
+                weights[word] = weights.get(word, 0.0) + FIRST_LINE_BOOST
+        for word, weight in weights.items():
+            # dampen long hymns repeating a word many times
+            self.postings.setdefault(word, {})[doc] = 1.0 + math.log(weight)
+
+    def _expand(self, word: str, partial: bool):
+        """Vocabulary words matching a query word -> factor."""
+        matches = {}
+        if word in self.postings:
+            matches[word] = 1.0
+        if not partial:
+            return matches
+        # prefix matches from the sorted vocabulary
+        i = bisect.bisect_left(self.vocabulary, word)
+        while i < len(self.vocabulary) and len(matches) < MAX_EXPANSIONS and self.vocabulary[i].startswith(word):
+            matches.setdefault(self.vocabulary[i], PREFIX_FACTOR)
+            i += 1
+        # matches inside words, via the trigram index
+        if len(word) >= 3 and len(matches) < MAX_EXPANSIONS:
+            grams = sorted(_trigrams(word), key=lambda g: len(self.trigrams.get(g, ())))
+            candidates = set(self.trigrams.get(grams[0], ()))
+            for gram in grams[1:]:
+                candidates &= self.trigrams.get(gram, set())
+            for cand in sorted(candidates):
+                if len(matches) >= MAX_EXPANSIONS:
+                    break
+                if word in cand:
+                    matches.setdefault(cand, SUBSTRING_FACTOR)
+        return matches
+
+    def search(self, query: str, language: str = None, limit: int = 10):
+        """
+        Ranked hymns for a few words of lyric / first line, or a hymn number.
+        Every query word must match; the last one may be partially typed.
+        Returns [{"language", "number", "first_line", "english_first_line", "score"}, ...].
+        """
+        language = (language or "").lower() or None
+        scores = {}
+        query = (query or "").strip()
+
+        if query.isdigit():
+            number = str(int(query))
+            for doc in self.by_number.get(number, ()):
+                scores[doc] = 100.0
+        else:
+            words = tokenize(query)
+            partial_last = bool(query) and not query[-1].isspace()
+            for pos, word in enumerate(words):
+                partial = partial_last and pos == len(words) - 1
+                word_scores = {}
+                # a completed word should outrank rarer words it is a prefix of
+                cap = self.idf.get(word, math.inf)
+                for match, factor in self._expand(word, partial).items():
+                    idf = min(self.idf[match], cap)
+                    for doc, weight in self.postings[match].items():
+                        s = factor * idf * weight
+                        if s > word_scores.get(doc, 0.0):
+                            word_scores[doc] = s
+                if pos == 0:
+                    scores = word_scores
+                else:
+                    scores = {d: scores[d] + s for d, s in word_scores.items() if d in scores}
+                if not scores:
+                    break
+
+        results = []
+        for doc, score in scores.items():
+            lang, number, first_line, english_first_line = self.docs[doc]
+            if language and lang != language:
+                continue
+            results.append((-score, lang, int(number) if number.isdigit() else 0, doc))
+        results.sort()
+
+        out = []
+        for neg_score, _, _, doc in results[:limit]:
+            lang, number, first_line, english_first_line = self.docs[doc]
+            out.append({
+                "language": lang,
+                "number": number,
+                "first_line": first_line,
+                "english_first_line": english_first_line,
+                "score": round(-neg_score, 3),
+            })
+        return out
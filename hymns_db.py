@@ -1,59 +1,265 @@
 # hymns_db.py
 import csv
+import io
+import logging
+import mmap
+import pickle
 import re
 import os
+import sys
+from functools import lru_cache
+
+from hymn_search import first_line
+from metrics import timed, register_cache
+
+log = logging.getLogger(__name__)
+
+# Bump when the Hymn record or verse splitting changes, to invalidate snapshots
+SNAPSHOT_VERSION = 1
+
+class Hymn:
+    """One hymn, with both texts already split into numbered verses (read-only)."""
+    __slots__ = ("number", "language", "local_verses", "english_verses")
+
+    def __init__(self, number, language, local, english):
+        self.number = sys.intern(number)
+        self.language = sys.intern(language)
+        # (verse_no, text) pairs in verse order; strings interned so the English
+        # texts shared by the Kannada and Tulu hymnals are held only once
+        self.local_verses = tuple((n, sys.intern(t)) for n, t in split_into_verses(local).items())
+        self.english_verses = tuple((n, sys.intern(t)) for n, t in split_into_verses(english).items())
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        number, language, local_verses, english_verses = state
+        self.number = sys.intern(number)
+        self.language = sys.intern(language)
+        self.local_verses = tuple((n, sys.intern(t)) for n, t in local_verses)
+        self.english_verses = tuple((n, sys.intern(t)) for n, t in english_verses)
+
+def _csv_signature(csv_path):
+    st = os.stat(csv_path)
+    return SNAPSHOT_VERSION, st.st_size, st.st_mtime_ns
+
+def _load_snapshot(csv_path):
+    """Hymns from <csv>.snapshot if it was built from the current CSV, else None."""
+    snap_path = csv_path + ".snapshot"
+    try:
+        with open(snap_path, "rb") as f:
+            signature, db = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError):
+        return None
+    return db if signature == _csv_signature(csv_path) else None
+
+def _save_snapshot(csv_path, db):
+    snap_path = csv_path + ".snapshot"
+    tmp_path = snap_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((_csv_signature(csv_path), db), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snap_path)
+    except OSError as e:
+        log.warning("could not write hymn snapshot %s: %s", snap_path, e)
+
+def row_to_hymn(row, language):
+    """Build a Hymn from one CSV row (dict), or None if it has no Hymn_No."""
+    hymn_no_raw = str(row.get('Hymn_No', '')).strip()
+    if not hymn_no_raw:
+        return None
+
+    try:
+        # Normalize hymn number (remove leading zeros, etc.)
+        hymn_no = str(int(hymn_no_raw))
+    except ValueError:
+        # If it's not a pure number, keep as string but strip spaces
+        hymn_no = hymn_no_raw
+
+    # For Kannada CSV: Kannada and English columns
+    # For Tulu CSV: Kannada (actually Tulu text) and English columns
+    if language.lower() == "tulu":
+        local_text = (row.get('Tulu') or '').strip()  # actually Tulu column in that CSV
+    else:
+        local_text = (row.get('Kannada') or '').strip()  # Kannada text
+
+    english_text = (row.get('English') or '').strip()
+
+    return Hymn(hymn_no, language.lower(), local_text, english_text)
+
+# --- Lean mode -----------------------------------------------------------------
+# Instead of holding every hymn, a LazyHymnTable keeps only a byte-offset index
+# (hymn number -> offset/length of its CSV record) and parses the few rows a
+# service actually asks for from an mmap of the CSV, with a small LRU on top.
+# The index also keeps each hymn's first lines, which is all the search index
+# reads in lean mode. It is saved next to the CSV (<csv>.offsets) and rebuilt
+# when the CSV changes.
+
+OFFSETS_VERSION = 2
+
+def scan_csv_records(data):
+    """
+    Yield (offset, length) of every CSV record in data (bytes), honouring
+    quoted fields that span several lines.
+    """
+    start = pos = 0
+    in_quotes = False
+    n = len(data)
+    while pos < n:
+        nl = data.find(b"\n", pos)
+        end = n if nl == -1 else nl + 1
+        # "" escapes keep the count even, so odd counts toggle the quoted state
+        if data[pos:end].count(b'"') % 2:
+            in_quotes = not in_quotes
+        pos = end
+        if not in_quotes:
+            if data[start:end].strip():
+                yield start, end - start
+            start = end
+    if start < n and data[start:].strip():
+        yield start, n - start
+
+def _parse_record(record_bytes, header):
+    fields = next(csv.reader(io.StringIO(record_bytes.decode("utf-8"), newline='')), [])
+    return dict(zip(header, fields))
+
+class LazyHymnTable:
+    """Dict-like hymn table (get / keys / items / len) that reads rows on demand."""
+
+    def __init__(self, csv_path, language, cache_size=32):
+        self.csv_path = csv_path
+        self.language = language
+        with open(csv_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header, self.offsets, self.first_lines = self._load_or_build_index()
+        self._get_cached = lru_cache(maxsize=cache_size)(self._read_hymn)
+
+    def _load_or_build_index(self):
+        sidecar = self.csv_path + ".offsets"
+        signature = (OFFSETS_VERSION,) + _csv_signature(self.csv_path)[1:]
+        try:
+            with open(sidecar, "rb") as f:
+                saved_signature, header, offsets, first_lines = pickle.load(f)
+            if saved_signature == signature:
+                return header, offsets, first_lines
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+
+        records = scan_csv_records(self._mm)
+        first = next(records, None)
+        if first is None:
+            return [], {}, {}
+        header = next(csv.reader([self._mm[first[0]:first[0] + first[1]].decode("utf-8-sig")]))
+        offsets = {}
+        first_lines = {}  # hymn number -> (first line, English first line)
+        for offset, length in records:
+            row = _parse_record(self._mm[offset:offset + length], header)
+            hymn_no_raw = str(row.get('Hymn_No', '')).strip()
+            if not hymn_no_raw:
+                continue
+            try:
+                hymn_no = str(int(hymn_no_raw))
+            except ValueError:
+                hymn_no = hymn_no_raw
+            offsets[hymn_no] = (offset, length)
+            hymn = row_to_hymn(row, self.language)
+            first_lines[hymn_no] = (first_line(hymn.local_verses), first_line(hymn.english_verses))
+
+        try:
+            tmp_path = sidecar + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((signature, header, offsets, first_lines), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            log.warning("could not write hymn offset index %s: %s", sidecar, e)
+        return header, offsets, first_lines
+
+    def _read_hymn(self, hymn_no):
+        offset, length = self.offsets[hymn_no]
+        return row_to_hymn(_parse_record(self._mm[offset:offset + length], self.header), self.language)
+
+    def get(self, hymn_no, default=None):
+        if hymn_no not in self.offsets:
+            return default
+        return self._get_cached(hymn_no)
+
+    def cache_info(self):
+        return self._get_cached.cache_info()
+
+    def cache_stats(self):
+        """cache_info() in the shape metrics.register_cache expects."""
+        info = self._get_cached.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+    def keys(self):
+        return self.offsets.keys()
+
+    def items(self):
+        """All hymns, parsed one at a time and not cached."""
+        for hymn_no in self.offsets:
+            yield hymn_no, self._read_hymn(hymn_no)
+
+    def __contains__(self, hymn_no):
+        return hymn_no in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
 
 class HymnDatabase:
-    def __init__(self, kannada_csv_path, tulu_csv_path, english_csv_path):
-        """Initialize hymn database with both Kannada and Tulu CSV files"""
-        self.kannada_db = self.load_hymn_db(kannada_csv_path, "Kannada")
-        self.tulu_db = self.load_hymn_db(tulu_csv_path, "Tulu")
-        self.english_db = self.load_hymn_db(english_csv_path, "English") if english_csv_path else {}
+    def __init__(self, kannada_csv_path, tulu_csv_path, english_csv_path, lean=False, cache_size=32):
+        """
+        Initialize hymn database with both Kannada and Tulu CSV files.
+        lean=True keeps only per-CSV offset indexes and reads hymns on demand
+        (LazyHymnTable) instead of holding all three hymnals in memory.
+        """
+        load = self.load_lean_hymn_db if lean else self.load_hymn_db
+        self.cache_size = cache_size
+        self.kannada_db = load(kannada_csv_path, "Kannada")
+        self.tulu_db = load(tulu_csv_path, "Tulu")
+        self.english_db = load(english_csv_path, "English") if english_csv_path else {}
+        self._available_hymns = {}
+
+    def load_lean_hymn_db(self, csv_path, language):
+        """Offset-indexed, on-demand hymn table for lean mode."""
+        if not os.path.exists(csv_path):
+            log.warning("%s CSV file not found at %s", language, csv_path)
+            return {}
+        table = LazyHymnTable(csv_path, language, self.cache_size)
+        register_cache(f"hymns_{language.lower()}", table.cache_stats)
+        log.info("Indexed %d %s hymns in %s (lean mode)", len(table), language, csv_path)
+        return table
     
     def load_hymn_db(self, csv_path, language):
-        """Load hymn database from CSV file"""
+        """
+        Load hymn database from CSV file.
+        The parsed, verse-split result is pickled next to the CSV
+        (<csv>.snapshot) and reused while the CSV's size/mtime are unchanged.
+        """
         db = {}
         if not os.path.exists(csv_path):
-            print(f"Warning: {language} CSV file not found at {csv_path}")
+            log.warning("%s CSV file not found at %s", language, csv_path)
             return db
+
+        snapshot = _load_snapshot(csv_path)
+        if snapshot is not None:
+            log.info("Loaded %d %s hymns from %s (snapshot)", len(snapshot), language, csv_path)
+            return snapshot
         
         try:
             with open(csv_path, newline='', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row_num, row in enumerate(reader, 1):
-                    hymn_no_raw = str(row.get('Hymn_No', '')).strip()
-                    if not hymn_no_raw:
-                        continue
-                    
-                    try:
-                        # Normalize hymn number (remove leading zeros, etc.)
-                        hymn_no = str(int(hymn_no_raw))
-                    except ValueError:
-                        # If it's not a pure number, keep as string but strip spaces
-                        hymn_no = hymn_no_raw
-                    
-                    # For Kannada CSV: Kannada and English columns
-                    # For Tulu CSV: Kannada (actually Tulu text) and English columns
-                    if language.lower() == "tulu":
-                        local_text = (row.get('Tulu') or '').strip()  # actually Tulu column in that CSV
-                    else:
-                        local_text = (row.get('Kannada') or '').strip()  # Kannada text
-
-                    english_text = (row.get('English') or '').strip()
-
-                    db[hymn_no] = {
-                        'local': local_text,
-                        'english': english_text,
-                        'language': language.lower()
-                    }
-
-                    
-            print(f"Loaded {len(db)} {language} hymns from {csv_path}")
+                    hymn = row_to_hymn(row, language)
+                    if hymn:
+                        db[hymn.number] = hymn
+
+            log.info("Loaded %d %s hymns from %s", len(db), language, csv_path)
             
         except Exception as e:
-            print(f"Error loading {language} CSV file {csv_path}: {e}")
+            log.error("Error loading %s CSV file %s: %s", language, csv_path, e)
             return {}
-        
+
+        _save_snapshot(csv_path, db)
         return db
     
     def get_hymn(self, hymn_number, language="kannada"):
@@ -70,11 +276,12 @@ class HymnDatabase:
         return self.kannada_db.get(hymn_no)
     
     def get_available_hymns(self, language="kannada"):
-        """Get list of available hymn numbers for a language"""
-        if language.lower() == "tulu":
-            return sorted([int(k) for k in self.tulu_db.keys() if k.isdigit()])
-        else:
-            return sorted([int(k) for k in self.kannada_db.keys() if k.isdigit()])
+        """Get list of available hymn numbers for a language (sorted once, then cached)"""
+        language = language.lower()
+        if language not in self._available_hymns:
+            db = {"tulu": self.tulu_db, "english": self.english_db}.get(language, self.kannada_db)
+            self._available_hymns[language] = sorted(int(k) for k in db.keys() if k.isdigit())
+        return self._available_hymns[language]
 
 def split_into_verses(text, return_lines=False):
     """Split hymn text into numbered verses"""
@@ -155,6 +362,7 @@ def parse_verse_selection(verse_text):
     
     return sorted(list(set(verses))) if verses else None
 
+@timed("hymn_resolution")
 def get_hymn_verses(hymn_number, verse_selection, language, hymn_db):
     """
     Get hymn verses based on user input
@@ -177,24 +385,24 @@ def get_hymn_verses(hymn_number, verse_selection, language, hymn_db):
     except ValueError:
         hymn_no = hymn_number.strip()
     
-    print(f"Looking for hymn number: {hymn_no} in {language}")
+    log.debug("Looking for hymn number: %s in %s", hymn_no, language)
     
     # Get hymn from appropriate database
     hymn = hymn_db.get_hymn(hymn_no, language)
     
     if not hymn:
-        print(f"Hymn {hymn_no} not found in {language} database")
-        available_hymns = hymn_db.get_available_hymns(language)[:10]
-        print(f"Available {language} hymn numbers (first 10): {available_hymns}")
+        log.warning("Hymn %s not found in %s database", hymn_no, language)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Available %s hymn numbers (first 10): %s", language, hymn_db.get_available_hymns(language)[:10])
         return {}, {}
     
-    print(f"Found hymn {hymn_no} in {language} database")
+    log.debug("Found hymn %s in %s database", hymn_no, language)
     
-    # Split into verses
-    verses_local = split_into_verses(hymn.get('local', ''))
-    verses_english = split_into_verses(hymn.get('english', ''))
+    # Verses were split when the hymn was loaded
+    verses_local = dict(hymn.local_verses)
+    verses_english = dict(hymn.english_verses)
     
-    print(f"Hymn {hymn_no} has {len(verses_local)} {language} verses, {len(verses_english)} English verses")
+    log.debug("Hymn %s has %d %s verses, %d English verses", hymn_no, len(verses_local), language, len(verses_english))
     
     # Parse verse selection
     verses_req = parse_verse_selection(verse_selection)
@@ -203,11 +411,10 @@ def get_hymn_verses(hymn_number, verse_selection, language, hymn_db):
     if verses_req:
         verses_local = {i: verses_local[i] for i in verses_req if i in verses_local}
         verses_english = {i: verses_english[i] for i in verses_req if i in verses_english}
-        print(f"Filtered to requested verses: {verses_req}")
-        print(f"Available {language} verses: {list(verses_local.keys())}")
-        print(f"Available English verses: {list(verses_english.keys())}")
+        log.debug("Filtered to requested verses %s -> %s: %s, English: %s",
+                  verses_req, language, list(verses_local), list(verses_english))
     else:
-        print(f"Using all verses - {language}: {list(verses_local.keys())}, English: {list(verses_english.keys())}")
+        log.debug("Using all verses - %s: %s, English: %s", language, list(verses_local), list(verses_english))
     
     return verses_local, verses_english
 
@@ -234,7 +441,7 @@ def process_user_hymns(form_data, hymn_db):
         if not hymn_number:
             continue
         
-        print(f"\nProcessing Hymn {i}: Number={hymn_number}, Verses={verse_selection or 'all'}, Language={language}")
+        log.debug("Processing Hymn %d: Number=%s, Verses=%s, Language=%s", i, hymn_number, verse_selection or 'all', language)
         
         verses_local, verses_english = get_hymn_verses(hymn_number, verse_selection, language, hymn_db)
         
@@ -251,7 +458,8 @@ def process_user_hymns(form_data, hymn_db):
         description = f"{lang_code} - {hymn_number} {verses_str}"
         placeholders[f'HYMN{i}_DES'] = description
 
-        added_placeholders = len([k for k in placeholders.keys() if f'HYMN{i}_' in k])
-        print(f"Added {added_placeholders} placeholders for Hymn {i} ({language})")
+        if log.isEnabledFor(logging.DEBUG):
+            added_placeholders = len([k for k in placeholders.keys() if f'HYMN{i}_' in k])
+            log.debug("Added %d placeholders for Hymn %d (%s)", added_placeholders, i, language)
     
     return placeholders
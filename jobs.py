@@ -0,0 +1,228 @@
+# jobs.py
+"""
+Asynchronous deck builds on a bounded process pool.
+
+    POST /jobs                 -> 202 {"job_id", "status_url", "download_url"}
+                                  (503 + Retry-After when the queue is full)
+    GET  /jobs/<id>            -> {"status": queued|running|done|failed, "stage", ...}
+    GET  /jobs/<id>/download   -> the finished PPTX
+
+Rendering is CPU-bound, so builds run in worker processes (spawned, each
+loading the hymn database and verse store once in its initializer). Workers
+report their pipeline stage through a queue that a thread in the web
+process drains into the job table. Job state lives in the web process, so
+run gunicorn with a single worker (plus threads) when using job mode
+(ASYNC_JOBS=1; the form builds synchronously otherwise). If a worker dies
+(e.g. OOM-killed) the pool is broken: its jobs fail and a new pool is
+started for the next submission.
+
+Configuration (environment):
+    JOB_WORKERS        worker processes (default 2)
+    JOB_QUEUE_DEPTH    jobs queued or running before new ones are refused (default 16)
+    JOB_TTL_SECONDS    how long finished jobs and their decks are kept (default 1800)
+    JOB_RESULTS_MB     total size of the finished decks kept; the oldest finished
+                       jobs are dropped beyond it (default 256)
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import observe
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.environ.get("JOB_QUEUE_DEPTH", "16"))
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "1800"))
+JOB_RESULTS_MB = int(os.environ.get("JOB_RESULTS_MB", "256"))
+
+
+class QueueFull(Exception):
+    """Raised by submit() when JOB_QUEUE_DEPTH jobs are already waiting or running."""
+
+
+# --- Worker process side ----------------------------------------------------------
+
+_worker_hymn_db = None
+_worker_progress = None
+
+
+def _init_worker(progress_queue, hymn_db_kwargs):
+    """Runs once per worker process: load data files and keep the progress queue."""
+    global _worker_hymn_db, _worker_progress
+    from bible_fetch import get_verse_store
+    from hymns_db import HymnDatabase
+
+    _worker_progress = progress_queue
+    _worker_hymn_db = HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv", **hymn_db_kwargs)
+    get_verse_store()
+
+
+def _run_job(job_id, pdf_bytes, template_bytes, announcements_bytes, form, style_profile):
+    from pipeline import build_deck
+
+    def progress(stage):
+        _worker_progress.put((job_id, stage, time.time()))
+
+    deck = build_deck(io.BytesIO(pdf_bytes), io.BytesIO(template_bytes), form, _worker_hymn_db,
+                      announcements_file=io.BytesIO(announcements_bytes) if announcements_bytes else None,
+                      style_profile=style_profile, progress=progress)
+    return deck.getvalue()
+
+
+# --- Web process side -------------------------------------------------------------
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, queue_depth=JOB_QUEUE_DEPTH, ttl_seconds=JOB_TTL_SECONDS,
+                 hymn_db_kwargs=None, max_result_bytes=JOB_RESULTS_MB * 1024 * 1024):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.ttl_seconds = ttl_seconds
+        self.max_result_bytes = max_result_bytes
+        self.hymn_db_kwargs = hymn_db_kwargs or {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._progress = None
+
+    def _ensure_pool(self):
+        """Start the worker pool on first use (and after it broke), so importing the app stays cheap."""
+        if self._executor is None:
+            ctx = multiprocessing.get_context("spawn")
+            if self._progress is None:
+                self._progress = ctx.Queue()
+                threading.Thread(target=self._drain_progress, name="job-progress", daemon=True).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=ctx,
+                initializer=_init_worker, initargs=(self._progress, self.hymn_db_kwargs),
+            )
+        return self._executor
+
+    def _discard_pool(self, executor):
+        """Drop a broken pool; the next submission starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _drain_progress(self):
+        while True:
+            job_id, stage, at = self._progress.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job and job["status"] in ("queued", "running"):
+                    if job["status"] == "queued":
+                        job["started"] = at
+                        observe("job_queue_wait", at - job["submitted"])
+                    job["status"] = "running"
+                    job["stage"] = stage
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items()
+                           if job["finished"] is not None and job["finished"] < cutoff]:
+                del self._jobs[job_id]
+
+    def _trim_results(self, keep):
+        """Drop the oldest finished jobs while their decks exceed max_result_bytes (call with the lock held)."""
+        finished = sorted((job["finished"], job_id) for job_id, job in self._jobs.items()
+                          if job["result"] is not None and job_id != keep)
+        total = sum(len(self._jobs[job_id]["result"]) for _, job_id in finished)
+        total += len(self._jobs[keep]["result"] or b"")
+        for _, job_id in finished:
+            if total <= self.max_result_bytes:
+                break
+            total -= len(self._jobs.pop(job_id)["result"])
+
+    def add_finished(self, deck_bytes):
+        """Register an already built deck (e.g. from the deck cache) as a done job."""
+        self._expire()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {"status": "done", "stage": None, "error": None, "result": deck_bytes,
+                                  "submitted": now, "started": now, "finished": now}
+            self._trim_results(job_id)
+        return job_id
+
+    def submit(self, pdf_bytes, template_bytes, announcements_bytes, form, style_profile=None, on_success=None):
+        """
+        Queue a build; returns the job id or raises QueueFull.
+        on_success(deck_bytes) is called in the web process when the build finishes.
+        """
+        self._expire()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job["finished"] is None)
+            if active >= self.queue_depth:
+                raise QueueFull(f"{active} builds are already queued")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"status": "queued", "stage": None, "error": None, "result": None,
+                                  "submitted": time.time(), "started": None, "finished": None}
+        for attempt in range(2):
+            with self._lock:
+                executor = self._ensure_pool()
+            try:
+                future = executor.submit(_run_job, job_id, pdf_bytes, template_bytes, announcements_bytes,
+                                         dict(form), style_profile)
+                break
+            except BrokenProcessPool as e:
+                self._discard_pool(executor)
+                if attempt:
+                    self._fail(job_id, f"worker pool unavailable: {e}")
+                    return job_id
+        future.add_done_callback(lambda f: self._finish(job_id, f, executor, on_success))
+        return job_id
+
+    def _fail(self, job_id, error):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status="failed", stage=None, error=error, finished=time.time())
+
+    def _finish(self, job_id, future, executor, on_success=None):
+        broken = False
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["finished"] = time.time()
+            try:
+                job["result"] = future.result()
+                job["status"] = "done"
+                self._trim_results(job_id)
+            except BrokenProcessPool:
+                job["status"] = "failed"
+                job["error"] = "the build worker stopped unexpectedly (out of memory?); please try again"
+                broken = True
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e) or e.__class__.__name__
+            job["stage"] = None
+        if broken:
+            self._discard_pool(executor)
+        observe("job_total", job["finished"] - job["submitted"])
+        if on_success and job["status"] == "done":
+            on_success(job["result"])
+
+    def status(self, job_id):
+        """Public view of a job (no deck bytes), or None when unknown or expired."""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            info = {"job_id": job_id, "status": job["status"], "stage": job["stage"], "error": job["error"]}
+            if job["status"] == "queued":
+                info["queue_position"] = sum(1 for j in self._jobs.values()
+                                             if j["status"] == "queued" and j["submitted"] < job["submitted"])
+            return info
+
+    def result(self, job_id):
+        """Deck bytes of a finished job, or None (also once it expired or was dropped)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job["result"] if job else None
@@ -0,0 +1,128 @@
+# metrics.py
+"""
+Per-stage timing and cache metrics, exposed as Prometheus text on /metrics.
+
+Pipeline stages are wrapped in timed("stage"), usable as a context manager
+or a decorator:
+
+    with timed("template_load"):
+        prs = Presentation(path)
+
+    @timed("pdf_parse")
+    def parse_pdf_to_structured(path): ...
+
+Every stage records into one latency histogram labelled by stage (plus an
+error counter); caches report their hit/miss counters through register_cache.
+Metrics live in the process that recorded them, so with several gunicorn
+workers each worker reports its own numbers.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "church_ppt"
+
+# Seconds; the pipeline ranges from sub-millisecond cache hits to multi-second PDF parses
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_histograms = {}   # stage -> [bucket counts..., +Inf count], sum
+_errors = {}       # stage -> count
+_caches = {}       # cache name -> callable returning {"hits": n, "misses": n, "size": n}
+
+
+def observe(stage: str, seconds: float):
+    """Record one duration for a stage."""
+    i = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        counts, total = _histograms.get(stage) or ([0] * (len(BUCKETS) + 1), 0.0)
+        counts[i] += 1
+        _histograms[stage] = (counts, total + seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time the enclosed block (or decorated function) as one run of stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        with _lock:
+            _errors[stage] = _errors.get(stage, 0) + 1
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def register_cache(name: str, info):
+    """
+    Report a cache on /metrics. info() returns a dict with "hits" and
+    "misses" (and optionally "size"); it is called at scrape time.
+    """
+    with _lock:
+        _caches[name] = info
+
+
+def stage_summary():
+    """{stage: {"count": n, "sum": seconds}} for reports and logs."""
+    with _lock:
+        return {stage: {"count": sum(counts), "sum": total}
+                for stage, (counts, total) in _histograms.items()}
+
+
+def _fmt(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {s: (list(c), t) for s, (c, t) in _histograms.items()}
+        errors = dict(_errors)
+        caches = dict(_caches)
+
+    name = f"{PREFIX}_stage_seconds"
+    lines = [f"# HELP {name} Latency of presentation pipeline stages.",
+             f"# TYPE {name} histogram"]
+    for stage in sorted(histograms):
+        counts, total = histograms[stage]
+        cumulative = 0
+        for le, n in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {_fmt(total)}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+    name = f"{PREFIX}_stage_errors_total"
+    lines += [f"# HELP {name} Pipeline stage runs that raised.",
+              f"# TYPE {name} counter"]
+    for stage in sorted(errors):
+        lines.append(f'{name}{{stage="{stage}"}} {errors[stage]}')
+
+    stats = {}
+    for cache in sorted(caches):
+        try:
+            stats[cache] = caches[cache]()
+        except Exception:
+            continue
+    for metric, kind, help_text in (
+        ("hits", "counter", "Cache lookups answered from the cache."),
+        ("misses", "counter", "Cache lookups that had to compute the value."),
+        ("size", "gauge", "Entries currently held by the cache."),
+    ):
+        name = f"{PREFIX}_cache_{metric}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for cache, info in stats.items():
+            if metric in info:
+                lines.append(f'{name}{{cache="{cache}"}} {info[metric]}')
+
+    name = f"{PREFIX}_cache_hit_ratio"
+    lines += [f"# HELP {name} Share of cache lookups that were hits.",
+              f"# TYPE {name} gauge"]
+    for cache, info in stats.items():
+        lookups = info.get("hits", 0) + info.get("misses", 0)
+        ratio = info.get("hits", 0) / lookups if lookups else 0.0
+        lines.append(f'{name}{{cache="{cache}"}} {_fmt(ratio)}')
+
+    return "\n".join(lines) + "\n"
@@ -1,29 +1,147 @@
-from docx import Document
 import re
+import zipfile
+import xml.etree.ElementTree as ET
 
-def parse_announcements_docx(docx_path: str):
+from metrics import timed
+
+# The announcements DOCX is read by streaming word/document.xml out of the
+# zip with iterparse: images and other parts are never read, and each body
+# paragraph or table is dropped once handled, so time and memory follow the
+# text, not the file. Paragraph text follows python-docx's Paragraph.text
+# (runs and hyperlinks, tabs and line breaks; text boxes are not included).
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+P, R, T, HYPERLINK = W + "p", W + "r", W + "t", W + "hyperlink"
+BODY, TBL, TR, TC = W + "body", W + "tbl", W + "tr", W + "tc"
+BR_TYPE = W + "type"
+RUN_TEXT = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+# Amounts like "25,300/-" or "25300/-" anywhere in a line
+AMOUNT_RE = re.compile(r'(\d[\d,]*\s*/-)')
+# A table cell holding only an amount with a currency marker ("Rs. 25,300.00",
+# "₹ 500", "25,300/-"); a bare number ("25,300") only counts in a column whose
+# header is Amount, since tables also list hymn numbers, years and the like
+AMOUNT_CELL_RE = re.compile(r'^(?:(?:Rs\.?|₹)\s*\d[\d,]*(?:\.\d{1,2})?\s*(?:/-)?|\d[\d,]*(?:\.\d{1,2})?\s*/-)$', re.I)
+BARE_AMOUNT_RE = re.compile(r'^\d[\d,]*(?:\.\d{1,2})?$')
+AMOUNT_HEADER_RE = re.compile(r'^amount\b', re.I)  # "Amount", "Amount (Rs)"
+
+
+def iter_docx_blocks(docx_path):
+    """
+    Yield ("p", text) for each body paragraph and ("row", [cell text, ...])
+    for each table row of a DOCX (path or binary file-like), in document order.
+    A cell's text is its paragraphs joined with spaces.
+    """
+    with zipfile.ZipFile(docx_path) as z, z.open("word/document.xml") as f:
+        tags = []        # open elements, outermost first
+        paras = []       # text pieces of the open paragraphs (more than one inside text boxes)
+        rows = []        # cell texts of the open table rows
+        cells = []       # paragraph texts of the open table cells
+        body = None
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            tag = el.tag
+            if event == "start":
+                tags.append(tag)
+                if tag == P:
+                    paras.append([])
+                elif tag == TR:
+                    rows.append([])
+                elif tag == TC:
+                    cells.append([])
+                elif tag == BODY:
+                    body = el
+                continue
+
+            tags.pop()
+            # run content counts when the run sits directly in the paragraph (or its hyperlink)
+            in_run = len(tags) >= 2 and tags[-1] == R and (tags[-2] == P or tags[-2] == HYPERLINK
+                                                            and len(tags) >= 3 and tags[-3] == P)
+            if in_run and paras:
+                if tag == T:
+                    paras[-1].append(el.text or "")
+                elif tag in RUN_TEXT:
+                    paras[-1].append(RUN_TEXT[tag])
+                elif tag == W + "br":
+                    paras[-1].append("\n" if el.get(BR_TYPE, "textWrapping") == "textWrapping" else "")
+            elif tag == P:
+                text = "".join(paras.pop())
+                if paras:
+                    pass  # a text-box paragraph inside another paragraph
+                elif cells:
+                    cells[-1].append(text)
+                else:
+                    yield "p", text
+            elif tag == TC:
+                rows[-1].append(" ".join(t.strip() for t in cells.pop() if t.strip()))
+            elif tag == TR:
+                row = rows.pop()
+                if cells:  # a nested table: its rows become text of the outer cell
+                    cells[-1].append(" ".join(c for c in row if c))
+                else:
+                    yield "row", row
+
+            if body is not None and len(tags) == 2:
+                body.clear()  # this body-level paragraph or table is done
+
+
+def _split_amount(line):
+    """(description, amount) for a line with an amount like "25,300/-", else None."""
+    m = AMOUNT_RE.search(line)
+    if not m:
+        return None
+    return line[:m.start()].strip().rstrip(":"), m.group(1).strip()  # keep commas
+
+
+def _amount_cell(cells, amount_column):
+    """Index of the last cell after the first non-empty one holding an amount, or None."""
+    for i in range(len(cells) - 1, 0, -1):
+        if not any(cells[:i]):
+            break
+        if AMOUNT_CELL_RE.match(cells[i]) or i == amount_column and BARE_AMOUNT_RE.match(cells[i]):
+            return i
+    return None
+
+
+@timed("docx_parse")
+def parse_announcements_docx(docx_path):
     """
-    Read DOCX and return (table_rows, extra_text).
-    Table rows = all lines ending with a Rs amount (e.g. 25,300/-).
-    Extra text = everything else.
+    Read DOCX (a path or a binary file-like object) and return (table_rows, extra_text).
+    Table rows = all paragraphs and table rows with a Rs amount (e.g. 25,300/-,
+    a table cell holding only an amount with a currency marker, or a number
+    in a table column headed Amount).
+    Extra text = the other paragraphs; table rows without an amount (headings,
+    birthday lists, hymn numbers and the like) are skipped.
     """
-    doc = Document(docx_path)
     table_rows = [["Particulars", "Amount (Rs)"]]
     extra_lines = []
+    amount_column = None  # of the current table; a paragraph ends the table
 
-    for para in doc.paragraphs:
-        line = para.text.strip()
-        if not line:
+    for kind, block in iter_docx_blocks(docx_path):
+        if kind == "p":
+            amount_column = None
+            line = block.strip()
+            if not line:
+                continue
+            found = _split_amount(line)
+            if found:
+                table_rows.append(list(found))
+            else:
+                extra_lines.append(line)
             continue
 
-        # Look for amounts like "25,300/-" or "25300/-"
-        m = re.search(r'(\d[\d,]*\s*/-)', line)
-        if m:
-            amt = m.group(1).strip()  # keep commas
-            desc = line[:m.start()].strip().rstrip(":")
-            table_rows.append([desc, amt])
-        else:
-            extra_lines.append(line)
+        if not any(block):
+            continue
+        header = next((i for i, c in enumerate(block) if AMOUNT_HEADER_RE.match(c)), None)
+        if header is not None:
+            amount_column = header
+            continue
+        amount_at = _amount_cell(block, amount_column)
+        if amount_at is not None:
+            table_rows.append([" ".join(c for c in block[:amount_at] if c).rstrip(":"), block[amount_at]])
+            continue
+        found = _split_amount(" ".join(c for c in block if c))
+        if found:
+            table_rows.append(list(found))
 
     if len(table_rows) == 1:  # no matches, only header
         table_rows = None
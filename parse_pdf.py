@@ -1,36 +1,162 @@
 # parse_pdf.py
-import pdfplumber
+import copy
+import hashlib
+import io
+import json
+import os
 import re
-from kannada_bible_map import ENGLISH_TO_KANNADA_BOOKS, ENGLISH_TO_KANNADA_PREFIX, to_kannada_numerals
-from bible_fetch import fetch_bible_passage
-from bible_normalize import normalize_book
+import threading
+from collections import OrderedDict
+
+from kannada_bible_map import ENGLISH_TO_KANNADA_BOOKS, to_kannada_numerals
+from bible_fetch import fetch_bible_passages
+from bible_normalize import normalize_book, BOOK_ORDINALS
+from bible_ref import find_reference, search_reference, split_reference
+from metrics import timed, register_cache
 
 
 def to_kannada_ref(ref: str) -> str:
     """
-    Convert 'Nehemiah 8:1-8' -> 'ನೆಹೆಮಿಯ ೮:೧-೮'
+    Convert 'Nehemiah 8:1-8' -> 'ನೆಹೆಮಿಯ ೮:೧-೮' (also 'Psalm 103:1-5, 8-12' etc.)
     using kannada_bible_map and to_kannada_numerals.
     """
     if not ref:
         return ""
 
-    m = re.match(r"([1-3]?\s?[A-Za-z]+\.?)\s+(\d+:\d+(?:-\d+)?)", ref)
-    if not m:
+    book, verses = split_reference(ref)
+    if not book:
         return ref
 
-    book, verses = m.groups()
+    # just the book and verses: ENGLISH_TO_KANNADA_PREFIX holds English section
+    # titles, which are not part of a reference ("Responsive Psalmಸ್ತೋತ್ರಗೀತೆ ...")
     book_clean = normalize_book(book)
     kn_book = ENGLISH_TO_KANNADA_BOOKS.get(book_clean, book_clean)
-    kn_prefix = ENGLISH_TO_KANNADA_PREFIX.get(book_clean, "")
-    return f"{kn_prefix}{kn_book} {to_kannada_numerals(verses)}"
+    return f"{kn_book} {to_kannada_numerals(verses)}"
+
+# Bullets / dashes stripped from the start of every extracted line
+LEADER_RE = re.compile(r'^[\s\-\u2022\*]+')
+
+# All section headings in one pattern; a line may match several, and
+# SECTION_PRIORITY decides which one it belongs to.
+SECTION_RE = re.compile(
+    r'(?P<old_testament>Old Testament|O\.T\.|Old Test)'
+    r'|(?P<new_testament>New Testament|N\.T\.|New Testa)'
+    r'|(?P<gospel>Gospel Reading|Gospel)'
+    r'|(?P<announcements>^ANNOUNCEMENTS)'
+    r'|(?P<birthday>Happy Birthday|Birthday)'
+    r'|(?P<anniversary>Happy Anniversary|Anniversary)',
+    re.I,
+)
+SECTION_PRIORITY = ("old_testament", "new_testament", "gospel", "announcements", "birthday", "anniversary")
+
+# Lines that end an announcements block
+ANNOUNCEMENTS_END_RE = re.compile(r'^(Praise|Off|Hymn|Lord\'s Prayer|THANK|Birthday|Happy Birthday)', re.I)
+
+# Names taken after a Birthday / Anniversary heading
+MAX_NAMES = 20
+
+READINGS = ("psalm", "old_testament", "new_testament", "gospel")
+
+
+# --- Parsed-bulletin cache ------------------------------------------------------
+# The same bulletin is uploaded again and again while hymns and templates are
+# tweaked, and pdfplumber text extraction is the slowest step. The scanned
+# structure (references, announcements, names; not passage text) is cached by
+# the PDF's sha256 plus PARSER_VERSION, in memory and, if PDF_CACHE_DIR is
+# set, as JSON files there so it survives restarts and is shared by workers.
+
+PARSER_VERSION = 2  # bump whenever extract_lines / scan_bulletin change their output
+
+PDF_CACHE_SIZE = 64
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "")
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+_pdf_cache_stats = {"hits": 0, "misses": 0, "disk_hits": 0}
+
+def pdf_cache_info():
+    with _pdf_cache_lock:
+        return dict(_pdf_cache_stats, size=len(_pdf_cache), maxsize=PDF_CACHE_SIZE)
+
+register_cache("bulletins", pdf_cache_info)
+
+def _disk_path(key):
+    return os.path.join(PDF_CACHE_DIR, key + ".json")
+
+def _cached_scan(key):
+    with _pdf_cache_lock:
+        data = _pdf_cache.get(key)
+        if data is not None:
+            _pdf_cache.move_to_end(key)
+            _pdf_cache_stats["hits"] += 1
+            return copy.deepcopy(data)
+    if PDF_CACHE_DIR:
+        try:
+            with open(_disk_path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data is not None:
+            _remember_scan(key, data, to_disk=False)
+            with _pdf_cache_lock:
+                _pdf_cache_stats["hits"] += 1
+                _pdf_cache_stats["disk_hits"] += 1
+            return copy.deepcopy(data)
+    with _pdf_cache_lock:
+        _pdf_cache_stats["misses"] += 1
+    return None
+
+def _remember_scan(key, data, to_disk=True):
+    with _pdf_cache_lock:
+        _pdf_cache[key] = copy.deepcopy(data)
+        _pdf_cache.move_to_end(key)
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    if to_disk and PDF_CACHE_DIR:
+        try:
+            os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+            tmp_path = _disk_path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, _disk_path(key))
+        except OSError:
+            pass
+
+
+def extract_lines(pdf_path):
+    """Text lines of the bulletin, with leading bullets and dashes removed."""
+    import pdfplumber  # heavy (pdfminer); imported on first parse, not at app boot
 
-def parse_pdf_to_structured(pdf_path: str) -> dict:
     with pdfplumber.open(pdf_path) as pdf:
         text = "\n".join(page.extract_text() or "" for page in pdf.pages)
 
     # Normalize lines
-    lines = [re.sub(r'^[\s\-\u2022\*]+', '', l).strip() for l in text.splitlines() if l.strip()]
+    return [LEADER_RE.sub('', l).strip() for l in text.splitlines() if l.strip()]
+
+
+def _line_section(line):
+    """The highest-priority section heading found in a line, or None."""
+    found = {m.lastgroup for m in SECTION_RE.finditer(line)}
+    for section in SECTION_PRIORITY:
+        if section in found:
+            return section
+    return None
+
+
+def _names_after(lines, i):
+    """Up to MAX_NAMES lines after lines[i], stopping at an empty one."""
+    names = []
+    for ln in lines[i + 1:i + 1 + MAX_NAMES]:
+        if not ln:
+            break
+        names.append(ln)
+    return names
+
 
+def scan_bulletin(lines):
+    """
+    One pass over the bulletin lines, classifying each by SECTION_RE.
+    Returns the structured dict with references but no passage text yet.
+    """
     data = {
         #"hymns": [],
         "psalm_en": "",
@@ -50,104 +176,73 @@ def parse_pdf_to_structured(pdf_path: str) -> dict:
         "anniversary_names": [],
     }
 
-    # patterns
-    #hymn_num_pattern = re.compile(r'(?:Hymn|Kan\. Hymn|Kannada Hymn|K-|T-)\s*[:]?\s*([A-Za-z0-9\-\s]+(?:\d+)?)', re.I)
-    #simple_num_pattern = re.compile(r'\bK-?\s*(\d+)\b|\bT-?\s*(\d+)\b', re.I)
-    bible_verse_pattern = re.compile(r'([1-3]?\s?[A-Za-z]+\.?\s*\d{1,3}:\d+(?:-\d+)?)', re.I)
-    psalm_pattern = re.compile(r'Psalm\s*([0-9]{1,3}:\d+(?:-\d+)?)', re.I)
+    # references ("Exo 2:1-10", "John 3:16-4:2", "Psalm 103:1-5, 8-12") are found
+    # with bible_ref.search_reference, which resolves book names via the automaton
+    psalm_book = BOOK_ORDINALS["Psalm"]
+    announcements_at = None
 
-    # scan lines for hymns and readings
     for i, ln in enumerate(lines):
-
-        #m_k = re.search(r'(?<!M\.)\bK[-\s]?(\d{1,4})\b', ln, re.I)
-        #if m_k:
-        #    data['hymns'].append(('K', m_k.group(1), ln.strip()))  # store line
-        #    continue
-
-        # Hymn Tulu (T-294 etc.)
-        #m_t = re.search(r'(?<!M\.)\bT[-\s]?(\d{1,4})\b', ln, re.I)
-        #if m_t:
-         #   data['hymns'].append(('T', m_t.group(1), ln.strip()))
-         #   continue
-
-        # Psalm
-        m_ps = psalm_pattern.search(ln)
-        if m_ps and not data['psalm']:
-            ref = "Psalm " + m_ps.group(1)
-            data['psalm'] = ref
-            passages = fetch_bible_passage(ref, "en")
-            data['psalm_en'] = "\n\n".join(passages)
-            data['psalm_kn'] = to_kannada_ref(ref)
+        # Psalm: the first line with a Psalm chapter:verse reference
+        if not data['psalm']:
+            m_ps = find_reference(ln, require_verse=True)
+            if m_ps and m_ps.book_no == psalm_book:
+                data['psalm'] = "Psalm " + m_ps.numbers
+                continue
+
+        section = _line_section(ln)
+        if section is None:
             continue
 
-        # Old Testament
-        if re.search(r'Old Testament|O\.T\.|Old Test', ln, re.I):
-            mv = bible_verse_pattern.search(ln) or (bible_verse_pattern.search(lines[i+1]) if i+1 < len(lines) else None)
-            if mv:
-                ref = mv.group(1)
-                data['old_testament'] = ref
-                passages = fetch_bible_passage(ref, "en")
-                data['old_testament_en'] = "\n\n".join(passages)
-                data['old_testament_kn'] = to_kannada_ref(ref)
-            continue
+        if section in ("old_testament", "new_testament", "gospel"):
+            # the reference is on the heading line or the one after it; the last heading wins
+            ref = search_reference(ln) or (search_reference(lines[i+1]) if i+1 < len(lines) else None)
+            if ref:
+                data[section] = ref
+        elif section == "announcements":
+            announcements_at = i  # the block of the last heading is kept
+        else:
+            data[f'{section}_names'].extend(_names_after(lines, i))
+
+    if announcements_at is not None:
+        block = []
+        for nxt in lines[announcements_at + 1:]:
+            if ANNOUNCEMENTS_END_RE.match(nxt):
+                break
+            block.append(nxt)
+        data['announcements_block'] = "\n".join(block).strip()
 
-        # New Testament
-        if re.search(r'New Testament|N\.T\.|New Testa', ln, re.I):
-            mv = bible_verse_pattern.search(ln) or (bible_verse_pattern.search(lines[i+1]) if i+1 < len(lines) else None)
-            if mv:
-                ref = mv.group(1)
-                data['new_testament'] = ref
-                passages = fetch_bible_passage(ref, "en")
-                data['new_testament_en'] = "\n\n".join(passages)
-                data['new_testament_kn'] = to_kannada_ref(ref)
-            continue
+    return data
 
-        # Gospel
-        if re.search(r'Gospel Reading|Gospel', ln, re.I):
-            mv = bible_verse_pattern.search(ln) or (bible_verse_pattern.search(lines[i+1]) if i+1 < len(lines) else None)
-            if mv:
-                ref = mv.group(1)
-                data['gospel'] = ref
-                passages = fetch_bible_passage(ref, "en")
-                data['gospel_en'] = "\n\n".join(passages)
-                data['gospel_kn'] = to_kannada_ref(ref)
-            continue
 
-        # Announcements
-        if re.match(r'ANNOUNCEMENTS', ln, re.I):
-            # gather subsequent lines until an obvious heading end
-            j = i+1
-            block = []
-            while j < len(lines):
-                nxt = lines[j]
-                if re.match(r'^(Praise|Off|Hymn|Lord\'s Prayer|THANK|Birthday|Happy Birthday)', nxt, re.I):
-                    break
-                block.append(nxt)
-                j += 1
-            data['announcements_block'] = "\n".join(block).strip()
-            continue
-
-        # Birthday / Anniversary entries (simple heuristic)
-        if re.search(r'Happy Birthday|Birthday', ln, re.I):
-            # gather following lines which are names until empty or next section
-            j = i+1
-            names = []
-            while j < len(lines) and lines[j].strip():
-                names.append(lines[j].strip())
-                j += 1
-            data['birthday_names'].extend(names[:20])
-            continue
+def resolve_readings(data):
+    """Fill *_en (passage text, fetched as one batch) and *_kn for the references found."""
+    refs = [data[key] for key in READINGS]
+    for key, ref, passages in zip(READINGS, refs, fetch_bible_passages(refs, "en")):
+        if ref:
+            data[f'{key}_en'] = "\n\n".join(passages)
+            data[f'{key}_kn'] = to_kannada_ref(ref)
+    return data
 
-        if re.search(r'Happy Anniversary|Anniversary', ln, re.I):
-            j = i+1
-            names = []
-            while j < len(lines) and lines[j].strip():
-                names.append(lines[j].strip())
-                j += 1
-            data['anniversary_names'].extend(names[:20])
-            continue
 
-    return data
+@timed("pdf_parse")
+def parse_pdf_to_structured(pdf_path) -> dict:
+    """
+    Parse the weekly bulletin; pdf_path is a path or a binary file-like object.
+    A bulletin seen before is not extracted again (see the cache above); the
+    readings are always resolved against the current verse store.
+    """
+    if hasattr(pdf_path, "read"):
+        pdf_bytes = pdf_path.read()
+    else:
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+    key = f"{hashlib.sha256(pdf_bytes).hexdigest()}-v{PARSER_VERSION}"
+
+    data = _cached_scan(key)
+    if data is None:
+        data = scan_bulletin(extract_lines(io.BytesIO(pdf_bytes)))
+        _remember_scan(key, data)
+    return resolve_readings(data)
 
 # wrapper used by app
 def parse_pdf_to_structured_wrapper(path):
@@ -0,0 +1,69 @@
+# pipeline.py
+"""
+One deck build, from uploaded files to PPTX bytes, without touching shared
+paths on disk.
+
+Every input may be a path or a file-like object (an upload stream, a
+BytesIO, ...); pdfplumber, zipfile and python-pptx all read from
+file-likes, and the deck is written into a BytesIO. Concurrent requests
+therefore never see each other's files.
+"""
+import io
+
+from build_helpers import parse_pdf_to_structured, build_mapping_wrapper
+from generate_ppt import generate_presentation
+from hymns_db import process_user_hymns
+from parse_announcements import parse_announcements_docx
+
+
+# Stages reported to the progress callback, in order
+STAGES = ("hymns", "pdf", "readings", "announcements", "render")
+
+
+def build_deck(pdf_file, template_file, form, hymn_db, announcements_file=None, style_profile=None,
+               progress=None, optimize_media=None, fit_text=None, unresolved=None):
+    """
+    Build the presentation for one service.
+
+    form is the hymn form (hymnN_number / hymnN_verses / hymnN_language);
+    announcements_file is the optional announcements DOCX.
+    progress, if given, is called with each STAGES name as it starts.
+    optimize_media and fit_text override OPTIMIZE_MEDIA (template_media.py)
+    and FIT_TEXT (textfit.py).
+    unresolved, if given, is a list extended with the template placeholders
+    that got no value (see generate_presentation).
+    Returns a BytesIO positioned at the start of the finished PPTX.
+    """
+    report = progress or (lambda stage: None)
+
+    report("hymns")
+    hymn_placeholders = process_user_hymns(form, hymn_db)
+
+    report("pdf")
+    parsed = parse_pdf_to_structured(pdf_file)
+
+    report("readings")
+    mapping, announcements_table = build_mapping_wrapper(parsed, hymn_db)
+    mapping.update({f'{{{k}}}': v for k, v in hymn_placeholders.items()})
+
+    if announcements_file:
+        report("announcements")
+        ann_table, ann_text = parse_announcements_docx(announcements_file)
+
+        # Override announcements text
+        parsed['announcements_block'] = ann_text
+        mapping['{ANNOUNCEMENTS_TEXT}'] = ann_text
+
+        # Override announcements table if we found one
+        if ann_table:
+            announcements_table = ann_table
+
+    report("render")
+    out = io.BytesIO()
+    missing = generate_presentation(template_file, out, mapping, announcements_table_data=announcements_table,
+                                    style_profile=style_profile, optimize_media=optimize_media,
+                                    fit_text=fit_text)
+    if unresolved is not None:
+        unresolved.extend(missing)
+    out.seek(0)
+    return out
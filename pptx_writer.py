@@ -0,0 +1,190 @@
+# pptx_writer.py
+"""
+Save a filled template without re-encoding the parts it did not change.
+
+python-pptx's save re-serializes every XML part and recompresses every part
+of the package, although a deck build only edits the text of a few slides
+and the rest of a Canva template (pictures, fonts, layouts, masters) is
+most of its size. A TemplateSource, taken when the template is opened,
+remembers which zip member each part came from and what its relationships
+were. save_presentation then encodes only what changed: the slides the
+build edited or cloned, parts whose blob was replaced, relationship files
+that no longer match, and [Content_Types].xml. Every other member is copied
+from the template byte for byte, still compressed.
+
+Templates whose members cannot be copied like that (encrypted, zip64) are
+saved with prs.save, as is everything when python-pptx's package
+internals are not what this module expects.
+"""
+import io
+import logging
+import struct
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+ZIP_VERSION = 20
+ZIP32_LIMIT = 0xFFFFFFFF
+MAX_MEMBERS = 0xFFFF
+UTF8_FLAG = 0x800
+ENCRYPTED_FLAG = 0x1
+DEFLATE_OPTION_FLAGS = 0x6
+COMPRESS_LEVEL = 6
+NEW_MEMBER_ATTR = 0o600 << 16
+
+# One member of the output zip; data is compressed (raw template bytes or freshly deflated)
+Member = namedtuple("Member", "name method flags crc size dos_time dos_date attr data")
+
+# Where a part came from: its zip member and rels member, its blob (binary parts) and relationships
+_Origin = namedtuple("_Origin", "member rels_member blob rels")
+
+
+class RawCopyUnavailable(Exception):
+    """The template cannot be copied member by member; prs.save is used instead."""
+
+
+def _rels_key(rels):
+    """Comparable summary of a relationship collection (targets by part and current name)."""
+    key = set()
+    for rel in rels.values():
+        if rel.is_external:
+            key.add((rel.rId, rel.reltype, True, rel.target_ref, None))
+        else:
+            # not target_ref: python-pptx caches it, and slides are renamed after this is taken
+            key.add((rel.rId, rel.reltype, False, rel.target_part, str(rel.target_part.partname)))
+    return frozenset(key)
+
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time[:6]
+    return hour << 11 | minute << 5 | second // 2, max(year - 1980, 0) << 9 | month << 5 | day
+
+
+class TemplateSource:
+    """The template zip of a freshly opened Presentation, and where each of its parts came from."""
+
+    def __init__(self, prs, data):
+        from pptx.opc.package import XmlPart
+
+        self.data = memoryview(data)
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            self.members = {info.filename: info for info in z.infolist()}
+        package = prs.part.package
+        self.package_rels = _rels_key(package._rels)
+        self.origins = {}
+        for part in package.iter_parts():
+            member = part.partname.membername
+            if member not in self.members:
+                continue  # created by python-pptx on load (e.g. missing core properties)
+            blob = None if isinstance(part, XmlPart) else part.blob
+            self.origins[part] = _Origin(member, part.partname.rels_uri.membername, blob, _rels_key(part.rels))
+
+    def raw(self, member_name, name=None):
+        """Member `name` holding the template's member_name exactly as compressed in the template."""
+        info = self.members.get(member_name)
+        if info is None:
+            return None
+        if info.flag_bits & ENCRYPTED_FLAG:
+            raise RawCopyUnavailable(f"{member_name} is encrypted")
+        if max(info.header_offset, info.compress_size, info.file_size) >= ZIP32_LIMIT:
+            raise RawCopyUnavailable(f"{member_name} needs zip64")
+        header = LOCAL_HEADER.unpack_from(self.data, info.header_offset)
+        start = info.header_offset + LOCAL_HEADER.size + header[-2] + header[-1]
+        dos_time, dos_date = _dos_time(info.date_time)
+        return Member(name or member_name, info.compress_type, info.flag_bits & DEFLATE_OPTION_FLAGS, info.CRC,
+                      info.file_size, dos_time, dos_date, info.external_attr,
+                      self.data[start:start + info.compress_size])
+
+    def output_members(self, prs, changed=()):
+        """
+        Members of the saved deck, in python-pptx's order: a part in
+        `changed`, a part new since the template was opened or a binary part
+        whose blob was replaced is encoded; any other part, and any
+        relationships file whose relationships are unchanged, is copied raw.
+        """
+        from pptx.opc.oxml import serialize_part_xml
+        from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+        from pptx.opc.serialized import _ContentTypesItem
+
+        package = prs.part.package
+        parts = tuple(package.iter_parts())
+        changed = set(changed)
+        now = _dos_time(time.localtime())
+
+        def new(name, blob):
+            c = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+            return Member(name, zipfile.ZIP_DEFLATED, 0, zlib.crc32(blob), len(blob), now[0], now[1],
+                          NEW_MEMBER_ATTR, c.compress(blob) + c.flush())
+
+        pkg_rels_name = PACKAGE_URI.rels_uri.membername
+        members = [new(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))]
+        pkg_rels = _rels_key(package._rels) == self.package_rels and self.raw(pkg_rels_name)
+        members.append(pkg_rels or new(pkg_rels_name, package._rels.xml))
+        for part in parts:
+            name = part.partname.membername
+            origin = self.origins.get(part)
+            copied = None
+            if origin is not None and part not in changed and (origin.blob is None or part.blob is origin.blob):
+                copied = self.raw(origin.member, name)
+            members.append(copied or new(name, part.blob))
+            if part._rels:
+                copied = None
+                if origin is not None and _rels_key(part.rels) == origin.rels:
+                    copied = self.raw(origin.rels_member, part.partname.rels_uri.membername)
+                members.append(copied or new(part.partname.rels_uri.membername, part.rels.xml))
+
+        if len(members) >= MAX_MEMBERS or sum(len(m.data) for m in members) >= ZIP32_LIMIT:
+            raise RawCopyUnavailable("deck needs zip64")
+        return members
+
+
+def write_zip(f, members):
+    """Write members (already compressed) to the binary file f as a zip archive."""
+    offset = 0
+    central = []
+    for m in members:
+        name = m.name.encode("utf-8")
+        flags = m.flags | (0 if m.name.isascii() else UTF8_FLAG)
+        f.write(LOCAL_HEADER.pack(b"PK\x03\x04", ZIP_VERSION, flags, m.method, m.dos_time, m.dos_date,
+                                  m.crc, len(m.data), m.size, len(name), 0))
+        f.write(name)
+        f.write(m.data)
+        central.append(CENTRAL_HEADER.pack(b"PK\x01\x02", ZIP_VERSION, ZIP_VERSION, flags, m.method, m.dos_time,
+                                           m.dos_date, m.crc, len(m.data), m.size, len(name), 0, 0, 0, 0,
+                                           m.attr, offset) + name)
+        offset += LOCAL_HEADER.size + len(name) + len(m.data)
+    for entry in central:
+        f.write(entry)
+    size = sum(len(entry) for entry in central)
+    f.write(END_RECORD.pack(b"PK\x05\x06", 0, 0, len(central), len(central), size, offset, 0))
+
+
+def save_presentation(prs, output, source=None, changed=()):
+    """
+    Save prs to output (a path or binary file-like). Given the TemplateSource
+    prs was opened from and the parts edited since (`changed`), only those
+    and the parts python-pptx added or replaced are encoded; otherwise, or
+    when the template cannot be copied raw, this is prs.save.
+    """
+    if source is not None:
+        members = None
+        try:
+            members = source.output_members(prs, changed)
+        except RawCopyUnavailable as e:
+            log.info("saving with python-pptx: %s", e)
+        except (AttributeError, ImportError, TypeError):
+            log.warning("python-pptx package internals changed; saving with python-pptx", exc_info=True)
+        if members is not None:
+            if hasattr(output, "write"):
+                write_zip(output, members)
+            else:
+                with open(output, "wb") as f:
+                    write_zip(f, members)
+            return
+    prs.save(output)
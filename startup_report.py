@@ -0,0 +1,81 @@
+# startup_report.py
+"""
+Start-up time report for the Flask app.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, prints the
+slowest imports (cumulative time) and the time until the background warm-up
+marks the app ready, and exits with status 1 when importing app.py or
+becoming ready takes longer than the budget. tests/test_startup.py runs the
+same check. Use it as a boot-time check in CI or before deploys:
+
+    python startup_report.py                  # budget from STARTUP_BUDGET_MS or 1500 ms
+    python startup_report.py --budget-ms 800 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = int(os.environ.get("STARTUP_BUDGET_MS", "1500"))
+
+# Imports app, then waits for the warm-up thread; prints both timings in ms
+# (or exits with the load error when warm-up failed).
+PROBE = (
+    "import sys, time; t0 = time.perf_counter(); import app; t1 = time.perf_counter(); "
+    "app._warmed_up.wait(); t2 = time.perf_counter(); "
+    "app._ready.is_set() or sys.exit(f'warm-up failed: {app._load_error}'); "
+    "print(f'{(t1 - t0) * 1000:.1f} {(t2 - t0) * 1000:.1f}')"
+)
+
+
+def parse_importtime(stderr: str):
+    """Parse -X importtime output into [(cumulative_us, self_us, module), ...]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        rows.append((cumulative_us, self_us, parts[2].rstrip()))
+    return rows
+
+
+def measure_startup():
+    """Return (import_ms, ready_ms, importtime_rows) for a cold interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=here, capture_output=True, text=True, check=True,
+    )
+    import_ms, ready_ms = (float(x) for x in proc.stdout.strip().splitlines()[-1].split())
+    return import_ms, ready_ms, parse_importtime(proc.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                    help="fail if `import app` or the warm-up takes longer than this")
+    ap.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = ap.parse_args(argv)
+
+    import_ms, ready_ms, rows = measure_startup()
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+    print()
+    print(f"import app:     {import_ms:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"warm-up ready:  {ready_ms:8.1f} ms")
+
+    if ready_ms > args.budget_ms:  # ready_ms includes the import
+        print(f"FAIL: start-up is {ready_ms - args.budget_ms:.1f} ms over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
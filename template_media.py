@@ -0,0 +1,302 @@
+# template_media.py
+"""
+Shrink a template's media once, before decks are built from it.
+
+Canva exports embed every background at full resolution, often as a
+separate copy per slide, and every deck built from the template carried all
+of them. optimize_template() rewrites a template so that
+
+    - media parts with identical bytes become one part,
+    - pictures larger than they can appear on the projector (PROJECTOR_SIZE,
+      default 1920x1080) are downscaled, allowing for the size each use
+      takes on the slide and its cropping, and
+    - media relationships no slide, layout or master refers to are dropped,
+      so their parts are no longer saved.
+
+Pictures whose displayed size cannot be worked out safely (tiled fills,
+grouped shapes, positions inherited from a layout, uses outside slides)
+keep their resolution. Results are cached by the template's sha256 plus
+OPTIMIZER_VERSION and the settings, in memory and, if MEDIA_CACHE_DIR is
+set, as files there, so the work is paid once per template and not per
+deck. OPTIMIZE_MEDIA=1 turns the pass on for uploads.
+"""
+import hashlib
+import io
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import register_cache, timed
+
+log = logging.getLogger(__name__)
+
+OPTIMIZER_VERSION = 1  # bump whenever optimize_template changes its output
+
+OPTIMIZE_MEDIA = os.environ.get("OPTIMIZE_MEDIA", "").lower() in ("1", "true", "yes")
+PROJECTOR_SIZE = tuple(int(v) for v in os.environ.get("PROJECTOR_SIZE", "1920x1080").lower().split("x"))
+JPEG_QUALITY = 90
+MIN_SHRINK = 0.9  # pictures at most ~10% larger than needed are left alone
+RESIZABLE_FORMATS = ("PNG", "JPEG")
+RESIZABLE_MODES = ("1", "L", "LA", "P", "RGB", "RGBA", "CMYK")
+
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+EMBED = R_NS + "embed"
+BLIP, SRC_RECT, TILE = A_NS + "blip", A_NS + "srcRect", A_NS + "tile"
+BACKGROUND, GROUP = P_NS + "bg", P_NS + "grpSp"
+SHAPES = (P_NS + "pic", P_NS + "sp", P_NS + "cxnSp")
+SHAPE_EXT = f"{P_NS}spPr/{A_NS}xfrm/{A_NS}ext"
+CROP_UNITS = 100000  # a:srcRect offsets are in 1/1000 percent
+
+MEDIA_RELTYPES = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image",
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/audio",
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/video",
+    "http://schemas.microsoft.com/office/2007/relationships/media",
+)
+IMAGE_RELTYPE = MEDIA_RELTYPES[0]
+
+
+def settings_key():
+    """Everything besides the template that decides the optimized template."""
+    return f"v{OPTIMIZER_VERSION}:{PROJECTOR_SIZE[0]}x{PROJECTOR_SIZE[1]}:q{JPEG_QUALITY}"
+
+
+# --- Optimized-template cache ------------------------------------------------------
+
+MEDIA_CACHE_SIZE = 4  # templates are tens of MB
+MEDIA_CACHE_DIR = os.environ.get("MEDIA_CACHE_DIR", "")
+_media_cache = OrderedDict()
+_media_cache_lock = threading.Lock()
+_media_cache_stats = {"hits": 0, "misses": 0, "disk_hits": 0}
+
+def media_cache_info():
+    with _media_cache_lock:
+        return dict(_media_cache_stats, size=len(_media_cache), maxsize=MEDIA_CACHE_SIZE)
+
+register_cache("template_media", media_cache_info)
+
+def _disk_path(key):
+    return os.path.join(MEDIA_CACHE_DIR, key + ".pptx")
+
+def _cached_template(key):
+    with _media_cache_lock:
+        data = _media_cache.get(key)
+        if data is not None:
+            _media_cache.move_to_end(key)
+            _media_cache_stats["hits"] += 1
+            return data
+    if MEDIA_CACHE_DIR:
+        try:
+            with open(_disk_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data is not None:
+            _remember_template(key, data, to_disk=False)
+            with _media_cache_lock:
+                _media_cache_stats["hits"] += 1
+                _media_cache_stats["disk_hits"] += 1
+            return data
+    with _media_cache_lock:
+        _media_cache_stats["misses"] += 1
+    return None
+
+def _remember_template(key, data, to_disk=True):
+    with _media_cache_lock:
+        _media_cache[key] = data
+        _media_cache.move_to_end(key)
+        while len(_media_cache) > MEDIA_CACHE_SIZE:
+            _media_cache.popitem(last=False)
+    if to_disk and MEDIA_CACHE_DIR:
+        try:
+            os.makedirs(MEDIA_CACHE_DIR, exist_ok=True)
+            tmp_path = _disk_path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, _disk_path(key))
+        except OSError:
+            pass
+
+
+def optimized_template(data):
+    """The optimized version of template bytes, computed once per template and settings."""
+    key = hashlib.sha256(data).hexdigest() + "-" + hashlib.sha256(settings_key().encode()).hexdigest()[:16]
+    result = _cached_template(key)
+    if result is None:
+        result = optimize_template(data)
+        _remember_template(key, result)
+    return result
+
+
+# --- The optimization pass ---------------------------------------------------------
+
+def _rid_uses(part):
+    """rId -> [(element, attribute), ...] for every attribute of the part's XML holding one of its rIds."""
+    from lxml import etree
+
+    rids = set(part.rels.keys())
+    uses = {}
+    for el in part._element.iter(etree.Element):
+        for attr, val in el.attrib.items():
+            if val in rids:
+                uses.setdefault(val, []).append((el, attr))
+    return uses
+
+
+def _media_rels(part):
+    return [(rId, rel) for rId, rel in list(part.rels.items())
+            if rel.reltype in MEDIA_RELTYPES and not rel.is_external]
+
+
+def drop_unused_media(parts):
+    """Drop media relationships nothing in their part's XML refers to; returns how many."""
+    dropped = 0
+    for part in parts:
+        uses = _rid_uses(part)
+        for rId, _ in _media_rels(part):
+            if rId not in uses:
+                part.drop_rel(rId)
+                dropped += 1
+    return dropped
+
+
+def merge_duplicate_media(parts):
+    """Point every use of a media part at the first part with the same bytes; returns the parts merged away."""
+    canonical, digests, merged = {}, {}, set()
+    for part in parts:
+        uses = None
+        for rId, rel in _media_rels(part):
+            target = rel.target_part
+            if target not in digests:
+                digests[target] = (target.content_type, hashlib.sha256(target.blob).digest())
+            keep = canonical.setdefault(digests[target], target)
+            if keep is target:
+                continue
+            if uses is None:
+                uses = _rid_uses(part)
+            refs = uses.get(rId, [])
+            if not all(attr.startswith(R_NS) for _, attr in refs):
+                continue  # referred to outside r: attributes; leave it be
+            new_rId = part.relate_to(keep, rel.reltype)
+            for el, attr in refs:
+                el.set(attr, new_rId)
+            part.drop_rel(rId)
+            merged.add(target)
+    return merged
+
+
+def _needed_size(el, attr, slide_size, px_per_emu):
+    """(width, height) in pixels an image needs for this use of it, or None when unknown."""
+    if el.tag != BLIP or attr != EMBED:
+        return None
+    fill = el.getparent()
+    if fill is None or fill.find(TILE) is not None:
+        return None
+    crop = fill.find(SRC_RECT)
+    fx = fy = 1.0
+    if crop is not None:
+        fx = 1 - (int(crop.get("l", 0)) + int(crop.get("r", 0))) / CROP_UNITS
+        fy = 1 - (int(crop.get("t", 0)) + int(crop.get("b", 0))) / CROP_UNITS
+    shown = None
+    for ancestor in fill.iterancestors():
+        if ancestor.tag == GROUP:
+            return None  # the group's own scaling applies
+        if shown is None and ancestor.tag == BACKGROUND:
+            shown = slide_size
+        elif shown is None and ancestor.tag in SHAPES:
+            ext = ancestor.find(SHAPE_EXT)
+            if ext is None:
+                return None  # position inherited from the layout
+            shown = (int(ext.get("cx")), int(ext.get("cy")))
+    if shown is None:
+        return None
+    return shown[0] * px_per_emu / max(fx, 0.01), shown[1] * px_per_emu / max(fy, 0.01)
+
+
+def _downscaled(blob, width, height):
+    """blob re-encoded at least (width, height) pixels large, or None when that does not make it smaller."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(blob)) as img:
+        fmt = img.format
+        if fmt not in RESIZABLE_FORMATS or img.mode not in RESIZABLE_MODES or getattr(img, "is_animated", False):
+            return None
+        factor = max(width / img.width, height / img.height)
+        if factor >= MIN_SHRINK:
+            return None
+        size = (max(1, math.ceil(img.width * factor)), max(1, math.ceil(img.height * factor)))
+        info = img.info
+        if img.mode in ("1", "P"):
+            img = img.convert("RGBA" if "transparency" in info else "RGB")
+        small = img.resize(size, Image.LANCZOS)
+    out = io.BytesIO()
+    extra = {k: info[k] for k in ("icc_profile", "exif", "dpi") if k in info}
+    if fmt == "JPEG":
+        small.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, **extra)
+    else:
+        small.save(out, "PNG", optimize=True, **extra)
+    new = out.getvalue()
+    return new if len(new) < len(blob) else None
+
+
+def downscale_pictures(parts, slide_size, projector_size=PROJECTOR_SIZE):
+    """Downscale pictures larger than any of their uses can show; returns the parts changed."""
+    from pptx.parts.slide import SlideLayoutPart, SlideMasterPart, SlidePart
+
+    px_per_emu = min(projector_size[0] / slide_size[0], projector_size[1] / slide_size[1])
+    needed = {}  # image part -> (width, height) in pixels, or None when it must keep its size
+    for part in parts:
+        on_slide = isinstance(part, (SlidePart, SlideLayoutPart, SlideMasterPart))
+        uses = _rid_uses(part)
+        for rId, rel in _media_rels(part):
+            target = rel.target_part
+            if rel.reltype != IMAGE_RELTYPE:
+                needed[target] = None
+                continue
+            for el, attr in uses.get(rId, []):
+                size = _needed_size(el, attr, slide_size, px_per_emu) if on_slide else None
+                if size is None or (target in needed and needed[target] is None):
+                    needed[target] = None
+                else:
+                    prev = needed.get(target, (0, 0))
+                    needed[target] = (max(prev[0], size[0]), max(prev[1], size[1]))
+
+    changed = []
+    for target, size in needed.items():
+        if size is None:
+            continue
+        try:
+            blob = _downscaled(target.blob, *size)
+        except (OSError, ValueError) as e:
+            log.warning("cannot downscale %s: %s", target.partname, e)
+            continue
+        if blob is not None:
+            target.blob = blob
+            changed.append(target)
+    return changed
+
+
+@timed("media_optimize")
+def optimize_template(data):
+    """Template bytes with duplicate media merged, pictures downscaled and unused media dropped."""
+    from pptx import Presentation
+    from pptx.opc.package import XmlPart
+
+    prs = Presentation(io.BytesIO(data))
+    parts = [part for part in prs.part.package.iter_parts() if isinstance(part, XmlPart)]
+    dropped = drop_unused_media(parts)
+    merged = merge_duplicate_media(parts)
+    downscaled = downscale_pictures(parts, (prs.slide_width, prs.slide_height))
+    if not (dropped or merged or downscaled):
+        return data
+
+    out = io.BytesIO()
+    prs.save(out)
+    result = out.getvalue()
+    log.info("template media: %d unused media links dropped, %d duplicates merged, %d pictures downscaled; "
+             "%d -> %d KB", dropped, len(merged), len(downscaled), len(data) // 1024, len(result) // 1024)
+    return result if len(result) < len(data) else data
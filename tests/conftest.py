@@ -0,0 +1,9 @@
+# tests/conftest.py
+# The modules live at the top of the repo and open their data files
+# (hymn CSVs, bible.verses) relative to it.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
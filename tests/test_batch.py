@@ -0,0 +1,23 @@
+# tests/test_batch.py
+import pytest
+
+pptx = pytest.importorskip("pptx")
+
+import batch
+from hymns_db import HymnDatabase
+from test_generate_ppt import _template
+
+
+def test_report_lists_unresolved_placeholders(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "_worker_hymn_db",
+                        HymnDatabase("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv"))
+    template = _template(tmp_path / "template.pptx", [
+        ["{PSALM_EN_V*}"],
+        ["{GOSPEL_EN_V1} {MISSING_ONE}"],
+        ["{NOT_A_KEY}"],
+    ])
+    service = {"pdf": "uploads/input.pdf", "template": template, "form": {},
+               "output": str(tmp_path / "deck.pptx"), "fit_text": False}
+    report = batch._build_one(service)
+    assert report["status"] == "done", report["error"]
+    assert report["unresolved"] == ["{MISSING_ONE}", "{NOT_A_KEY}"]
@@ -0,0 +1,68 @@
+# tests/test_bible_fetch.py
+import logging
+from collections import OrderedDict
+
+import pytest
+
+import bible_fetch
+from bible_fetch import _format_blocks, fetch_parallel_passages
+from bible_normalize import BOOK_ORDER
+from verse_store import make_key
+
+JOHN = BOOK_ORDER.index("John") + 1
+
+
+def test_missing_translation_gives_no_blocks(caplog):
+    with caplog.at_level(logging.WARNING, logger="bible_fetch"):
+        passages = fetch_parallel_passages(["John 3:16", ""], ("en", "xx"))
+    assert passages["en"][0][0].startswith("16 For God so loved the world")
+    assert passages["xx"] == [[], []]
+    assert "'xx'" in caplog.text
+
+
+def test_translation_lacking_the_verses_gives_no_blocks(caplog):
+    key = (JOHN, (((3, 16), (3, 17)),))
+    verses = [(make_key(JOHN, 3, 16), ""), (make_key(JOHN, 3, 17), "")]
+    with caplog.at_level(logging.WARNING, logger="bible_fetch"):
+        assert _format_blocks(key, verses, "kn") == ()
+    assert "no 'kn' text for John 3:16-17" in caplog.text
+
+
+def test_unknown_passage_is_reported():
+    key = (JOHN, (((3, 900), (3, 901)),))
+    assert _format_blocks(key, [], "en") == ("[No verses found for John 3:900-901]",)
+
+
+@pytest.fixture
+def passage_cache(monkeypatch):
+    """An empty passage cache of two entries; returns the list of ranges read from the store."""
+    monkeypatch.setattr(bible_fetch, "_passage_cache", OrderedDict())
+    monkeypatch.setattr(bible_fetch, "_cache_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(bible_fetch, "PASSAGE_CACHE_SIZE", 2)
+    store = bible_fetch.get_verse_store()
+    reads = []
+
+    def read_aligned(ranges, langs):
+        reads.append(list(ranges))
+        return read(ranges, langs)
+    read = store.read_aligned
+    monkeypatch.setattr(store, "read_aligned", read_aligned)
+    return reads
+
+
+def test_passage_cache_hits_and_lru_eviction(passage_cache):
+    first = fetch_parallel_passages(["John 3:16-17"], ("en",))
+    # the same reference written differently is the same normalized key: no second read
+    assert fetch_parallel_passages(["Jn 3:16-17"], ("en",)) == first
+    assert len(passage_cache) == 1
+    assert bible_fetch.passage_cache_info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+    fetch_parallel_passages(["John 1:1"], ("en",))
+    fetch_parallel_passages(["John 3:16-17"], ("en",))  # most recently used again
+    fetch_parallel_passages(["John 2:1"], ("en",))      # evicts John 1:1
+    assert len(passage_cache) == 3
+    assert [key for _, key in bible_fetch._passage_cache] == [(JOHN, (((3, 16), (3, 17)),)),
+                                                               (JOHN, (((2, 1), (2, 1)),))]
+    fetch_parallel_passages(["John 1:1"], ("en",))
+    assert len(passage_cache) == 4
+    assert bible_fetch.passage_cache_info() == {"hits": 2, "misses": 4, "size": 2, "maxsize": 2}
@@ -0,0 +1,41 @@
+# tests/test_bible_ref.py
+import pytest
+
+from bible_ref import PassageFormatError, format_segments, parse_reference, search_reference
+
+REFERENCES = [
+    ("Genesis 1:1-4", "Genesis", "1:1-4"),
+    ("John 3:16-4:2", "John", "3:16-4:2"),
+    ("Psalm 103:1-5, 8-12", "Psalm", "103:1-5; 103:8-12"),
+    ("Isaiah 40:1-11; 41:10", "Isaiah", "40:1-11; 41:10"),
+    ("Psalm 23", "Psalm", "23"),
+    ("Ruth 1-2", "Ruth", "1-2"),
+    ("3 John 1-15", "3 John", "1:1-15"),
+    ("Jude 3", "Jude", "1:3"),
+    ("Psalm: 47:1-7", "Psalm", "47:1-7"),
+    ("John 3: 16", "John", "3:16"),
+    ("John 3 : 16-18", "John", "3:16-18"),
+    ("John 3:16 - 4: 2", "John", "3:16-4:2"),
+    ("Psalm 23 and 24", "Psalm", "23; 24"),
+    ("PSALM 23 AND 24", "Psalm", "23; 24"),
+    ("Psalm 23 & 24", "Psalm", "23; 24"),
+    ("John 3:16 and 18", "John", "3:16; 3:18"),
+    ("Luke 2:1-14 (15-20)", "Luke", "2:1-14"),
+    ("Luke 2:1-14 [15-20]", "Luke", "2:1-14"),
+]
+
+
+@pytest.mark.parametrize("text, book, segments", REFERENCES)
+def test_parse_reference(text, book, segments):
+    ref = parse_reference(text)
+    assert (ref.book, format_segments(ref.segments)) == (book, segments)
+
+
+@pytest.mark.parametrize("text", ["Psalm 23 or 24", "Mark 1:1 to 2", "Luke 2:1-14 (15-20) 21", "Psalm"])
+def test_unparsed_text_is_rejected(text):
+    with pytest.raises(PassageFormatError):
+        parse_reference(text)
+
+
+def test_search_reference_allows_spaced_colon():
+    assert search_reference("Gospel Reading: John 3: 16") == "John 3: 16"
@@ -0,0 +1,74 @@
+# tests/test_deck_cache.py
+import os
+
+import pytest
+
+pytest.importorskip("pptx")
+
+import deck_cache
+from deck_cache import DeckCache
+
+KB = 1024
+
+
+def _cache(directory, max_kb):
+    cache = DeckCache(str(directory), max_mb=1)
+    cache.max_bytes = max_kb * KB
+    return cache
+
+
+def _age(directory, key, seconds):
+    """Make a deck look last used `seconds` ago."""
+    path = os.path.join(str(directory), key + ".pptx")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+
+def _keys(directory):
+    return sorted(name[:-5] for name in os.listdir(str(directory)) if name.endswith(".pptx"))
+
+
+def test_lru_eviction_and_counters(tmp_path):
+    cache = _cache(tmp_path, 3)
+    for i, key in enumerate("abc"):
+        cache.put(key, key.encode() * KB)
+        _age(tmp_path, key, 10 - i)  # a oldest, c newest
+    assert cache.get("a") == b"a" * KB  # a is now the most recently used
+    assert cache.get("missing") is None
+    cache.put("d", b"d" * KB)
+    assert _keys(tmp_path) == ["a", "c", "d"]  # b was least recently used
+    assert cache.info() == {"hits": 1, "misses": 1, "size": 3, "bytes": 3 * KB}
+
+
+def test_limit_is_shared_by_processes_on_one_directory(tmp_path):
+    # two workers, each with its own DeckCache, on the same directory
+    first, second = _cache(tmp_path, 3), _cache(tmp_path, 3)
+    first.put("a", b"a" * KB)
+    _age(tmp_path, "a", 5)
+    second.put("b", b"b" * KB)
+    _age(tmp_path, "b", 4)
+    first.put("c", b"c" * KB)
+    second.put("d", b"d" * KB)
+    assert _keys(tmp_path) == ["b", "c", "d"]  # second counted first's deck and evicted it
+    assert first.get("b") == b"b" * KB  # a deck the other worker wrote is a hit
+    assert second.get("a") is None
+
+
+def test_deck_larger_than_the_cache_is_not_stored(tmp_path):
+    cache = _cache(tmp_path, 1)
+    cache.put("big", b"x" * (2 * KB))
+    assert not os.path.exists(os.path.join(str(tmp_path), "big.pptx"))
+
+
+def test_build_version_follows_data_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(deck_cache, "HERE", str(tmp_path))
+    monkeypatch.setattr(deck_cache, "DATA_FILES", ("bible.verses",))
+    monkeypatch.setattr(deck_cache, "_code_version", lambda: "code")
+    before = deck_cache.build_version()
+    # recompiled after the first key was taken (as by the warm-up)
+    (tmp_path / "bible.verses").write_bytes(b"store")
+    compiled = deck_cache.build_version()
+    assert compiled != before
+    assert deck_cache.build_version() == compiled
+    os.utime(tmp_path / "bible.verses", ns=(0, 10**9))
+    assert deck_cache.build_version() != compiled
@@ -0,0 +1,70 @@
+# tests/test_generate_ppt.py
+import pytest
+
+pptx = pytest.importorskip("pptx")
+
+from pptx.util import Inches
+
+from generate_ppt import generate_presentation
+
+
+def _template(path, slides):
+    """A template with one slide per list of text-box texts."""
+    prs = pptx.Presentation()
+    for texts in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blank
+        for i, text in enumerate(texts):
+            slide.shapes.add_textbox(Inches(1), Inches(1 + 2 * i), Inches(8), Inches(1.5)).text_frame.text = text
+    prs.save(path)
+    return str(path)
+
+
+def _texts(path):
+    return [[shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+            for slide in pptx.Presentation(path).slides]
+
+
+@pytest.fixture
+def template(tmp_path):
+    return _template(tmp_path / "template.pptx", [
+        ["{PSALM_EN_V*}", "{PSALM_KN_V*}"],
+        ["{SERVICE_DATE} - {SERVICE_NAME}"],
+        ["{HYMN9_EN_V1}"],
+    ])
+
+
+MAPPING = {
+    "{PSALM_EN_V1}": "1 Clap your hands",
+    "{PSALM_KN_V1}": "೧ ಚಪ್ಪಾಳೆ",
+    "{PSALM_EN_V2}": "2 For the LORD",  # no Kannada for this block
+    "{SERVICE_DATE}": "12 October",
+}
+
+
+def test_kept_slides_show_no_unfilled_placeholders(template, tmp_path):
+    out = tmp_path / "deck.pptx"
+    generate_presentation(template, str(out), dict(MAPPING), fit_text=False)
+    assert _texts(out) == [
+        ["1 Clap your hands", "೧ ಚಪ್ಪಾಳೆ"],
+        ["2 For the LORD", ""],
+        ["12 October - "],
+    ]
+
+
+def test_placeholders_kept_without_pruning(template, tmp_path):
+    out = tmp_path / "deck.pptx"
+    generate_presentation(template, str(out), dict(MAPPING), prune_unused=False, fit_text=False)
+    texts = _texts(out)
+    assert texts[1] == ["2 For the LORD", "{PSALM_KN_V*}"]
+    assert texts[2:] == [["12 October - {SERVICE_NAME}"], ["{HYMN9_EN_V1}"]]
+
+
+def test_unresolved_placeholders_are_returned(tmp_path):
+    template = _template(tmp_path / "template.pptx", [
+        ["{PSALM_EN_V*}", "{PSALM_KN_V*}"],
+        ["{SERVICE_DATE} - {MISSING_ONE}"],
+        ["{NOT_A_KEY}"],
+    ])
+    unresolved = generate_presentation(template, str(tmp_path / "deck.pptx"),
+                                       dict(MAPPING, **{"{MISSING_ONE}": ""}), fit_text=False)
+    assert unresolved == ["{PSALM_KN_V2}", "{MISSING_ONE}", "{NOT_A_KEY}"]
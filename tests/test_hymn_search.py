@@ -0,0 +1,20 @@
+# tests/test_hymn_search.py
+from hymn_search import HymnSearchIndex
+from hymns_db import HymnDatabase, LazyHymnTable
+
+CSVS = ("kannada_hymns.csv", "tulu_hymns.csv", "english_hymns.csv")
+
+
+def test_lean_index_reads_no_hymns(monkeypatch):
+    db = HymnDatabase(*CSVS, lean=True)
+
+    def read_hymn(self, hymn_no):
+        raise AssertionError(f"hymn {hymn_no} read while indexing")
+    monkeypatch.setattr(LazyHymnTable, "_read_hymn", read_hymn)
+    lean = HymnSearchIndex(db)
+
+    full = HymnSearchIndex(HymnDatabase(*CSVS))
+    assert lean.docs == full.docs
+    first_line = full.docs[full.by_number["12"][0]][2]
+    assert lean.search(first_line)[0]["number"] == "12"
+    assert lean.search("12", "english") == full.search("12", "english")
@@ -0,0 +1,124 @@
+# tests/test_hymns_db.py
+import csv
+import logging
+import os
+import pickle
+
+import pytest
+
+import hymns_db
+from hymns_db import HymnDatabase
+
+HEADER = ["Hymn_No", "Kannada", "English", "Number", "Author"]
+ROWS = [
+    ["1", "1. ಯೆಹೋವ ಯೆಹೋವ\nನಿನ್ನ ನಾಮ\n\n2. ಆಮೆನ್ ಆಮೆನ್", "1. Praise the Lord\nall ye \"nations\"\n\n2. Amen", "1", "A"],
+    ["002", "1. ಒಂದೇ ಸಾಲು", "1. He said \"\"come\"\", and\r\nwe came", "2", "B, C"],
+    ["", "no number: skipped", "", "", ""],
+    ["3", "", "1. Only English, \"quoted\"\n2. second verse", "3", ""],
+]
+
+
+def _write_csv(path, rows, mtime=None):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\r\n")
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def _offsets_signature(csv_path):
+    """(size, mtime_ns) of the CSV the saved offsets file was built from."""
+    with open(csv_path + ".offsets", "rb") as f:
+        return tuple(pickle.load(f)[0][1:])
+
+
+def _hymns(db):
+    return {number: (hymn.number, hymn.language, hymn.local_verses, hymn.english_verses)
+            for number, hymn in ((n, db.kannada_db.get(n)) for n in db.kannada_db.keys())}
+
+
+@pytest.fixture
+def hymn_csv(tmp_path):
+    return _write_csv(tmp_path / "kannada.csv", ROWS)
+
+
+def test_lean_reads_the_same_hymns_as_the_eager_loader(hymn_csv, tmp_path):
+    with open(hymn_csv, "rb") as f:
+        data = f.read()
+    assert b"\r\n" in data and b'""' in data  # CRLF records and escaped quotes
+    eager = HymnDatabase(hymn_csv, str(tmp_path / "none.csv"), None)
+    lean = HymnDatabase(hymn_csv, str(tmp_path / "none.csv"), None, lean=True)
+    assert sorted(eager.kannada_db) == ["1", "2", "3"]
+    assert _hymns(lean) == _hymns(eager)
+    assert "\n" in eager.kannada_db["1"].english_verses[0][1]  # the quoted newline stayed in its field
+    # from the saved offsets file
+    assert _hymns(HymnDatabase(hymn_csv, str(tmp_path / "none.csv"), None, lean=True)) == _hymns(eager)
+
+
+def test_offsets_rebuilt_when_the_csv_changes(hymn_csv, tmp_path):
+    missing = str(tmp_path / "none.csv")
+    before = HymnDatabase(hymn_csv, missing, None, lean=True).kannada_db.get("2").local_verses
+    size = os.path.getsize(hymn_csv)
+    assert _offsets_signature(hymn_csv) == (size, os.stat(hymn_csv).st_mtime_ns)
+
+    # same size, new mtime: a changed hymn text must not be read through stale offsets
+    mtime = os.stat(hymn_csv).st_mtime_ns + 10**9
+    _write_csv(hymn_csv, [ROWS[0], ["002", "1. ಎರಡು ಸಾಲು", ROWS[1][2], "2", "B, C"], ROWS[2], ROWS[3]], mtime)
+    assert os.path.getsize(hymn_csv) == size
+    second = HymnDatabase(hymn_csv, missing, None, lean=True)
+    assert _offsets_signature(hymn_csv) == (size, mtime)
+    assert second.kannada_db.get("2").local_verses != before
+    assert _hymns(second) == _hymns(HymnDatabase(hymn_csv, missing, None))
+
+    # new size: a hymn added at the end is found
+    _write_csv(hymn_csv, ROWS + [["4", "1. ಹೊಸ", "1. New", "4", ""]])
+    assert "4" in HymnDatabase(hymn_csv, missing, None, lean=True).kannada_db
+    assert _offsets_signature(hymn_csv)[0] == os.path.getsize(hymn_csv) != size
+
+
+def _load_eager(csv_path, caplog):
+    """Kannada hymns of an eager HymnDatabase, and whether they came from the snapshot."""
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="hymns_db"):
+        db = HymnDatabase(csv_path, csv_path + ".none", None)
+    return _hymns(db), "(snapshot)" in caplog.text
+
+
+def test_snapshot_reused_until_the_csv_changes(hymn_csv, caplog, monkeypatch):
+    hymns, from_snapshot = _load_eager(hymn_csv, caplog)
+    assert not from_snapshot and os.path.exists(hymn_csv + ".snapshot")
+    assert _load_eager(hymn_csv, caplog) == (hymns, True)
+
+    # same size, new mtime
+    size = os.path.getsize(hymn_csv)
+    mtime = os.stat(hymn_csv).st_mtime_ns + 10**9
+    _write_csv(hymn_csv, [ROWS[0], ["002", "1. ಎರಡು ಸಾಲು", ROWS[1][2], "2", "B, C"], ROWS[2], ROWS[3]], mtime)
+    assert os.path.getsize(hymn_csv) == size
+    changed, from_snapshot = _load_eager(hymn_csv, caplog)
+    assert not from_snapshot and changed["2"] != hymns["2"]
+    assert _load_eager(hymn_csv, caplog) == (changed, True)
+
+    # new size, mtime put back
+    _write_csv(hymn_csv, ROWS + [["4", "1. ಹೊಸ", "1. New", "4", ""]], mtime)
+    added, from_snapshot = _load_eager(hymn_csv, caplog)
+    assert not from_snapshot and "4" in added
+
+    # a new snapshot format
+    monkeypatch.setattr(hymns_db, "SNAPSHOT_VERSION", hymns_db.SNAPSHOT_VERSION + 1)
+    assert _load_eager(hymn_csv, caplog) == (added, False)
+
+
+def test_unreadable_snapshot_is_rebuilt(hymn_csv, caplog):
+    hymns, _ = _load_eager(hymn_csv, caplog)
+    with open(hymn_csv + ".snapshot", "wb") as f:
+        f.write(b"not a pickle")
+    assert _load_eager(hymn_csv, caplog) == (hymns, False)
+    assert _load_eager(hymn_csv, caplog) == (hymns, True)
+
+
+def test_lean_hymn_cache_counters(hymn_csv, tmp_path):
+    table = HymnDatabase(hymn_csv, str(tmp_path / "none.csv"), None, lean=True, cache_size=1).kannada_db
+    table.get("1"), table.get("1"), table.get("2"), table.get("1")
+    assert table.cache_stats() == {"hits": 1, "misses": 3, "size": 1}  # "1" was evicted by "2"
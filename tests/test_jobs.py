@@ -0,0 +1,26 @@
+# tests/test_jobs.py
+from jobs import JobQueue
+
+
+def test_finished_decks_are_capped_oldest_first():
+    queue = JobQueue(max_result_bytes=25)
+    first, second, third = (queue.add_finished(bytes(10)) for _ in range(3))
+    assert queue.status(first) is None and queue.result(first) is None
+    assert queue.result(second) == bytes(10) and queue.result(third) == bytes(10)
+
+
+def test_newest_deck_is_kept_even_when_over_the_cap():
+    queue = JobQueue(max_result_bytes=5)
+    old = queue.add_finished(bytes(3))
+    new = queue.add_finished(bytes(10))
+    assert queue.result(old) is None
+    assert queue.result(new) == bytes(10)
+
+
+def test_download_of_a_job_expired_after_the_status_check(monkeypatch):
+    import app
+
+    job_id = app.job_queue.add_finished(b"deck")
+    monkeypatch.setattr(app.job_queue, "result", lambda job_id: None)
+    response = app.app.test_client().get(f"/jobs/{job_id}/download")
+    assert response.status_code == 410
@@ -0,0 +1,20 @@
+# tests/test_kannada_ref.py
+import re
+
+from kannada_bible_map import ENGLISH_TO_KANNADA_BOOKS
+from parse_pdf import to_kannada_ref
+
+LATIN_RE = re.compile(r"[A-Za-z]")
+
+
+def test_psalm_has_no_section_label():
+    assert to_kannada_ref("Psalm 47:1-7") == ENGLISH_TO_KANNADA_BOOKS["Psalm"] + " ೪೭:೧-೭"
+
+
+def test_references_are_kannada_only():
+    for ref in ("Psalm 103:1-5, 8-12", "Exo 2:1-10", "Matthew 21:15-17", "Gospel of John 3:16"):
+        assert not LATIN_RE.search(to_kannada_ref(ref)), ref
+
+
+def test_numbered_book_keeps_its_ordinal():
+    assert to_kannada_ref("3 John 1-15") == "3 ಯೋಹಾನ ೧-೧೫"
@@ -0,0 +1,77 @@
+# tests/test_parse_announcements.py
+import re
+
+import pytest
+
+from parse_announcements import iter_docx_blocks, parse_announcements_docx
+
+docx = pytest.importorskip("docx")
+
+SAMPLE = "uploads/announcements.docx"
+
+
+def _python_docx_blocks(path):
+    """The blocks iter_docx_blocks should yield, read with python-docx."""
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    for item in docx.Document(path).iter_inner_content():
+        if isinstance(item, Paragraph):
+            yield "p", item.text
+        elif isinstance(item, Table):
+            for row in item.rows:
+                yield "row", [" ".join(p.text.strip() for p in cell.paragraphs if p.text.strip())
+                              for cell in row.cells]
+
+
+def _python_docx_parse(path):
+    """The python-docx parser the streaming one replaced (paragraphs only)."""
+    table_rows = [["Particulars", "Amount (Rs)"]]
+    extra_lines = []
+    for para in docx.Document(path).paragraphs:
+        line = para.text.strip()
+        if not line:
+            continue
+        m = re.search(r'(\d[\d,]*\s*/-)', line)
+        if m:
+            table_rows.append([line[:m.start()].strip().rstrip(":"), m.group(1).strip()])
+        else:
+            extra_lines.append(line)
+    return (table_rows if len(table_rows) > 1 else None), "\n".join(extra_lines)
+
+
+def test_blocks_match_python_docx():
+    assert list(iter_docx_blocks(SAMPLE)) == list(_python_docx_blocks(SAMPLE))
+
+
+def test_parse_matches_python_docx():
+    # the sample's only table is a birthday list with no amounts: it stays out of the announcements
+    table_rows, extra_text = parse_announcements_docx(SAMPLE)
+    assert (table_rows, extra_text) == _python_docx_parse(SAMPLE)
+    assert "Sumathi" not in extra_text
+
+
+def _table(document, rows):
+    table = document.add_table(rows=len(rows), cols=len(rows[0]))
+    for row, texts in zip(table.rows, rows):
+        for cell, text in zip(row.cells, texts):
+            cell.text = text
+
+
+def test_table_amounts_need_a_currency_marker_or_amount_column(tmp_path):
+    document = docx.Document()
+    document.add_paragraph("This week's hymns")
+    _table(document, [["Opening hymn", "245"], ["Offertory", "12"], ["Year", "2024"]])  # not money
+    document.add_paragraph("Offerings")
+    _table(document, [["Particulars", "Amount (Rs)"], ["Harvest festival", "25,300"],
+                      ["Building fund", "Rs. 1,200.50"], ["Members", ""]])
+    document.add_paragraph("Other")
+    _table(document, [["Choir", "₹ 500"], ["Room", "12"], ["Youth", "300/-"]])  # the Amount column has ended
+    path = tmp_path / "announcements.docx"
+    document.save(path)
+
+    table_rows, extra_text = parse_announcements_docx(str(path))
+    assert table_rows == [["Particulars", "Amount (Rs)"],
+                          ["Harvest festival", "25,300"], ["Building fund", "Rs. 1,200.50"],
+                          ["Choir", "₹ 500"], ["Youth", "300/-"]]
+    assert extra_text == "This week's hymns\nOfferings\nOther"
@@ -0,0 +1,118 @@
+# tests/test_parse_pdf.py
+import io
+import json
+import os
+import re
+from collections import OrderedDict
+
+import pytest
+
+import parse_pdf
+from kannada_bible_map import ENGLISH_TO_KANNADA_BOOKS
+from parse_pdf import parse_pdf_to_structured, scan_bulletin
+
+VERSE_NO_RE = re.compile(r"^(\d+) ", re.M)
+
+# uploads/input.pdf: reference, Kannada reference, verse numbers of the passage text
+INPUT_PDF_READINGS = {
+    "psalm": ("Psalm 47:1-7", ENGLISH_TO_KANNADA_BOOKS["Psalm"] + " ೪೭:೧-೭", range(1, 8)),
+    "old_testament": ("Exo 2:1-10", ENGLISH_TO_KANNADA_BOOKS["Exodus"] + " ೨:೧-೧೦", range(1, 11)),
+    "new_testament": ("3 John 1-15", "3 ಯೋಹಾನ ೧-೧೫", range(1, 15)),  # 3 John has 14 verses
+    "gospel": ("Matthew 21:15-17", ENGLISH_TO_KANNADA_BOOKS["Matthew"] + " ೨೧:೧೫-೧೭", range(15, 18)),
+}
+
+
+@pytest.fixture(scope="module")
+def input_pdf():
+    return parse_pdf_to_structured("uploads/input.pdf")
+
+
+@pytest.mark.parametrize("reading", INPUT_PDF_READINGS)
+def test_input_pdf_readings(input_pdf, reading):
+    ref, kn_ref, verses = INPUT_PDF_READINGS[reading]
+    assert input_pdf[reading] == ref
+    assert input_pdf[f"{reading}_kn"] == kn_ref
+    assert [int(n) for n in VERSE_NO_RE.findall(input_pdf[f"{reading}_en"])] == list(verses)
+
+
+def test_input_pdf_golden(input_pdf):
+    # every field, birthday/anniversary names and announcements included (the
+    # birthday "names" are the order of service that follows the heading, as
+    # with the original parser)
+    with open("tests/golden/input_pdf.json", encoding="utf-8") as f:
+        assert input_pdf == json.load(f)
+
+
+def test_input_pdf_passage_text(input_pdf):
+    assert input_pdf["psalm_en"].startswith("1 For the choirmaster. A Psalm of the sons of Korah.")
+    assert input_pdf["old_testament_en"].startswith("1 Now a man of the house of Levi married a Levite woman,")
+    assert input_pdf["new_testament_en"].startswith("1 The elder, To the beloved Gaius, whom I love in the truth:")
+    assert input_pdf["gospel_en"].startswith("15 But the chief priests and scribes were indignant")
+
+
+# Section headings SECTION_RE accepts, one bulletin fragment each: (lines, expected non-empty fields)
+SECTION_LINES = [
+    (["Old Testament: Exo 2:1-10"], {"old_testament": "Exo 2:1-10"}),
+    (["O.T.", "Genesis 1:1-5"], {"old_testament": "Genesis 1:1-5"}),
+    (["Old Test. Reading - Isaiah 6:1-8"], {"old_testament": "Isaiah 6:1-8"}),
+    (["old testament exodus 3:1-6"], {"old_testament": "exodus 3:1-6"}),
+    (["New Testament Reading", "Romans 8:28-30"], {"new_testament": "Romans 8:28-30"}),
+    (["N.T. 1 Cor 13:1-13"], {"new_testament": "1 Cor 13:1-13"}),
+    (["New Testa: Heb 11:1-6"], {"new_testament": "Heb 11:1-6"}),
+    (["Gospel Reading: Matthew 5:1-12"], {"gospel": "Matthew 5:1-12"}),
+    (["GOSPEL", "Luke 2:1-7"], {"gospel": "Luke 2:1-7"}),
+    (["Responsive Psalm 23:1-6"], {"psalm": "Psalm 23:1-6"}),
+    (["Psalm 23"], {}),  # a Psalm needs chapter:verse
+    (["Old Testament: Exo 2:1-10", "Old Testament: Gen 1:1-3"], {"old_testament": "Gen 1:1-3"}),
+    (["ANNOUNCEMENTS", "Choir at 5", "Hymn: 12"], {"announcements_block": "Choir at 5"}),
+    (["Happy Birthday", "Asha", "Ravi", "", "Later"], {"birthday_names": ["Asha", "Ravi"]}),
+    (["Wedding Anniversary", "Mr & Mrs A"], {"anniversary_names": ["Mr & Mrs A"]}),
+]
+
+
+@pytest.mark.parametrize("lines, expected", SECTION_LINES, ids=[lines[0] for lines, _ in SECTION_LINES])
+def test_section_headings(lines, expected):
+    assert {k: v for k, v in scan_bulletin(lines).items() if v} == expected
+
+
+@pytest.fixture
+def bulletin_cache(tmp_path, monkeypatch):
+    """An empty one-entry bulletin cache on tmp_path; returns the list of extractions."""
+    monkeypatch.setattr(parse_pdf, "_pdf_cache", OrderedDict())
+    monkeypatch.setattr(parse_pdf, "_pdf_cache_stats", {"hits": 0, "misses": 0, "disk_hits": 0})
+    monkeypatch.setattr(parse_pdf, "PDF_CACHE_SIZE", 1)
+    monkeypatch.setattr(parse_pdf, "PDF_CACHE_DIR", str(tmp_path))
+    extracted = []
+
+    def extract_lines(pdf):
+        data = pdf.read()
+        extracted.append(data)
+        return ["Gospel Reading: " + data.decode()]
+    monkeypatch.setattr(parse_pdf, "extract_lines", extract_lines)
+    return extracted
+
+
+def _parse(data):
+    return parse_pdf_to_structured(io.BytesIO(data))
+
+
+def test_bulletin_cache_hits_and_lru_eviction(bulletin_cache):
+    first = _parse(b"John 3:16")
+    first["gospel"] = "changed by the caller"  # must not reach the cached copy
+    again = _parse(b"John 3:16")
+    assert again["gospel"] == "John 3:16" and again["gospel_en"].startswith("16 For God so loved")
+    assert bulletin_cache == [b"John 3:16"]
+    assert parse_pdf.pdf_cache_info() == {"hits": 1, "misses": 1, "disk_hits": 0, "size": 1, "maxsize": 1}
+
+    _parse(b"Luke 2:1")  # evicts John 3:16 from memory; the JSON file stays
+    assert _parse(b"John 3:16") == again
+    assert bulletin_cache == [b"John 3:16", b"Luke 2:1"]
+    assert parse_pdf.pdf_cache_info() == {"hits": 2, "misses": 2, "disk_hits": 1, "size": 1, "maxsize": 1}
+    assert len([name for name in os.listdir(parse_pdf.PDF_CACHE_DIR) if name.endswith(".json")]) == 2
+
+
+def test_bulletin_cache_keyed_by_parser_version(bulletin_cache, monkeypatch):
+    _parse(b"John 3:16")
+    monkeypatch.setattr(parse_pdf, "PARSER_VERSION", parse_pdf.PARSER_VERSION + 1)
+    _parse(b"John 3:16")
+    assert len(bulletin_cache) == 2
@@ -0,0 +1,149 @@
+# tests/test_pptx_writer.py
+import io
+import logging
+import zipfile
+
+import pytest
+
+pptx = pytest.importorskip("pptx")
+Image = pytest.importorskip("PIL.Image")
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+import pptx_writer
+from generate_ppt import generate_presentation, load_template
+from pptx_writer import TemplateSource, save_presentation
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream without tell/seek, so zipfile writes data descriptors."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return self.buffer.write(b)
+
+
+def _png(color, size=(64, 48)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "PNG")
+    return io.BytesIO(out.getvalue())
+
+
+def _with_data_descriptors(data):
+    """The same zip, rewritten so every member has a data descriptor."""
+    out = _Unseekable()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            with dst.open(info.filename, "w") as f:
+                f.write(src.read(info))
+    return out.buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def template():
+    prs = pptx.Presentation()
+    blank = prs.slide_layouts[6]
+    slides = [
+        ("{SERVICE_DATE}", "red"),
+        ("{PSALM_EN_V*}", "green"),   # prototype: cloned per verse block
+        ("{HYMN9_EN_V1}", "blue"),    # never filled: pruned
+        ("Thank you", "red"),         # no placeholders: left as it is
+    ]
+    for text, color in slides:
+        slide = prs.slides.add_slide(blank)
+        slide.shapes.add_textbox(Inches(1), Inches(1), Inches(8), Inches(1.5)).text_frame.text = text
+        slide.shapes.add_picture(_png(color), Inches(1), Inches(3))
+        slide.notes_slide.notes_text_frame.text = f"notes for {text}"
+    out = io.BytesIO()
+    prs.save(out)
+    data = _with_data_descriptors(out.getvalue())
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert all(info.flag_bits & 0x8 for info in z.infolist())
+    return data
+
+
+MAPPING = {"{SERVICE_DATE}": "12 October", "{PSALM_EN_V1}": "1 Clap your hands", "{PSALM_EN_V2}": "2 For the LORD"}
+
+
+def _deck(template, copy_unchanged):
+    out = io.BytesIO()
+    generate_presentation(template, out, dict(MAPPING), fit_text=False, copy_unchanged=copy_unchanged)
+    return out.getvalue()
+
+
+def _contents(data):
+    """Per slide: part name, texts, picture blobs and notes text."""
+    slides = []
+    for slide in pptx.Presentation(io.BytesIO(data)).slides:
+        slides.append((str(slide.part.partname),
+                       [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame],
+                       [shape.image.blob for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE],
+                       slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else None))
+    return slides
+
+
+def test_round_trip_matches_prs_save(template):
+    raw, saved = _deck(template, True), _deck(template, False)
+    with zipfile.ZipFile(io.BytesIO(raw)) as z:
+        assert z.testzip() is None
+        names = z.namelist()
+    assert len(names) == len(set(names))
+    slides = _contents(raw)
+    assert slides == _contents(saved)
+    # cloned, pruned and renamed: slide3 is the prototype's copy, the pruned slide is gone
+    assert [(name, texts) for name, texts, _, _ in slides] == [
+        ("/ppt/slides/slide1.xml", ["12 October"]),
+        ("/ppt/slides/slide2.xml", ["1 Clap your hands"]),
+        ("/ppt/slides/slide3.xml", ["2 For the LORD"]),
+        ("/ppt/slides/slide4.xml", ["Thank you"]),
+    ]
+    assert slides[0][3] == "notes for {SERVICE_DATE}" and slides[3][3] == "notes for Thank you"
+
+
+def test_unchanged_members_are_copied_raw(template):
+    raw = _deck(template, True)
+    with zipfile.ZipFile(io.BytesIO(template)) as t, zipfile.ZipFile(io.BytesIO(raw)) as d:
+        media = [name for name in t.namelist() if name.startswith("ppt/media/")]
+        kept = [name for name in media if name in d.namelist()]
+        assert len(kept) == len(media) - 1  # the pruned slide's picture is not saved
+        for name in kept:
+            assert d.getinfo(name).CRC == t.getinfo(name).CRC
+            assert d.getinfo(name).compress_size == t.getinfo(name).compress_size
+
+
+def _save(template, prepare):
+    prs, _ = load_template(template)
+    source = TemplateSource(prs, template)
+    prepare(source)
+    out = io.BytesIO()
+    save_presentation(prs, out, source)
+    return out.getvalue()
+
+
+def test_encrypted_member_falls_back_to_prs_save(template, caplog):
+    def encrypt(source):
+        source.members["ppt/presentation.xml"].flag_bits |= pptx_writer.ENCRYPTED_FLAG
+    with caplog.at_level(logging.INFO, logger="pptx_writer"):
+        data = _save(template, encrypt)
+    assert "encrypted" in caplog.text
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.testzip() is None
+    assert [texts for _, texts, _, _ in _contents(data)] == [["{SERVICE_DATE}"], ["{PSALM_EN_V*}"],
+                                                              ["{HYMN9_EN_V1}"], ["Thank you"]]
+
+
+def test_zip64_falls_back_to_prs_save(template, caplog, monkeypatch):
+    copied = _save(template, lambda source: None)
+    monkeypatch.setattr(pptx_writer, "ZIP32_LIMIT", 1000)  # every member now "needs zip64"
+    with caplog.at_level(logging.INFO, logger="pptx_writer"):
+        data = _save(template, lambda source: None)
+    assert "zip64" in caplog.text
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.testzip() is None
+    assert _contents(data) == _contents(copied)
@@ -0,0 +1,9 @@
+# tests/test_startup.py
+from startup_report import DEFAULT_BUDGET_MS, measure_startup
+
+
+def test_startup_within_budget():
+    # budget: STARTUP_BUDGET_MS (default 1500 ms)
+    import_ms, ready_ms, _ = measure_startup()
+    assert import_ms <= DEFAULT_BUDGET_MS, f"import app took {import_ms:.0f} ms"
+    assert ready_ms <= DEFAULT_BUDGET_MS, f"warm-up finished after {ready_ms:.0f} ms"
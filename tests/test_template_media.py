@@ -0,0 +1,121 @@
+# tests/test_template_media.py
+import io
+import zipfile
+from collections import OrderedDict
+
+import pytest
+
+pptx = pytest.importorskip("pptx")
+Image = pytest.importorskip("PIL.Image")
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.package import XmlPart
+from pptx.util import Inches
+
+import template_media
+from template_media import (downscale_pictures, drop_unused_media, merge_duplicate_media, optimize_template,
+                            optimized_template)
+
+PROJECTOR = (1920, 1080)  # a 10x7.5 in slide shows 1440x1080 pixels: 144 px per inch
+
+
+def _png(image):
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return io.BytesIO(out.getvalue())
+
+
+@pytest.fixture(scope="module")
+def template():
+    prs = pptx.Presentation()  # 10 x 7.5 in
+    blank = prs.slide_layouts[6]
+    # slide 1: a 2000x1500 photo shown 4 in wide, so 576x432 pixels are enough
+    slide = prs.slides.add_slide(blank)
+    slide.shapes.add_textbox(Inches(5), Inches(1), Inches(4), Inches(1)).text_frame.text = "{SERVICE_DATE}"
+    slide.shapes.add_picture(_png(Image.effect_noise((2000, 1500), 64).convert("RGB")),
+                             Inches(0.5), Inches(0.5), Inches(4), Inches(3))
+    # an image the slide is related to but never shows
+    slide.part.get_or_add_image_part(_png(Image.new("RGB", (300, 200), "yellow")))
+    # slides 2 and 3: the same background exported as a separate part per slide
+    backgrounds = []
+    for color in ("red", "blue"):
+        slide = prs.slides.add_slide(blank)
+        backgrounds.append(slide.shapes.add_picture(_png(Image.new("RGB", (64, 48), color)),
+                                                    0, 0, prs.slide_width, prs.slide_height))
+    red, blue = (shape.part.related_part(shape._element.blip_rId) for shape in backgrounds)
+    blue._blob = red.blob
+    out = io.BytesIO()
+    prs.save(out)
+    return out.getvalue()
+
+
+def _media(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        return sorted(name for name in z.namelist() if name.startswith("ppt/media/"))
+
+
+def _pictures(prs):
+    """Per slide: (image part, pixel size) of each picture."""
+    return [[(shape.part.related_part(shape._element.blip_rId), Image.open(io.BytesIO(shape.image.blob)).size)
+             for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+            for slide in prs.slides]
+
+
+def _parts(prs):
+    return [part for part in prs.part.package.iter_parts() if isinstance(part, XmlPart)]
+
+
+def test_template_has_duplicate_unused_and_oversized_media(template):
+    assert len(_media(template)) == 4
+
+
+def test_drop_unused_media(template):
+    prs = pptx.Presentation(io.BytesIO(template))
+    assert drop_unused_media(_parts(prs)) == 1
+    assert drop_unused_media(_parts(prs)) == 0
+    out = io.BytesIO()
+    prs.save(out)
+    assert len(_media(out.getvalue())) == 3
+
+
+def test_merge_duplicate_media(template):
+    prs = pptx.Presentation(io.BytesIO(template))
+    (_, (red, _), (blue, _)) = [slide[0] for slide in _pictures(prs)]
+    assert red is not blue and red.blob == blue.blob
+    assert merge_duplicate_media(_parts(prs)) == {blue}
+    assert _pictures(prs)[2][0][0] is red  # slide 3's picture now uses slide 2's part
+    assert merge_duplicate_media(_parts(prs)) == set()
+
+
+def test_downscale_pictures(template):
+    prs = pptx.Presentation(io.BytesIO(template))
+    (photo, size), = _pictures(prs)[0]
+    assert size == (2000, 1500)
+    before = len(photo.blob)
+    changed = downscale_pictures(_parts(prs), (prs.slide_width, prs.slide_height), PROJECTOR)
+    assert changed == [photo]  # the 64x48 backgrounds are already smaller than the slide
+    assert Image.open(io.BytesIO(photo.blob)).size == (576, 432)
+    assert len(photo.blob) < before
+
+
+@pytest.mark.skipif(template_media.PROJECTOR_SIZE != PROJECTOR, reason="PROJECTOR_SIZE is set")
+def test_optimize_template(template):
+    data = optimize_template(template)
+    assert len(data) < len(template)
+    assert len(_media(data)) == 2  # the photo and one background
+    prs = pptx.Presentation(io.BytesIO(data))
+    assert [[size for _, size in slide] for slide in _pictures(prs)] == [[(576, 432)], [(64, 48)], [(64, 48)]]
+    assert prs.slides[0].shapes[0].text_frame.text == "{SERVICE_DATE}"
+    assert optimize_template(data) == data  # nothing left to do
+
+
+def test_optimized_template_is_cached(template, monkeypatch, tmp_path):
+    monkeypatch.setattr(template_media, "_media_cache", OrderedDict())
+    monkeypatch.setattr(template_media, "_media_cache_stats", {"hits": 0, "misses": 0, "disk_hits": 0})
+    monkeypatch.setattr(template_media, "MEDIA_CACHE_DIR", str(tmp_path))
+    first = optimized_template(template)
+    assert optimized_template(template) is first
+    template_media._media_cache.clear()
+    assert optimized_template(template) == first  # from MEDIA_CACHE_DIR
+    assert template_media.media_cache_info() == {"hits": 2, "misses": 1, "disk_hits": 1, "size": 1,
+                                                 "maxsize": template_media.MEDIA_CACHE_SIZE}
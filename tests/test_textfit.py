@@ -0,0 +1,46 @@
+# tests/test_textfit.py
+from textfit import MIN_FONT_PT, Box, find_font, fit_font_size, fits, pack
+
+# not installed anywhere, so measured with the generic advances: a-z 500,
+# space 250 (1/1000 em), lines 1.2 em (Latin) and 1.5 em (Kannada)
+FAMILY = "No Such Font Family"
+WORD = "aaaa"  # 2000 units; "aaaa aaaa" is 4250
+
+
+def test_family_is_not_installed():
+    assert find_font(FAMILY) is None
+
+
+def test_fit_font_size_on_a_known_box():
+    box = Box(100, 30)
+    # one line of 4250 units needs 100 * 1000 / size >= 4250, i.e. size <= 23.5,
+    # and 1.2 * size <= 30; at 24 pt the text wraps to two lines
+    assert fit_font_size("aaaa aaaa", FAMILY, box, 40) == 23
+    assert fits("aaaa aaaa", FAMILY, 23, box) and not fits("aaaa aaaa", FAMILY, 24, box)
+    assert fit_font_size("aaaa aaaa", FAMILY, box, 18) == 18   # fits at the maximum
+    assert fit_font_size("", FAMILY, box, 40) == 40
+    assert fit_font_size("aaaa aaaa", FAMILY, Box(10, 10), 40) == MIN_FONT_PT  # never below it
+    assert fit_font_size("aaaa aaaa", FAMILY, Box(10, 10), 40, min_pt=12) == 12
+
+
+def test_kannada_lines_are_taller():
+    box = Box(100, 24)  # one line at 20 pt: 24 pt for Latin, 30 pt for Kannada
+    assert fits("ab", FAMILY, 20, box)
+    assert not fits("ಕನ", FAMILY, 20, box)
+
+
+def test_pack_on_a_known_box():
+    box = Box(100, 50)  # two lines at 20 pt
+
+    def fits_fn(texts):
+        return all(fits(text, FAMILY, 20, box) for text in texts)
+
+    long = " ".join([WORD] * 5)  # three lines: too tall even alone
+    units = [(WORD, "bbbb"), ("cccc", ""), (long, "x"), ("dddd", "eeee"), ("ffff", "gggg")]
+    assert pack(units, fits_fn) == [
+        ("aaaa\ncccc", "bbbb"),  # an empty text is not joined
+        (long, "x"),             # kept alone
+        ("dddd\nffff", "eeee\ngggg"),
+    ]
+    assert pack([], fits_fn) == []
+    assert pack([(WORD,), ("bbbb",)], fits_fn, joiner=" ") == [("aaaa bbbb",)]
@@ -0,0 +1,103 @@
+# tests/test_verse_store.py
+import os
+from collections import OrderedDict
+
+import pytest
+
+import bible_fetch
+import verse_store
+from bible_normalize import BOOK_ORDER
+from verse_store import (Translation, VerseStore, compile_verse_store, load_verse_store, make_key,
+                         read_csv_rows, read_usfm_rows)
+
+JOHN = BOOK_ORDER.index("John") + 1
+
+EN_CSV = """reference,text
+John 3:16,For God so loved the world.
+John 3:17,"For God did not send His Son, to condemn."
+John 3:18,Whoever believes in Him is not condemned.
+"""
+
+KN_USFM = r"""\id JHN
+\h ಯೋಹಾನ
+\c 3
+\s ದೇವರ ಪ್ರೀತಿ
+\v 16 ದೇವರು \w ಲೋಕವನ್ನು|strong="G2889"\w* ಪ್ರೀತಿಸಿದನು.\f + \fr 3:16 \ft ಟಿಪ್ಪಣಿ\f*
+\v 18 ಆತನನ್ನು ನಂಬುವವನಿಗೆ
+ತೀರ್ಪು ಇಲ್ಲ.
+"""
+
+
+@pytest.fixture
+def sources(tmp_path):
+    en, kn = tmp_path / "en.csv", tmp_path / "kn.usfm"
+    en.write_text(EN_CSV, encoding="utf-8")
+    kn.write_text(KN_USFM, encoding="utf-8")
+    return OrderedDict([("en", Translation("en", "English", str(en), read_csv_rows)),
+                        ("kn", Translation("kn", "Kannada", str(kn), read_usfm_rows))])
+
+
+def test_readers(tmp_path, sources):
+    assert list(read_usfm_rows(sources["kn"].source)) == [
+        (make_key(JOHN, 3, 16), "ದೇವರು ಲೋಕವನ್ನು ಪ್ರೀತಿಸಿದನು."),
+        (make_key(JOHN, 3, 18), "ಆತನನ್ನು ನಂಬುವವನಿಗೆ ತೀರ್ಪು ಇಲ್ಲ."),
+    ]
+    tsv = tmp_path / "bible.tsv"
+    tsv.write_text("book\tchapter\tverse\ttext\nJHN\t3\t16\tFor God so loved\nಯೋಹಾನ\t3\t17\tಕಳುಹಿಸಿದ್ದು\n"
+                   "John\tx\t1\tbad chapter\n", encoding="utf-8")
+    assert list(read_csv_rows(str(tsv))) == [(make_key(JOHN, 3, 16), "For God so loved"),
+                                             (make_key(JOHN, 3, 17), "ಕಳುಹಿಸಿದ್ದು")]
+
+
+def test_read_aligned_across_translations(tmp_path, sources):
+    path = str(tmp_path / "test.verses")
+    assert compile_verse_store(path, sources.values()) == 3
+    store = VerseStore(path)
+    assert store.translations == ("en", "kn")
+    john3 = (make_key(JOHN, 3, 16), make_key(JOHN, 3, 18))
+    (rows,) = store.read_aligned([john3], ("kn", "en"))
+    assert [(key, kn) for key, (kn, _) in rows] == [(make_key(JOHN, 3, 16), "ದೇವರು ಲೋಕವನ್ನು ಪ್ರೀತಿಸಿದನು."),
+                                                 (make_key(JOHN, 3, 17), ""),  # not in the Kannada source
+                                                 (make_key(JOHN, 3, 18), "ಆತನನ್ನು ನಂಬುವವನಿಗೆ ತೀರ್ಪು ಇಲ್ಲ.")]
+    assert [en for _, (_, en) in rows] == ["For God so loved the world.", "For God did not send His Son, to condemn.",
+                                         "Whoever believes in Him is not condemned."]
+
+
+def test_fetch_parallel_passages(tmp_path, sources, monkeypatch):
+    path = str(tmp_path / "test.verses")
+    compile_verse_store(path, sources.values())
+    monkeypatch.setattr(bible_fetch, "_store", VerseStore(path))
+    monkeypatch.setattr(bible_fetch, "_passage_cache", OrderedDict())
+    passages = bible_fetch.fetch_parallel_passages(["John 3:16-18", "John 3:17"], ("en", "kn"))
+    assert passages["en"] == [["16 For God so loved the world.\n17 For God did not send His Son, to condemn.\n"
+                               "18 Whoever believes in Him is not condemned."],
+                              ["17 For God did not send His Son, to condemn."]]
+    assert passages["kn"] == [["16 ದೇವರು ಲೋಕವನ್ನು ಪ್ರೀತಿಸಿದನು.\n18 ಆತನನ್ನು ನಂಬುವವನಿಗೆ ತೀರ್ಪು ಇಲ್ಲ."],
+                              []]  # the verse the Kannada source lacks gives no blocks
+
+
+def test_stale_store_is_rebuilt(tmp_path, sources, monkeypatch):
+    path = str(tmp_path / "test.verses")
+    monkeypatch.setattr(verse_store, "TRANSLATIONS", OrderedDict([("en", sources["en"])]))
+    assert verse_store.is_stale(path)
+    assert load_verse_store(path).translations == ("en",)
+    assert not verse_store.is_stale(path)
+
+    # a translation added
+    monkeypatch.setattr(verse_store, "TRANSLATIONS", sources)
+    assert verse_store.is_stale(path)
+    store = load_verse_store(path)
+    assert store.translations == ("en", "kn")
+    assert store.read_range(make_key(JOHN, 3, 17), make_key(JOHN, 3, 17), "kn") == [(make_key(JOHN, 3, 17), "")]
+
+    # a source changed
+    kn = sources["kn"].source
+    with open(kn, "a", encoding="utf-8") as f:
+        f.write("\\v 17 ದೇವರು ಮಗನನ್ನು ಕಳುಹಿಸಿದ್ದು\n")
+    st = os.stat(kn)
+    os.utime(kn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert verse_store.is_stale(path)
+    store = load_verse_store(path)
+    assert store.read_range(make_key(JOHN, 3, 17), make_key(JOHN, 3, 17), "kn") == [
+        (make_key(JOHN, 3, 17), "ದೇವರು ಮಗನನ್ನು ಕಳುಹಿಸಿದ್ದು")]
+    assert not verse_store.is_stale(path)
@@ -0,0 +1,239 @@
+# textfit.py
+"""
+Measured text fitting for placeholder boxes.
+
+Text (Latin or Kannada) is measured with the advance widths of the font it
+will be set in, wrapped at word boundaries to the box width, and compared
+with the box height. On top of that:
+
+    fit_font_size(text, font, box, max_pt)   largest size <= max_pt that fits
+    pack(units, fits)                        greedy packing of verses/lines
+                                             into as few boxes as fit
+
+Fonts are looked up by family name ("Calibri (MS)", "Noto Sans Kannada") as
+.ttf/.otf files in TEXTFIT_FONT_DIRS (os.pathsep-separated), ./fonts and
+the usual system font directories, and read with Pillow (a python-pptx
+dependency). Advances are kept per font in 1/1000 em, per character and per
+word, so a size change is a multiplication and a deck's hundreds of fits
+stay in the low milliseconds. A font that cannot be found is measured with
+generic per-script advances instead. Decks are fitted only when asked
+(generate_presentation(fit_text=True), or FIT_TEXT=1 for the app).
+"""
+import logging
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FONT_DIRS = [d for d in os.environ.get("TEXTFIT_FONT_DIRS", "").split(os.pathsep) if d] + [
+    os.path.join(HERE, "fonts"), "/usr/share/fonts", "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"), "/Library/Fonts", "/System/Library/Fonts", r"C:\Windows\Fonts",
+]
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+EMU_PER_PT = 12700
+UNITS = 1000                # advances are kept in 1/1000 em
+LINE_SPACING = 1.2          # PowerPoint single spacing, in em
+MIN_FONT_PT = int(os.environ.get("TEXTFIT_MIN_PT", "20"))
+FIT_TEXT = os.environ.get("FIT_TEXT", "").lower() in ("1", "true", "yes")  # default for generate_presentation
+WORD_CACHE_SIZE = 50000
+
+KANNADA_RE = re.compile(r"[\u0C80-\u0CFF]")
+
+# Box available to text inside a shape, in points
+Box = namedtuple("Box", "width height")
+
+
+def box_for_shape(shape):
+    """The text area of a shape (its size less the text frame insets), in points."""
+    tf = shape.text_frame
+    width = shape.width - (tf.margin_left or 0) - (tf.margin_right or 0)
+    height = shape.height - (tf.margin_top or 0) - (tf.margin_bottom or 0)
+    return Box(max(width, 0) / EMU_PER_PT, max(height, 0) / EMU_PER_PT)
+
+
+def _font_key(name):
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+@lru_cache(maxsize=1)
+def _font_files():
+    """normalized file stem -> path for every font file in FONT_DIRS (scanned once)."""
+    files = {}
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        for dirpath, _, names in os.walk(font_dir):
+            for name in names:
+                if name.lower().endswith(FONT_EXTENSIONS):
+                    files.setdefault(_font_key(os.path.splitext(name)[0]), os.path.join(dirpath, name))
+    return files
+
+
+def find_font(family):
+    """Path of the regular face of a font family, or None."""
+    # "Calibri (MS)" / "Times New Roman MT" are how Canva names the system fonts
+    base = _font_key(re.sub(r"\s*\(.*?\)|\s+MT$", "", family.strip()))
+    if not base:
+        return None
+    files = _font_files()
+    for key in (base, base + "regular", base + "r"):
+        if key in files:
+            return files[key]
+    candidates = sorted(k for k in files if k.startswith(base))
+    return files[candidates[0]] if candidates else None
+
+
+def font_fingerprint(families):
+    """The font file (path, size, mtime) each family resolves to, as one string, for cache keys."""
+    parts = []
+    for family in sorted(set(families)):
+        path = find_font(family)
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        parts.append(f"{family}={path}:{st.st_size}:{st.st_mtime_ns}" if st else f"{family}=-")
+    return "\n".join(parts)
+
+
+def _fallback_advance(ch):
+    """Generic advance (1/1000 em) of a character when the font is not available."""
+    if ch.isspace():
+        return 250
+    category = unicodedata.category(ch)
+    if category == "Mn":  # combining marks (Kannada virama, nukta, ...)
+        return 0
+    if KANNADA_RE.match(ch):
+        return 420 if category == "Mc" else 650
+    if ch in "iljtfrI.,;:'!|()[] ":
+        return 300
+    if ch in "mwMW@":
+        return 850
+    return 560 if ch.isupper() or ch.isdigit() else 500
+
+
+class FontMetrics:
+    """Cached advance widths of one font, in 1/1000 em."""
+
+    def __init__(self, family):
+        self.family = family
+        self.path = find_font(family)
+        self._font = None
+        self.line_height = None  # em per line, from the font when available
+        if self.path:
+            try:
+                from PIL import ImageFont
+                self._font = ImageFont.truetype(self.path, UNITS)
+                ascent, descent = self._font.getmetrics()
+                self.line_height = max(LINE_SPACING, (ascent + descent) / UNITS)
+            except (OSError, ImportError) as e:
+                log.warning("cannot read font %s (%s): %s", family, self.path, e)
+                self._font = None
+        self._advances = {}
+        self._words = {}
+
+    def advance(self, ch):
+        adv = self._advances.get(ch)
+        if adv is None:
+            adv = self._font.getlength(ch) if self._font else _fallback_advance(ch)
+            self._advances[ch] = adv
+        return adv
+
+    def width(self, word):
+        """Advance width of a word (no line breaks) in 1/1000 em."""
+        w = self._words.get(word)
+        if w is None:
+            if len(self._words) >= WORD_CACHE_SIZE:
+                self._words.clear()
+            w = self._words[word] = sum(self.advance(ch) for ch in word)
+        return w
+
+    def line_em(self, text):
+        """Line height in em for this text."""
+        if self.line_height:
+            return self.line_height
+        # Kannada stacks vowel signs and conjuncts above and below the line
+        return 1.5 if KANNADA_RE.search(text) else LINE_SPACING
+
+    def line_count(self, text, size_pt, width_pt):
+        """Lines the text wraps to at size_pt in a box width_pt wide."""
+        avail = width_pt * UNITS / size_pt
+        if avail <= 0:
+            return float("inf")
+        space = self.advance(" ")
+        lines = 0
+        for para in text.split("\n"):
+            lines += 1
+            x = 0.0
+            for word in para.split():
+                w = self.width(word)
+                if x and x + space + w > avail:
+                    lines += 1
+                    x = 0.0
+                if x:
+                    x += space + w
+                else:
+                    # a word wider than the box breaks across lines
+                    extra, x = divmod(w, avail)
+                    lines += int(extra)
+        return lines
+
+    def text_height(self, text, size_pt, width_pt):
+        """Height in points of the wrapped text."""
+        return self.line_count(text, size_pt, width_pt) * size_pt * self.line_em(text)
+
+
+@lru_cache(maxsize=64)
+def metrics_for(family):
+    """FontMetrics for a family name, loaded once."""
+    return FontMetrics(family)
+
+
+def fits(text, family, size_pt, box):
+    """True when text set in family at size_pt fits inside box."""
+    return metrics_for(family).text_height(text, size_pt, box.width) <= box.height
+
+
+def fit_font_size(text, family, box, max_pt, min_pt=MIN_FONT_PT):
+    """Largest whole point size <= max_pt at which text fits the box (never below min_pt)."""
+    if not text or fits(text, family, max_pt, box):
+        return max_pt
+    lo, hi = min(min_pt, max_pt), int(max_pt)
+    if not fits(text, family, lo, box):
+        return lo
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if fits(text, family, mid, box):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def pack(units, fits_fn, joiner="\n"):
+    """
+    Greedily join consecutive units into as few groups as fits_fn accepts.
+
+    Each unit is a tuple of texts, one per box a group is shown in (one box
+    for a reading, a Kannada and an English box for a bilingual hymn);
+    fits_fn(texts) says whether a joined group fits. A unit that does not
+    fit even alone becomes a group of its own. Returns a list of text tuples.
+    """
+    groups = []
+    current = None
+    for unit in units:
+        if current is not None:
+            joined = tuple(joiner.join(filter(None, pair)) for pair in zip(current, unit))
+            if fits_fn(joined):
+                current = joined
+                continue
+            groups.append(current)
+        current = tuple(unit)
+    if current is not None:
+        groups.append(current)
+    return groups
@@ -0,0 +1,377 @@
+# verse_store.py
+"""
+Compact binary verse store compiled once from the local Bible sources.
+
+Every registered translation (see TRANSLATIONS below) is compiled into the
+same file. Verses are kept in canonical order and keyed by a packed integer
+(book, chapter, verse) ordinal; the key table is shared, and each
+translation has its own offsets table and text blob aligned with it. A
+passage is therefore one binary search for the first verse, and the same
+index slice reads it from any translation. A verse a translation lacks is
+stored as an empty string. The file is mapped with mmap and never parsed,
+which keeps worker start-up cheap.
+
+File layout (integers in native byte order, recorded in MAGIC):
+    header        MAGIC, verse count, translation count
+    translations  per translation: code, source size + mtime, text length
+    keys          uint32[count]      packed ordinals, ascending
+    per translation, in header order:
+        offsets   uint32[count + 1]  byte offsets of each verse in its text blob
+        text      UTF-8 verse texts, back to back (padded to 4 bytes)
+
+Rebuild with:  python verse_store.py [bible.verses]
+(the store is also rebuilt automatically when a source file changes).
+"""
+import array
+import bisect
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+from collections import OrderedDict, namedtuple
+
+from bible_normalize import book_ordinal
+
+log = logging.getLogger(__name__)
+
+STORE_PATH = "bible.verses"
+
+MAGIC = b"BIBVRS3" + (b"L" if sys.byteorder == "little" else b"B")
+HEADER = struct.Struct("<8sII")           # magic, verse count, translation count
+TRANSLATION = struct.Struct("<8sQQQ")     # code, source size, source mtime_ns, text bytes
+
+VERSE_REF_RE = re.compile(r"^\s*(.+?)\s+(\d+):(\d+)\s*$")
+
+# USFM book identifiers in canonical order (\id GEN, \id EXO, ...)
+USFM_BOOKS = (
+    "GEN", "EXO", "LEV", "NUM", "DEU", "JOS", "JDG", "RUT", "1SA", "2SA", "1KI", "2KI",
+    "1CH", "2CH", "EZR", "NEH", "EST", "JOB", "PSA", "PRO", "ECC", "SNG", "ISA", "JER",
+    "LAM", "EZK", "DAN", "HOS", "JOL", "AMO", "OBA", "JON", "MIC", "NAM", "HAB", "ZEP",
+    "HAG", "ZEC", "MAL", "MAT", "MRK", "LUK", "JHN", "ACT", "ROM", "1CO", "2CO", "GAL",
+    "EPH", "PHP", "COL", "1TH", "2TH", "1TI", "2TI", "TIT", "PHM", "HEB", "JAS", "1PE",
+    "2PE", "1JN", "2JN", "3JN", "JUD", "REV",
+)
+USFM_ORDINALS = {code: i for i, code in enumerate(USFM_BOOKS, 1)}
+
+
+def make_key(book: int, chapter: int, verse: int) -> int:
+    """Pack (book, chapter, verse) ordinals into one sortable integer."""
+    return (book << 20) | (chapter << 10) | verse
+
+
+def split_key(key: int):
+    """Inverse of make_key -> (book, chapter, verse)."""
+    return key >> 20, (key >> 10) & 0x3FF, key & 0x3FF
+
+
+def _source_signature(source_path):
+    st = os.stat(source_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _book(name):
+    """Ordinal of a book given by name, abbreviation, Kannada name or USFM id."""
+    name = str(name).strip()
+    return USFM_ORDINALS.get(name.upper()) or book_ordinal(name)
+
+
+# --- Source readers -----------------------------------------------------------
+# Each yields (key, text) for every verse of one translation.
+
+def read_bsb_rows(xlsx_path: str):
+    """Yield (key, text) for every verse in the BSB spreadsheet."""
+    import pandas as pd  # only needed when (re)compiling
+
+    df = pd.read_excel(xlsx_path, header=2)
+
+    verse_column = "Verse" if "Verse" in df.columns else df.columns[1]
+    if "Berean Standard Bible" in df.columns:
+        text_column = "Berean Standard Bible"
+    else:
+        bible_cols = [col for col in df.columns if 'Bible' in str(col)]
+        text_column = bible_cols[0] if bible_cols else df.columns[2]
+
+    for ref, txt in zip(df[verse_column], df[text_column]):
+        m = VERSE_REF_RE.match(str(ref))
+        if not m:
+            continue
+        book = book_ordinal(m.group(1))
+        if not book:
+            continue
+        txt = str(txt).strip()
+        if not txt or txt.lower() == 'nan':
+            continue
+        yield make_key(book, int(m.group(2)), int(m.group(3))), txt
+
+
+def read_csv_rows(csv_path: str):
+    """
+    Yield (key, text) from a CSV (or tab-separated) Bible with a header row:
+    either reference,text ("Genesis 1:1" / "ಆದಿಕಾಂಡ 1:1" / "GEN 1:1") or
+    book,chapter,verse,text.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.excel_tab if sample.count("\t") > sample.count(",") else csv.excel
+        reader = csv.DictReader(f, dialect=dialect)
+        columns = {c.strip().lower(): c for c in reader.fieldnames or ()}
+        text_col = columns.get("text")
+        if text_col is None:
+            raise ValueError(f"{csv_path}: no 'text' column")
+        for row in reader:
+            txt = (row.get(text_col) or "").strip()
+            if not txt:
+                continue
+            if "book" in columns:
+                book = _book(row[columns["book"]])
+                try:
+                    chapter, verse = int(row[columns["chapter"]]), int(row[columns["verse"]])
+                except (KeyError, TypeError, ValueError):
+                    continue
+            else:
+                m = VERSE_REF_RE.match(row.get(columns.get("reference", ""), "") or "")
+                if not m:
+                    continue
+                book, chapter, verse = _book(m.group(1)), int(m.group(2)), int(m.group(3))
+            if book:
+                yield make_key(book, chapter, verse), txt
+
+
+# footnotes, cross references, word attributes (\w grace|strong="H2580"\w*) and markers
+USFM_STRIP_RE = re.compile(r"\\f .*?\\f\*|\\x .*?\\x\*|\|[^\\|]*(?=\\)|\\\+?\w+\*?", re.S)
+# headings, titles and comments, which are not verse text
+USFM_TITLE_RE = re.compile(r"^\\(?:s|ms|mr|mt|r|d|h|toc|sp|cl|rem|ide|sts)\d*\b.*$", re.M)
+USFM_VERSE_RE = re.compile(r"(\d+)(?:-\d+)?\s*(.*)", re.S)
+
+
+def read_usfm_rows(path: str):
+    """
+    Yield (key, text) from USFM-like text: \\id BOOK, \\c N, \\v N text.
+    path may be one file or a directory of .usfm/.sfm files. Footnotes and
+    cross references, headings and titles are dropped, other markers are stripped.
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, n) for n in os.listdir(path)
+                       if n.lower().endswith((".usfm", ".sfm", ".txt")))
+    else:
+        files = [path]
+    for file_path in files:
+        with open(file_path, encoding="utf-8-sig") as f:
+            content = USFM_TITLE_RE.sub("", f.read())
+        book = chapter = None
+        for chunk in re.split(r"(?=\\(?:id|c|v)\s)", content):
+            m = re.match(r"\\(id|c|v)\s+(.*)", chunk, re.S)
+            if not m:
+                continue
+            marker, rest = m.groups()
+            if marker == "id":
+                book = USFM_ORDINALS.get(rest.split()[0].upper()) if rest.split() else None
+            elif marker == "c":
+                chapter = int(rest.split()[0]) if rest.split() and rest.split()[0].isdigit() else None
+            elif book and chapter:
+                vm = USFM_VERSE_RE.match(rest)
+                if vm:
+                    # attributes and closing markers (\w*) vanish in place; opening ones separate words
+                    txt = USFM_STRIP_RE.sub(lambda mm: "" if mm.group(0)[0] == "|" or mm.group(0)[-1] == "*"
+                                            else " ", vm.group(2))
+                    txt = " ".join(txt.split())
+                    if txt:
+                        yield make_key(book, chapter, int(vm.group(1))), txt
+
+
+def reader_for(source: str):
+    """Pick a source reader by file extension (a directory is read as USFM)."""
+    ext = os.path.splitext(source)[1].lower()
+    if ext in (".xlsx", ".xls"):
+        return read_bsb_rows
+    if ext in (".csv", ".tsv"):
+        return read_csv_rows
+    return read_usfm_rows
+
+
+# --- Translation registry -------------------------------------------------------
+# code -> Translation. Only translations whose source file exists are
+# compiled; the placeholders of the others are simply left empty. More can be
+# added with register_translation() or BIBLE_TRANSLATIONS="code=path,...".
+
+Translation = namedtuple("Translation", "code name source reader")
+
+TRANSLATIONS = OrderedDict()
+
+
+def register_translation(code, name, source, reader=None):
+    """Add (or replace) a translation; reader(path) yields (key, text), by default chosen by extension."""
+    if len(code.encode("ascii")) > 8:
+        raise ValueError(f"translation code {code!r} is longer than 8 characters")
+    TRANSLATIONS[code] = Translation(code, name, source, reader or reader_for(source))
+
+
+register_translation("en", "Berean Standard Bible", "bsb.xlsx", read_bsb_rows)
+register_translation("kn", "Kannada Bible", os.environ.get("KANNADA_BIBLE", "kannada_bible.csv"))
+for _spec in filter(None, os.environ.get("BIBLE_TRANSLATIONS", "").split(",")):
+    _code, _, _source = _spec.partition("=")
+    register_translation(_code.strip(), _code.strip(), _source.strip())
+
+
+def available_translations():
+    """Registered translations whose source file is present."""
+    return [t for t in TRANSLATIONS.values() if os.path.exists(t.source)]
+
+
+def compile_verse_store(store_path=STORE_PATH, translations=None):
+    """Compile the given (default: available) translations into the binary store. Returns the verse count."""
+    translations = available_translations() if translations is None else list(translations)
+    if not translations:
+        raise FileNotFoundError("no Bible source found: " + ", ".join(t.source for t in TRANSLATIONS.values()))
+
+    texts = []
+    for t in translations:
+        verses = dict(t.reader(t.source))
+        log.info("Read %d verses of %s from %s", len(verses), t.code, t.source)
+        texts.append(verses)
+    keys = array.array("I", sorted(set().union(*texts)))
+
+    tables = []
+    for verses in texts:
+        offsets = array.array("I", [0])
+        blob = bytearray()
+        for k in keys:
+            blob += verses.get(k, "").encode("utf-8")
+            offsets.append(len(blob))
+        blob += b"\0" * (-len(blob) % 4)  # keep the next offsets table aligned
+        tables.append((offsets, blob))
+
+    tmp_path = store_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(translations)))
+        for t, (offsets, blob) in zip(translations, tables):
+            size, mtime_ns = _source_signature(t.source)
+            f.write(TRANSLATION.pack(t.code.encode("ascii"), size, mtime_ns, len(blob)))
+        keys.tofile(f)
+        for offsets, blob in tables:
+            offsets.tofile(f)
+            f.write(blob)
+    os.replace(tmp_path, store_path)
+    return len(keys)
+
+
+class VerseStore:
+    """Read-only, mmap-backed view of a compiled verse store."""
+
+    def __init__(self, store_path=STORE_PATH):
+        with open(store_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, n_translations = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{store_path} is not a verse store for this platform")
+
+        pos = HEADER.size
+        self.sources = OrderedDict()  # code -> (source size, source mtime_ns)
+        text_lengths = []
+        for _ in range(n_translations):
+            code, size, mtime_ns, text_len = TRANSLATION.unpack_from(self._mm, pos)
+            pos += TRANSLATION.size
+            self.sources[code.rstrip(b"\0").decode("ascii")] = (size, mtime_ns)
+            text_lengths.append(text_len)
+
+        view = memoryview(self._mm)
+        self.keys = view[pos:pos + 4 * count].cast("I")
+        pos += 4 * count
+        self._tables = {}  # code -> (offsets, text)
+        for code, text_len in zip(self.sources, text_lengths):
+            offsets = view[pos:pos + 4 * (count + 1)].cast("I")
+            pos += 4 * (count + 1)
+            self._tables[code] = (offsets, view[pos:pos + text_len])
+            pos += text_len
+
+    @property
+    def translations(self):
+        """Codes of the translations in this store, e.g. ("en", "kn")."""
+        return tuple(self.sources)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def verse_text(self, index: int, lang: str = "en") -> str:
+        offsets, text = self._tables[lang]
+        return str(text[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def range_indices(self, lo_key: int, hi_key: int):
+        """Index slice [start, stop) covering keys lo_key..hi_key inclusive."""
+        start = bisect.bisect_left(self.keys, lo_key)
+        stop = bisect.bisect_right(self.keys, hi_key, lo=start)
+        return start, stop
+
+    def read_range(self, lo_key: int, hi_key: int, lang: str = "en"):
+        """Return [(key, text), ...] for every verse between the two keys."""
+        start, stop = self.range_indices(lo_key, hi_key)
+        return [(self.keys[i], self.verse_text(i, lang)) for i in range(start, stop)]
+
+    def read_aligned(self, ranges, langs=("en",)):
+        """
+        Resolve many (lo_key, hi_key) ranges in one ordered sweep over the
+        shared key table, reading each from every translation in langs.
+        Returns, in input order, [(key, (text per lang, ...)), ...] per range;
+        a translation that lacks a verse gives "".
+        """
+        tables = [self._tables[lang] for lang in langs]
+        results = [None] * len(ranges)
+        start = 0
+        for idx in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+            lo_key, hi_key = ranges[idx]
+            start = bisect.bisect_left(self.keys, lo_key, lo=start)
+            stop = bisect.bisect_right(self.keys, hi_key, lo=start)
+            results[idx] = [(self.keys[i], tuple(str(text[offsets[i]:offsets[i + 1]], "utf-8")
+                                                 for offsets, text in tables))
+                            for i in range(start, stop)]
+        return results
+
+    def read_ranges(self, ranges, lang: str = "en"):
+        """read_aligned for one translation: [(key, text), ...] per range, in input order."""
+        return [[(key, texts[0]) for key, texts in rows] for rows in self.read_aligned(ranges, (lang,))]
+
+    def has_chapter(self, book: int, chapter: int) -> bool:
+        start, stop = self.range_indices(make_key(book, chapter, 0), make_key(book, chapter, 0x3FF))
+        return stop > start
+
+
+def is_stale(store_path=STORE_PATH) -> bool:
+    """True when the store is missing or its translations differ from the available sources."""
+    if not os.path.exists(store_path):
+        return True
+    sources = {t.code: _source_signature(t.source) for t in available_translations()}
+    if not sources:
+        return False  # a shipped store without its sources
+    try:
+        with open(store_path, "rb") as f:
+            magic, _, n_translations = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                return True
+            stored = {}
+            for _ in range(n_translations):
+                code, size, mtime_ns, _ = TRANSLATION.unpack(f.read(TRANSLATION.size))
+                stored[code.rstrip(b"\0").decode("ascii")] = (size, mtime_ns)
+    except (OSError, struct.error, UnicodeDecodeError):
+        return True
+    return stored != sources
+
+
+def load_verse_store(store_path=STORE_PATH) -> VerseStore:
+    """Open the store, compiling it first if a source changed or a translation was added."""
+    if is_stale(store_path):
+        count = compile_verse_store(store_path)
+        log.info("Compiled %d verses into %s", count, store_path)
+    return VerseStore(store_path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    dst = sys.argv[1] if len(sys.argv) > 1 else STORE_PATH
+    n = compile_verse_store(dst)
+    store = VerseStore(dst)
+    print(f"Compiled {n} verses ({', '.join(store.translations)}) into {dst} ({os.path.getsize(dst)} bytes)")